@@ -0,0 +1,89 @@
+# STOCK API
+# Libraries
+import gzip
+import json
+import numpy as np
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Columns of series returned by api (name in api, column in store)
+SERIES_API_COLUMNS = [
+    ("open", "open_price"),
+    ("high", "max_price"),
+    ("low", "min_price"),
+    ("close", "last_price"),
+]
+
+
+def series_columns(temp_df):
+    """
+    Method responsible for returning dictionary with arrays of series columns:
+    date (days since 1970-01-01) and OHLC prices
+    """
+    columns = {
+        "date": temp_df["date"]
+        .to_numpy(dtype="datetime64[ns]")
+        .astype("datetime64[D]")
+        .astype("int64")
+    }
+
+    for api_column, store_column in SERIES_API_COLUMNS:
+        columns[api_column] = temp_df[store_column].to_numpy(dtype="float64")
+
+    return columns
+
+
+def encode_json(stock_name, interval, currency_name, columns):
+    """
+    Method responsible for encoding series as columnar JSON
+    (dates in ISO format, missing prices as null)
+    """
+    body = {
+        "instrument": stock_name,
+        "interval": interval,
+        "currency": currency_name,
+        "length": len(columns["date"]),
+        "columns": {
+            "date": np.datetime_as_string(
+                columns["date"].astype("datetime64[D]")
+            ).tolist()
+        },
+    }
+
+    for api_column, _ in SERIES_API_COLUMNS:
+        values = columns[api_column]
+        body["columns"][api_column] = np.where(np.isnan(values), None, values).tolist()
+
+    return json.dumps(body, separators=(",", ":")).encode()
+
+
+def encode_binary(columns):
+    """
+    Method responsible for encoding series as little-endian float64 columns
+    written one after another (date, open, high, low, close)
+    """
+    return np.concatenate(
+        [columns[column].astype("<f8") for column in columns]
+    ).tobytes()
+
+
+def compress(body, accept_encoding):
+    """
+    Method responsible for compressing body with best encoding accepted
+    by client (brotli if available, then gzip) and returning (body, encoding)
+    """
+    encodings = [
+        encoding.split(";")[0].strip() for encoding in accept_encoding.split(",")
+    ]
+
+    if brotli is not None and "br" in encodings:
+        return brotli.compress(body), "br"
+
+    if "gzip" in encodings:
+        return gzip.compress(body, compresslevel=6), "gzip"
+
+    return body, None
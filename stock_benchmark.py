@@ -0,0 +1,536 @@
+# STOCK BENCHMARK
+# Libraries
+import os
+import sys
+import json
+import time
+import argparse
+import shutil
+import sqlite3
+import platform
+import importlib
+import subprocess
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from stock_fx import CurrencyConverter
+from stock_rollup import compute_rollup
+from stock_scrapper import StockScrapper
+from stock_snapshot import snapshot_directory, write_snapshot
+from stock_store import SeriesStore, load_series_store
+
+
+# Currencies of synthetic instruments
+SYNTHETIC_CURRENCIES = ["USD", "EUR", "PLN", "JPY"]
+
+# Exchange rates connecting currencies of synthetic instruments
+# (added to store in benchmark of currency conversion)
+SYNTHETIC_FX_PAIRS = ["eur-usd", "eur-pln", "usd-jpy"]
+
+# Columns of data frame from scrapper (read by position)
+RAW_COLUMNS = [
+    "Instrument",
+    "Currency",
+    "Interval",
+    "Data",
+    "Ostatnio",
+    "Otwarcie",
+    "Max.",
+    "Min.",
+    "Wol.",
+    "Zmiana%",
+]
+
+# Code measuring import of site in fresh process (with its database)
+STARTUP_CODE = """
+import json, resource, time
+start_time = time.perf_counter()
+import stock_site
+print(json.dumps({
+    "seconds": time.perf_counter() - start_time,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def generate_daily_df(instrument_names, years=20, end_date="2022-12-30", seed=0):
+    """
+    Method responsible for generating daily OHLC data of instruments
+    (geometric random walk on business days, all instruments at once)
+    """
+    rng = np.random.default_rng(seed)
+
+    dates = pd.bdate_range(end=end_date, periods=int(years * 261))
+    n_dates = len(dates)
+    n_instruments = len(instrument_names)
+
+    # Prices of all instruments as one 2D array (dates x instruments)
+    returns = rng.normal(0, 0.015, size=(n_dates, n_instruments))
+    start_prices = rng.uniform(1, 500, size=n_instruments)
+    last = start_prices * np.exp(np.cumsum(returns, axis=0))
+    open_ = np.vstack([start_prices, last[:-1]]) * np.exp(
+        rng.normal(0, 0.002, size=(n_dates, n_instruments))
+    )
+    spread = np.abs(rng.normal(0, 0.01, size=(n_dates, n_instruments)))
+    volume = rng.lognormal(12, 1, size=(n_dates, n_instruments))
+
+    daily_df = pd.DataFrame(
+        {
+            "instrument_name": np.repeat(np.asarray(instrument_names), n_dates),
+            "currency_name": np.repeat(
+                np.resize(SYNTHETIC_CURRENCIES, n_instruments), n_dates
+            ),
+            "date": np.tile(dates.to_numpy(), n_instruments),
+            "last_price": last.T.ravel(),
+            "open_price": open_.T.ravel(),
+            "max_price": (np.maximum(last, open_) * (1 + spread)).T.ravel(),
+            "min_price": (np.minimum(last, open_) * (1 - spread)).T.ravel(),
+            "volume": volume.T.ravel().round(),
+        }
+    )
+
+    return daily_df.round({column: 4 for column in daily_df.columns[3:7]})
+
+
+def to_raw_df(temp_df, interval):
+    """
+    Method responsible for converting generated data into format of data
+    frame from scrapper (e.g. dates 30.12.2022, volume 156.06K, change -0.35%)
+    """
+    change = temp_df["last_price"].groupby(temp_df["instrument_name"]).pct_change()
+
+    return pd.DataFrame(
+        {
+            RAW_COLUMNS[0]: temp_df["instrument_name"].to_numpy(),
+            RAW_COLUMNS[1]: temp_df["currency_name"].to_numpy(),
+            RAW_COLUMNS[2]: interval,
+            RAW_COLUMNS[3]: temp_df["date"].dt.strftime("%d.%m.%Y").to_numpy(),
+            RAW_COLUMNS[4]: temp_df["last_price"].to_numpy(),
+            RAW_COLUMNS[5]: temp_df["open_price"].to_numpy(),
+            RAW_COLUMNS[6]: temp_df["max_price"].to_numpy(),
+            RAW_COLUMNS[7]: temp_df["min_price"].to_numpy(),
+            RAW_COLUMNS[8]: (
+                (temp_df["volume"] / 1000).round(2).astype(str) + "K"
+            ).to_numpy(),
+            RAW_COLUMNS[9]: ((change * 100).round(2).astype(str) + "%").to_numpy(),
+        }
+    )
+
+
+def generate_raw_df(instrument_names, years=20, seed=0):
+    """
+    Method responsible for generating data frame from scrapper with
+    Daily, Weekly and Monthly data of instruments
+    """
+    daily_df = generate_daily_df(instrument_names, years=years, seed=seed)
+    frames = [to_raw_df(daily_df, "Daily")]
+
+    for interval in ("Weekly", "Monthly"):
+        frames.append(to_raw_df(compute_rollup(daily_df, interval), interval))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_synthetic_db(path, instruments=12, years=20, seed=0, chunk_size=100):
+    """
+    Method responsible for writing synthetic database with create_db of scrapper
+    (instruments are written in chunks, as scheduler does) and returning
+    load throughput
+    - path - path to created database (existing file is replaced)
+    - instruments - number of instruments
+    - years - number of years of data
+    - chunk_size - number of instruments written with one create_db
+    """
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    shutil.rmtree(snapshot_directory(path), ignore_errors=True)
+
+    instrument_names = ["synthetic-{0:05d}".format(i) for i in range(instruments)]
+    scrapper = StockScrapper(derive_rollups=False, db_path=path)
+
+    rows = 0
+    load_seconds = 0.0
+
+    for start in range(0, instruments, chunk_size):
+        raw_df = generate_raw_df(
+            instrument_names[start : start + chunk_size], years=years, seed=seed + start
+        )
+
+        start_time = time.perf_counter()
+        scrapper.create_db(raw_df)
+        load_seconds += time.perf_counter() - start_time
+
+        rows += len(raw_df)
+
+    return {
+        "instruments": instruments,
+        "years": years,
+        "rows": rows,
+        "seconds": load_seconds,
+        "rows_per_second": rows / load_seconds if load_seconds > 0 else 0,
+        "db_size_mb": os.path.getsize(path) / 2**20,
+    }
+
+
+def summarize(timings):
+    """
+    Method responsible for returning statistics (ms) of timings (seconds)
+    """
+    timings = np.asarray(timings) * 1000
+
+    return {
+        "count": len(timings),
+        "median_ms": float(np.median(timings)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "max_ms": float(np.max(timings)),
+    }
+
+
+def read_instrument_names(path):
+    """
+    Method responsible for returning names of instruments in database
+    """
+    conn = sqlite3.connect(path)
+
+    try:
+        return [
+            row[0]
+            for row in conn.execute(
+                "select instrument_name from instrument order by instrument_name;"
+            )
+        ]
+    finally:
+        conn.close()
+
+
+def random_selections(instrument_names, count, years=20, seed=0):
+    """
+    Method responsible for returning random selections of user
+    (instrument, start date, end date, interval) within last years of data
+    """
+    rng = np.random.default_rng(seed)
+    selections = []
+
+    for _ in range(count):
+        start_year = int(rng.integers(2023 - years, 2022))
+
+        selections.append(
+            {
+                "stock_name": str(rng.choice(instrument_names)),
+                "start_date": "{0}-{1:02d}-01".format(
+                    start_year, int(rng.integers(1, 13))
+                ),
+                "end_date": "{0}-12-31".format(int(rng.integers(start_year, 2023))),
+                "interval": str(rng.choice(["Daily", "Weekly", "Monthly"])),
+            }
+        )
+
+    return selections
+
+
+def bench_startup(path, data_mode="memory"):
+    """
+    Method responsible for measuring import time and memory of site
+    in fresh process
+    """
+    env = dict(
+        os.environ,
+        STOCK_DB_PATH=os.path.abspath(path),
+        STOCK_DATA_MODE=data_mode,
+        STOCK_PLOT_WORKERS="0",
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_CODE],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def load_site(path, data_mode="memory"):
+    """
+    Method responsible for importing site module using database
+    (plots are rendered in calling thread, so only rendering is measured)
+    """
+    os.environ["STOCK_DB_PATH"] = os.path.abspath(path)
+    os.environ["STOCK_DATA_MODE"] = data_mode
+    os.environ["STOCK_PLOT_WORKERS"] = "0"
+    os.environ["STOCK_REFRESH_INTERVAL"] = "0"
+
+    if "stock_site" in sys.modules:
+        return importlib.reload(sys.modules["stock_site"])
+
+    return importlib.import_module("stock_site")
+
+
+def bench_plot(site, selections, plot_selections):
+    """
+    Method responsible for measuring latency of filtering data (lookup in store),
+    creating plot specification and rendering plot (line and candlestick charts)
+    (plots use other selections, so they are not served by cache of store)
+    """
+    from stock_plot import render_plot
+
+    timings = {
+        "filter": [],
+        "create_plot": [],
+        "render": [],
+        "create_candles": [],
+        "render_candles": [],
+    }
+
+    for selection in selections:
+        start_time = time.perf_counter()
+        site.store.lookup(**selection)
+        timings["filter"].append(time.perf_counter() - start_time)
+
+    for selection in plot_selections:
+        start_time = time.perf_counter()
+        plot_spec = site.create_plot(store=site.store, **selection)
+        timings["create_plot"].append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        render_plot(plot_spec)
+        timings["render"].append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        plot_spec = site.create_plot(
+            store=site.store, chart_type="candlestick", **selection
+        )
+        timings["create_candles"].append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        render_plot(plot_spec)
+        timings["render_candles"].append(time.perf_counter() - start_time)
+
+    return {name: summarize(values) for name, values in timings.items()}
+
+
+def bench_convert(path, years=20, seed=0):
+    """
+    Method responsible for measuring conversion of all daily series of database
+    to each synthetic currency: cold (as-of join with exchange rates) and warm
+    (served from cache of converter)
+    """
+    store = load_series_store(path)
+
+    # Synthetic exchange rates priced in their quote currency
+    fx_df = generate_daily_df(SYNTHETIC_FX_PAIRS, years=years, seed=seed)
+    fx_df["currency_name"] = fx_df["instrument_name"].str[-3:].str.upper()
+    fx_df["interval"] = "Daily"
+    fx_df["change"] = np.nan
+    store.partitions.update(SeriesStore(fx_df).partitions)
+
+    instrument_names = read_instrument_names(path)
+    converter = CurrencyConverter(
+        max_size=len(instrument_names) * len(SYNTHETIC_CURRENCIES)
+    )
+
+    results = {"series": 0, "rows": 0}
+
+    for label in ("cold", "warm"):
+        start_time = time.perf_counter()
+
+        for currency_name in SYNTHETIC_CURRENCIES:
+            for instrument_name in instrument_names:
+                partition = converter.convert(
+                    store, instrument_name, "Daily", currency_name
+                )
+
+                if label == "cold" and partition is not None:
+                    results["series"] += 1
+                    results["rows"] += len(partition)
+
+        results["{0}_seconds".format(label)] = time.perf_counter() - start_time
+
+    return results
+
+
+def bench_post(site, selections):
+    """
+    Method responsible for measuring latency of POST requests through test client:
+    cold (new selections, plot is rendered) and warm (repeated, served from cache)
+    """
+    client = site.app.test_client()
+    timings = {"cold": [], "warm": []}
+
+    for name in ("cold", "warm"):
+        for selection in selections:
+            start_time = time.perf_counter()
+            response = client.post(
+                "/",
+                data={
+                    "stockname": selection["stock_name"],
+                    "startdate": selection["start_date"],
+                    "enddate": selection["end_date"],
+                    "interval": selection["interval"],
+                },
+            )
+            timings[name].append(time.perf_counter() - start_time)
+
+            if response.status_code != 200:
+                raise RuntimeError(
+                    "POST failed with status {0}".format(response.status_code)
+                )
+
+    return {name: summarize(values) for name, values in timings.items()}
+
+
+def run_benchmarks(path, instruments=12, years=20, repeats=20, seed=0, generate=True):
+    """
+    Method responsible for running all benchmarks and returning results
+    """
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "db_path": path,
+            "instruments": instruments,
+            "years": years,
+            "repeats": repeats,
+            "seed": seed,
+        },
+        "benchmarks": {},
+    }
+    benchmarks = results["benchmarks"]
+
+    if generate:
+        print(
+            "Generating database: {0} instruments x {1} years".format(
+                instruments, years
+            )
+        )
+        benchmarks["create_db"] = write_synthetic_db(
+            path, instruments=instruments, years=years, seed=seed
+        )
+
+    # Snapshot read by site in snapshot mode (written again, as snapshot
+    # of unchanged database is not rewritten)
+    shutil.rmtree(snapshot_directory(path), ignore_errors=True)
+    start_time = time.perf_counter()
+    manifest = write_snapshot(path)
+    benchmarks["write_snapshot"] = {
+        "series": len(manifest["series"]),
+        "seconds": time.perf_counter() - start_time,
+    }
+
+    print("Measuring currency conversion")
+    benchmarks["convert"] = bench_convert(path, years=years, seed=seed)
+
+    for data_mode in ("snapshot", "memory", "sql"):
+        print("Measuring {0} mode".format(data_mode))
+        benchmarks["startup_{0}".format(data_mode)] = bench_startup(path, data_mode)
+
+        site = load_site(path, data_mode)
+        selections = random_selections(
+            read_instrument_names(path), repeats, years=years, seed=seed
+        )
+
+        plot_selections = random_selections(
+            read_instrument_names(path), repeats, years=years, seed=seed + 1
+        )
+
+        benchmarks["plot_{0}".format(data_mode)] = bench_plot(
+            site, selections, plot_selections
+        )
+        benchmarks["post_{0}".format(data_mode)] = bench_post(
+            site,
+            random_selections(
+                read_instrument_names(path), repeats, years=years, seed=seed + 2
+            ),
+        )
+
+    return results
+
+
+def flatten(results, prefix=""):
+    """
+    Method responsible for returning dictionary of numeric results
+    with dotted names (e.g. plot_memory.render.median_ms)
+    """
+    values = {}
+
+    for name, value in results.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, "{0}{1}.".format(prefix, name)))
+        elif isinstance(value, (int, float)):
+            values[prefix + name] = value
+
+    return values
+
+
+def compare_results(old_results, new_results, threshold=0.2):
+    """
+    Method responsible for returning regressions between two runs: times
+    (seconds, median ms) and memory larger and throughputs smaller by more
+    than threshold (maximal and p95 timings are too noisy to compare)
+    """
+    old_values = flatten(old_results["benchmarks"])
+    new_values = flatten(new_results["benchmarks"])
+    regressions = []
+
+    for name, new_value in new_values.items():
+        old_value = old_values.get(name)
+
+        if not old_value:
+            continue
+
+        ratio = new_value / old_value
+
+        if name.endswith(("seconds", "median_ms", "_mb")) and ratio > 1 + threshold:
+            regressions.append((name, old_value, new_value))
+        elif name.endswith("per_second") and ratio < 1 - threshold:
+            regressions.append((name, old_value, new_value))
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmarks of loading, site startup and plotting on synthetic data"
+    )
+    parser.add_argument("--db", default="benchmark_prices.db")
+    parser.add_argument("--instruments", type=int, default=12)
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-generate", action="store_true", help="use existing database"
+    )
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="previous results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        args.db,
+        instruments=args.instruments,
+        years=args.years,
+        repeats=args.repeats,
+        seed=args.seed,
+        generate=not args.no_generate,
+    )
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+
+    print(json.dumps(results["benchmarks"], indent=2))
+    print("Results saved to {0}".format(args.output))
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare_results(json.load(file), results, args.threshold)
+
+        for name, old_value, new_value in regressions:
+            print(
+                "REGRESSION {0}: {1:.3f} -> {2:.3f}".format(name, old_value, new_value)
+            )
+
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,96 @@
+# STOCK CACHE
+# Libraries
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def make_key(*parts):
+    """
+    Method responsible for creating cache key (used also in urls and ETags)
+    from parts of user selection and data version
+    """
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+class LRUCache:
+    def __init__(self, max_size=128) -> None:
+        """
+        Bounded LRU cache
+        - max_size - maximal number of stored items
+        """
+        self.max_size = max_size
+
+        # Items ordered from least to most recently used
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Cache statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Method responsible for returning cached item (None if missing)
+        and counting hits and misses
+        """
+        with self.lock:
+            item = self.items.get(key)
+
+            if item is None:
+                self.misses += 1
+                return None
+
+            self.items.move_to_end(key)
+            self.hits += 1
+
+            return item
+
+    def peek(self, key):
+        """
+        Method responsible for returning cached item without counting statistics
+        """
+        with self.lock:
+            return self.items.get(key)
+
+    def put(self, key, item):
+        """
+        Method responsible for storing item and evicting least recently used ones
+        """
+        with self.lock:
+            self.items[key] = item
+            self.items.move_to_end(key)
+
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+                self.evictions += 1
+
+    def entries(self):
+        """
+        Method responsible for returning list of (key, item) pairs,
+        from least to most recently used
+        """
+        with self.lock:
+            return list(self.items.items())
+
+    def stats(self):
+        """
+        Method responsible for returning statistics of cache
+        """
+        with self.lock:
+            return {
+                "size": len(self.items),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class PlotCache(LRUCache):
+    """
+    Bounded LRU cache with rendered plot images
+    """
+
+    make_key = staticmethod(make_key)
@@ -0,0 +1,57 @@
+# STOCK COMPARE
+# Libraries
+import numpy as np
+import pandas as pd
+
+
+# Modes of comparing instruments available for user
+COMPARE_MODES = ["price", "rebase", "returns"]
+
+# Labels of y axis for modes of comparison
+COMPARE_LABELS = {
+    "rebase": "Value (rebased to 100)",
+    "returns": "Cumulative return (%)",
+}
+
+
+def align_series(long_df, stock_names, column="last_price"):
+    """
+    Method responsible for aligning series of several instruments on common
+    date axis (one column per instrument, in order of stock_names)
+    Days missing in one market (e.g. holidays) take previous value, days
+    before first value of instrument stay empty
+    """
+    wide_df = long_df.pivot(index="date", columns="instrument_name", values=column)
+    wide_df = wide_df.reindex(columns=stock_names).sort_index().ffill()
+    wide_df.columns.name = None
+
+    return wide_df
+
+
+def compare_series(wide_df, mode="price"):
+    """
+    Method responsible for transforming aligned series for comparison:
+    - price - values as they are
+    - rebase - values rebased to 100 at first value of each instrument
+    - returns - cumulative return (%) from first value of each instrument
+    """
+    # Selection without values has nothing to transform
+    if mode == "price" or wide_df.empty:
+        return wide_df
+
+    values = wide_df.to_numpy(dtype=np.float64)
+
+    # First valid value of each column (all columns at once)
+    valid = ~np.isnan(values)
+    first_rows = np.where(valid.any(axis=0), valid.argmax(axis=0), 0)
+    base = values[first_rows, np.arange(values.shape[1])]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = values / base
+
+    if mode == "rebase":
+        ratios = ratios * 100
+    else:
+        ratios = (ratios - 1) * 100
+
+    return pd.DataFrame(ratios, index=wide_df.index, columns=wide_df.columns)
@@ -0,0 +1,693 @@
+# STOCK DATABASE
+# Libraries
+import time
+import sqlite3
+import pandas as pd
+from datetime import datetime
+from itertools import islice
+
+# Tables of database
+SQL_CREATE_CURRENCY = """create table if not EXISTS currency (
+        currency_id integer PRIMARY key,
+        currency_name text
+        );"""
+
+SQL_CREATE_INSTRUMENT = """create table if not EXISTS instrument (
+        instrument_id integer PRIMARY key,
+        instrument_name text
+        );"""
+
+SQL_CREATE_CHECKPOINT = """create table if not EXISTS scrape_checkpoint (
+        run_name text not NULL,
+        job_key text not NULL,
+        rows integer,
+        completed_at text,
+        PRIMARY key (run_name, job_key)
+        );"""
+
+SQL_CREATE_FAILURE = """create table if not EXISTS scrape_failure (
+        instrument_name text PRIMARY key,
+        failures integer not NULL,
+        opened_at real
+        );"""
+
+SQL_CREATE_STOCK_TABLE = """create table if not EXISTS {0} (
+        id integer PRIMARY key AUTOINCREMENT,
+        instrument_id integer not NULL,
+        currency_id integer not null,
+        date text not NULL,
+        interval text,
+        last_price real,
+        open_price real,
+        max_price real,
+        min_price real,
+        volume integer,
+        change real,
+        FOREIGN KEY (instrument_id)
+            REFERENCES instrument (instrument_id),
+        FOREIGN KEY (currency_id)
+            REFERENCES currency (currency_id)
+        );"""
+
+SQL_CREATE_STOCK = SQL_CREATE_STOCK_TABLE.format("stock")
+
+# Counter of changes of stock rows other than inserts (one row)
+SQL_CREATE_DATA_STATE = """create table if not EXISTS data_state (
+        id integer PRIMARY key check (id = 0),
+        changes integer not NULL
+        );"""
+
+# Log of keys of updated and deleted stock rows (readers re-read rows
+# of logged keys changed after their last change_id)
+SQL_CREATE_CHANGE_LOG = """create table if not EXISTS stock_change (
+        change_id integer PRIMARY key AUTOINCREMENT,
+        instrument_id integer not NULL,
+        interval text,
+        date text not NULL
+        );"""
+
+# Number of the latest entries kept in log of changes (readers behind
+# removed entries read everything again)
+CHANGE_LOG_SIZE = 100000
+
+# Covering index for range queries of series
+SQL_CREATE_SERIES_INDEX = """create index if not EXISTS stock_series_idx
+        on stock (instrument_id, interval, date, currency_id, last_price,
+            open_price, max_price, min_price, volume, change);"""
+
+# Indexes built after data is loaded
+SQL_CREATE_INDEXES = [
+    """create unique index if not EXISTS stock_series_key
+        on stock (instrument_id, interval, date);""",
+    SQL_CREATE_SERIES_INDEX,
+]
+
+SQL_DROP_INDEXES = [
+    "drop index if EXISTS stock_series_key;",
+    "drop index if EXISTS stock_series_idx;",
+]
+
+# Migrations of existing databases, applied in order and tracked with user_version
+MIGRATIONS = [
+    # 1. Unique key of series rows (keeping the latest of duplicated rows)
+    [
+        """delete from stock where id not in (
+            select max(id) from stock group by instrument_id, interval, date
+        );""",
+        "drop index if EXISTS stock_series_idx;",
+        """create unique index if not EXISTS stock_series_key
+            on stock (instrument_id, interval, date);""",
+    ],
+    # 2. Numeric volume (e.g. 1.2M -> 1200000) and change (e.g. -0.35% -> -0.35)
+    [
+        SQL_CREATE_STOCK_TABLE.format("stock_migrated"),
+        """insert into stock_migrated
+        select id, instrument_id, currency_id, date, interval,
+            last_price, open_price, max_price, min_price,
+            case
+                when typeof(volume) != 'text' then volume
+                when volume like '%K' then cast(round(cast(substr(volume, 1, length(volume) - 1) as real) * 1e3) as integer)
+                when volume like '%M' then cast(round(cast(substr(volume, 1, length(volume) - 1) as real) * 1e6) as integer)
+                when volume like '%B' then cast(round(cast(substr(volume, 1, length(volume) - 1) as real) * 1e9) as integer)
+                when volume glob '[0-9]*' then cast(volume as integer)
+            end,
+            case
+                when typeof(change) != 'text' then change
+                when change glob '*[0-9]*' then cast(replace(replace(change, '%', ''), '+', '') as real)
+            end
+        from stock;""",
+        "drop table stock;",
+        "alter table stock_migrated rename to stock;",
+        """create unique index if not EXISTS stock_series_key
+            on stock (instrument_id, interval, date);""",
+    ],
+    # 3. Sortable ISO dates (dd.mm.YYYY -> YYYY-mm-dd) and covering index of series
+    [
+        """update stock
+        set date = substr(date, 7, 4) || '-' || substr(date, 4, 2) || '-' || substr(date, 1, 2)
+        where date glob '[0-9][0-9].[0-9][0-9].[0-9][0-9][0-9][0-9]';""",
+        SQL_CREATE_SERIES_INDEX,
+    ],
+    # 4. Market of instrument (part of its url, instruments with market
+    #    are universe of scrapper)
+    [
+        "alter table instrument add column market text;",
+    ],
+    # 5. Counter of updated and deleted stock rows (with last id it marks
+    #    content of database, e.g. in signature of snapshot)
+    [
+        SQL_CREATE_DATA_STATE,
+        "insert or ignore into data_state (id, changes) values (0, 0);",
+        """create trigger if not EXISTS stock_update_changes after update on stock
+        begin
+            update data_state set changes = changes + 1 where id = 0;
+        end;""",
+        """create trigger if not EXISTS stock_delete_changes after delete on stock
+        begin
+            update data_state set changes = changes + 1 where id = 0;
+        end;""",
+    ],
+    # 6. Log of keys of updated and deleted stock rows (to refresh only
+    #    changed rows)
+    [
+        SQL_CREATE_CHANGE_LOG,
+        """create trigger if not EXISTS stock_update_log after update on stock
+        begin
+            insert into stock_change (instrument_id, interval, date)
+            values (old.instrument_id, old.interval, old.date);
+            insert into stock_change (instrument_id, interval, date)
+            select new.instrument_id, new.interval, new.date
+            where new.instrument_id != old.instrument_id
+                or new.interval is not old.interval
+                or new.date != old.date;
+        end;""",
+        """create trigger if not EXISTS stock_delete_log after delete on stock
+        begin
+            insert into stock_change (instrument_id, interval, date)
+            values (old.instrument_id, old.interval, old.date);
+        end;""",
+    ],
+]
+
+# Seconds of waiting for lock of database held by other writer
+# (e.g. writer thread of scrapper and failures counted by circuit breaker)
+BUSY_TIMEOUT = 60.0
+
+# Multipliers of volume suffixes
+VOLUME_SUFFIXES = {"K": 1e3, "M": 1e6, "B": 1e9}
+
+# Columns of tables filled by loader
+STOCK_COLUMNS = [
+    "instrument_id",
+    "currency_id",
+    "date",
+    "interval",
+    "last_price",
+    "open_price",
+    "max_price",
+    "min_price",
+    "volume",
+    "change",
+]
+
+
+def to_number(column):
+    """
+    Method responsible for converting whole column to numbers, where
+    all dots except the last one are thousands separators (e.g. 1.234.56)
+    """
+    if pd.api.types.is_numeric_dtype(column):
+        return column
+
+    text = column.astype(str).str.strip()
+
+    # Removing thousands separators only in values which have them
+    separated = text.str.count(r"\.") > 1
+    text = text.mask(
+        separated, text[separated].str.replace(r"\.(?=.*\.)", "", regex=True)
+    )
+
+    return pd.to_numeric(text, errors="coerce")
+
+
+def normalize_stock_df(stock_df):
+    """
+    Method responsible for converting data frame from scrapper (instrument,
+    currency, interval, date, last, open, max, min, volume, change) into
+    data frame with named and numeric columns
+    """
+    columns = stock_df.columns
+
+    # Dates in sortable ISO format (e.g. 30.12.2022 -> 2022-12-30)
+    dates = pd.to_datetime(stock_df[columns[3]], format="%d.%m.%Y", errors="coerce")
+
+    temp_stock_df = pd.DataFrame(
+        {
+            "instrument_name": stock_df[columns[0]],
+            "currency_name": stock_df[columns[1]],
+            "date": dates.dt.strftime("%Y-%m-%d"),
+            "interval": stock_df[columns[2]],
+            "last_price": to_number(stock_df[columns[4]]),
+            "open_price": to_number(stock_df[columns[5]]),
+            "max_price": to_number(stock_df[columns[6]]),
+            "min_price": to_number(stock_df[columns[7]]),
+        }
+    )
+
+    # Volume with suffixes (e.g. 156.06K)
+    volume = stock_df[columns[8]].astype(str).str.strip().str.upper()
+    volume = volume.str.extract(r"^([\d.]+)([KMB]?)$")
+    temp_stock_df["volume"] = (
+        (to_number(volume[0]) * volume[1].map(VOLUME_SUFFIXES).fillna(1))
+        .round()
+        .astype("Int64")
+    )
+
+    # Percent change (e.g. -0.35%)
+    temp_stock_df["change"] = to_number(
+        stock_df[columns[9]].astype(str).str.replace("%", "", regex=False)
+    )
+
+    # Skipping rows without date (e.g. summary rows of table)
+    return temp_stock_df[dates.notna()]
+
+
+def to_rows(stock_df):
+    """
+    Method responsible for returning rows of data frame with python values
+    (missing values as None)
+    """
+    temp_df = stock_df.astype(object)
+
+    return temp_df.where(stock_df.notna(), None).itertuples(index=False, name=None)
+
+
+class StockDatabase:
+    def __init__(
+        self, path="stock_prices.db", synchronous="NORMAL", batch_size=10000
+    ) -> None:
+        """
+        Sqlite database with stock data
+        - path - path to database file
+        - synchronous - synchronous level used while loading data
+        - batch_size - number of rows inserted with one executemany
+        """
+        self.path = path
+        self.synchronous = synchronous
+        self.batch_size = batch_size
+
+    def connect(self):
+        """
+        Method responsible for opening connection with load-time PRAGMAs
+        (transactions are controlled manually, writing ones are started with
+        begin immediate, so waiting for other writer uses busy timeout)
+        """
+        conn = sqlite3.connect(self.path, isolation_level=None, timeout=BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous={0};".format(self.synchronous))
+
+        return conn
+
+    def execute_batches(self, c, sql_statement, rows):
+        """
+        Method responsible for executing parameterized statement with executemany
+        in batches and returning number of rows
+        """
+        rows = iter(rows)
+        executed = 0
+
+        while True:
+            batch = list(islice(rows, self.batch_size))
+
+            if not batch:
+                break
+
+            c.executemany(sql_statement, batch)
+            executed += len(batch)
+
+        return executed
+
+    def bulk_insert(self, c, table, columns, rows):
+        """
+        Method responsible for inserting rows with parameterized executemany
+        in batches and returning number of inserted rows
+        """
+        sql_insert = "insert into {0} ({1}) values ({2});".format(
+            table, ", ".join(columns), ", ".join("?" for _ in columns)
+        )
+
+        return self.execute_batches(c, sql_insert, rows)
+
+    def migrate_schema(self, c):
+        """
+        Method responsible for creating tables and applying missing migrations
+        (inside of already started transaction)
+        """
+        c.execute(SQL_CREATE_CURRENCY)
+        c.execute(SQL_CREATE_INSTRUMENT)
+        c.execute(SQL_CREATE_STOCK)
+        c.execute(SQL_CREATE_CHECKPOINT)
+        c.execute(SQL_CREATE_FAILURE)
+
+        version = c.execute("PRAGMA user_version;").fetchone()[0]
+
+        # Current database is not written (so its modification time stays)
+        if version >= len(MIGRATIONS):
+            return
+
+        for migration in MIGRATIONS[version:]:
+            [c.execute(sql_migration) for sql_migration in migration]
+
+        c.execute("PRAGMA user_version={0};".format(len(MIGRATIONS)))
+
+    def migrate(self):
+        """
+        Method responsible for migrating existing database to current schema
+        """
+        conn = self.connect()
+        c = conn.cursor()
+
+        try:
+            c.execute("begin;")
+            self.migrate_schema(c)
+            c.execute("commit;")
+        except Exception:
+            c.execute("rollback;")
+            raise
+        finally:
+            conn.close()
+
+    def get_ids(self, c, table, names):
+        """
+        Method responsible for returning mapping of names to ids from table
+        (currency or instrument), adding missing names with next ids
+        """
+        ids = dict(
+            c.execute("select {0}_name, {0}_id from {0};".format(table)).fetchall()
+        )
+
+        new_names = [name for name in dict.fromkeys(names) if name not in ids]
+        next_id = max(ids.values(), default=0) + 1
+        new_rows = [(next_id + index, name) for index, name in enumerate(new_names)]
+
+        self.bulk_insert(
+            c, table, ["{0}_id".format(table), "{0}_name".format(table)], new_rows
+        )
+        ids.update({name: table_id for table_id, name in new_rows})
+
+        return ids
+
+    def latest_dates(self):
+        """
+        Method responsible for returning latest stored date for each
+        (instrument_name, interval)
+        """
+        self.migrate()
+
+        conn = sqlite3.connect(self.path)
+
+        try:
+            rows = conn.execute(
+                """select instrument_name, interval, max(date)
+from stock
+left join instrument on instrument.instrument_id = stock.instrument_id
+group by stock.instrument_id, interval;"""
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return {
+            (instrument_name, interval): datetime.strptime(date, "%Y-%m-%d")
+            for instrument_name, interval, date in rows
+        }
+
+    def read_universe(self):
+        """
+        Method responsible for returning instruments to scrape from instrument
+        table as {market: [instrument names]} (instruments without market
+        are skipped)
+        """
+        self.migrate()
+
+        conn = sqlite3.connect(self.path)
+
+        try:
+            rows = conn.execute(
+                """select market, instrument_name
+from instrument
+where market is not null
+order by instrument_id;"""
+            ).fetchall()
+        finally:
+            conn.close()
+
+        universe = {}
+
+        for market, instrument_name in rows:
+            universe.setdefault(market, []).append(instrument_name)
+
+        return universe
+
+    def save_universe(self, universe):
+        """
+        Method responsible for saving instruments to scrape in instrument table
+        (missing instruments are added, market of existing ones is updated)
+        - universe - {market: [instrument names]}
+        """
+        conn = self.connect()
+        c = conn.cursor()
+
+        try:
+            c.execute("begin immediate;")
+            self.migrate_schema(c)
+
+            names = [name for market in universe for name in universe[market]]
+            ids = self.get_ids(c, "instrument", names)
+
+            c.executemany(
+                "update instrument set market = ? where instrument_id = ?;",
+                [
+                    (market, ids[name])
+                    for market in universe
+                    for name in universe[market]
+                ],
+            )
+            c.execute("commit;")
+        except Exception:
+            c.execute("rollback;")
+            raise
+        finally:
+            conn.close()
+
+    def save_checkpoints(self, checkpoints):
+        """
+        Method responsible for recording completed scrape jobs
+        - checkpoints - (run_name, job_key, rows) of jobs with written data
+        """
+        conn = self.connect()
+        c = conn.cursor()
+
+        try:
+            c.execute("begin immediate;")
+            self.migrate_schema(c)
+            c.executemany(
+                "insert or replace into scrape_checkpoint values (?, ?, ?, ?);",
+                [
+                    tuple(checkpoint) + (datetime.now().isoformat(timespec="seconds"),)
+                    for checkpoint in checkpoints
+                ],
+            )
+            c.execute("commit;")
+        except Exception:
+            c.execute("rollback;")
+            raise
+        finally:
+            conn.close()
+
+    def completed_jobs(self, run_name, since=None):
+        """
+        Method responsible for returning keys of scrape jobs completed in run
+        - since - ISO time of the oldest checkpoint taken into account
+          (older checkpoints belong to previous runs, all if None)
+        """
+        self.migrate()
+
+        conn = sqlite3.connect(self.path)
+
+        try:
+            rows = conn.execute(
+                """select job_key
+from scrape_checkpoint
+where run_name = ? and completed_at >= ?;""",
+                (run_name, since or ""),
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return {row[0] for row in rows}
+
+    def clear_checkpoints(self, run_name):
+        """
+        Method responsible for removing checkpoints of finished run
+        """
+        conn = self.connect()
+
+        try:
+            conn.execute(
+                "delete from scrape_checkpoint where run_name = ?;", (run_name,)
+            )
+        finally:
+            conn.close()
+
+    def instrument_failures(self, instrument_name):
+        """
+        Method responsible for returning (number of failed jobs in a row,
+        time of opening circuit or None) of instrument
+        """
+        self.migrate()
+
+        conn = sqlite3.connect(self.path)
+
+        try:
+            row = conn.execute(
+                """select failures, opened_at
+from scrape_failure
+where instrument_name = ?;""",
+                (instrument_name,),
+            ).fetchone()
+        finally:
+            conn.close()
+
+        return row or (0, None)
+
+    def record_instrument_failure(self, instrument_name):
+        """
+        Method responsible for counting failed job of instrument and returning
+        number of its failed jobs in a row
+        """
+        conn = self.connect()
+        c = conn.cursor()
+
+        try:
+            c.execute("begin immediate;")
+            self.migrate_schema(c)
+            c.execute(
+                """insert into scrape_failure (instrument_name, failures) values (?, 1)
+on conflict (instrument_name) do update set failures = failures + 1;""",
+                (instrument_name,),
+            )
+            failures = c.execute(
+                "select failures from scrape_failure where instrument_name = ?;",
+                (instrument_name,),
+            ).fetchone()[0]
+            c.execute("commit;")
+        except Exception:
+            c.execute("rollback;")
+            raise
+        finally:
+            conn.close()
+
+        return failures
+
+    def set_instrument_opened(self, instrument_name, opened_at):
+        """
+        Method responsible for saving time of opening circuit of instrument
+        (None lets next job of instrument run)
+        """
+        self.migrate()
+
+        conn = self.connect()
+
+        try:
+            conn.execute(
+                "update scrape_failure set opened_at = ? where instrument_name = ?;",
+                (opened_at, instrument_name),
+            )
+        finally:
+            conn.close()
+
+    def clear_instrument_failures(self, instrument_name):
+        """
+        Method responsible for removing failures of instrument after success
+        """
+        self.migrate()
+
+        conn = self.connect()
+
+        try:
+            conn.execute(
+                "delete from scrape_failure where instrument_name = ?;",
+                (instrument_name,),
+            )
+        finally:
+            conn.close()
+
+    def bulk_upsert(self, c, stock_rows):
+        """
+        Method responsible for upserting stock rows through unique key
+        (instrument_id, interval, date) and returning number of rows
+        Rows with the same values are not updated (so they are not logged
+        as changes)
+        """
+        columns = [
+            column
+            for column in STOCK_COLUMNS
+            if column not in ("instrument_id", "interval", "date")
+        ]
+        sql_upsert = """insert into stock ({0}) values ({1})
+on conflict (instrument_id, interval, date) do update set {2}
+where {3};""".format(
+            ", ".join(STOCK_COLUMNS),
+            ", ".join("?" for _ in STOCK_COLUMNS),
+            ", ".join("{0} = excluded.{0}".format(column) for column in columns),
+            " or ".join(
+                "stock.{0} is not excluded.{0}".format(column) for column in columns
+            ),
+        )
+
+        return self.execute_batches(c, sql_upsert, stock_rows)
+
+    def load(self, stock_rows):
+        """
+        Method responsible for upserting rows into database in one transaction:
+        - stock_rows - rows with values of STOCK_COLUMNS, but with instrument_name
+          and currency_name instead of ids
+        Returns number of loaded stock rows
+        """
+        start_time = time.perf_counter()
+
+        stock_rows = list(stock_rows)
+
+        conn = self.connect()
+        c = conn.cursor()
+
+        try:
+            c.execute("begin immediate;")
+
+            self.migrate_schema(c)
+
+            # Mapping names to ids
+            instrument_ids = self.get_ids(
+                c, "instrument", [stock_row[0] for stock_row in stock_rows]
+            )
+            currency_ids = self.get_ids(
+                c, "currency", [stock_row[1] for stock_row in stock_rows]
+            )
+
+            stock_rows = (
+                (instrument_ids[stock_row[0]], currency_ids[stock_row[1]])
+                + tuple(stock_row[2:])
+                for stock_row in stock_rows
+            )
+
+            if c.execute("select count(*) from stock;").fetchone()[0] == 0:
+                # Loading empty table and building indexes after data is in
+                [c.execute(sql_index) for sql_index in SQL_DROP_INDEXES]
+                rows = self.bulk_insert(c, "stock", STOCK_COLUMNS, stock_rows)
+                [c.execute(sql_index) for sql_index in SQL_CREATE_INDEXES]
+            else:
+                rows = self.bulk_upsert(c, stock_rows)
+
+            # Keeping only the latest entries of log of changes
+            c.execute(
+                """delete from stock_change
+where change_id <= (select max(change_id) from stock_change) - ?;""",
+                (CHANGE_LOG_SIZE,),
+            )
+
+            c.execute("commit;")
+        except Exception:
+            c.execute("rollback;")
+            raise
+        finally:
+            conn.close()
+
+        elapsed = time.perf_counter() - start_time
+
+        print(
+            "Loaded {0} rows in {1:.2f}s ({2:.0f} rows/s)".format(
+                rows, elapsed, rows / elapsed if elapsed > 0 else 0
+            )
+        )
+
+        return rows
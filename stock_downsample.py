@@ -0,0 +1,187 @@
+# STOCK DOWNSAMPLE
+# Libraries
+import numpy as np
+
+
+# Methods of downsampling available for user
+DOWNSAMPLE_METHODS = ["lttb", "minmax", "none"]
+
+
+def target_points(width_inches, dpi):
+    """
+    Method responsible for returning number of points worth drawing
+    on figure (one point per pixel of width)
+    """
+    return int(width_inches * dpi)
+
+
+def target_candles(width_inches, dpi, candle_pixels=4):
+    """
+    Method responsible for returning number of candles worth drawing
+    on figure (each candle at least candle_pixels wide)
+    """
+    return target_points(width_inches, dpi) // candle_pixels
+
+
+def bucket_edges(n, n_buckets):
+    """
+    Method responsible for returning edges of buckets splitting
+    points between first and last one into equal parts
+    """
+    return np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+
+
+def lttb(x, y, n_out):
+    """
+    Method responsible for returning indices of points chosen with
+    Largest-Triangle-Three-Buckets algorithm:
+    - x - sorted values of x axis (as floats)
+    - y - values of y axis
+    - n_out - number of returned points (with first and last one)
+    """
+    n = len(x)
+
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = bucket_edges(n, n_out - 2)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Averages of all buckets computed at once (last point closes the series)
+    counts = ends - starts
+    avg_x = np.append(np.add.reduceat(x[:-1], starts) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], starts) / counts, y[-1])
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    selected = 0
+
+    # Each bucket depends on point chosen in previous one
+    for bucket in range(n_out - 2):
+        start, end = starts[bucket], ends[bucket]
+        next_x, next_y = avg_x[bucket + 1], avg_y[bucket + 1]
+
+        areas = np.abs(
+            (x[selected] - next_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (next_y - y[selected])
+        )
+
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+
+    return indices
+
+
+def minmax(x, y, n_out):
+    """
+    Method responsible for returning indices of points with minimal and maximal
+    value in each bucket (two points per bucket, in order of x axis)
+    """
+    n = len(x)
+
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    n_buckets = (n_out - 2) // 2
+    edges = bucket_edges(n, n_buckets)
+
+    starts, ends = edges[:-1], edges[1:]
+
+    # Buckets as rows of padded 2D array, so minimum and maximum of all buckets
+    # are found at once
+    positions = starts[:, None] + np.arange((ends - starts).max())[None, :]
+    padding = positions >= ends[:, None]
+    values = y[np.minimum(positions, n - 1)]
+
+    min_indices = starts + np.argmin(np.where(padding, np.inf, values), axis=1)
+    max_indices = starts + np.argmax(np.where(padding, -np.inf, values), axis=1)
+
+    indices = np.concatenate([[0], min_indices, max_indices, [n - 1]])
+
+    return np.unique(indices)
+
+
+def downsample(temp_df, n_out, method="lttb", column="last_price"):
+    """
+    Method responsible for returning data frame reduced to about n_out rows
+    chosen by values of column (rows with missing values are skipped)
+    - method - lttb, minmax or none
+    """
+    if method == "none" or len(temp_df) <= n_out:
+        return temp_df
+
+    temp_df = temp_df[temp_df[column].notna()]
+
+    x = temp_df["date"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    x = x.astype(np.float64)
+    y = temp_df[column].to_numpy(dtype=np.float64)
+
+    if method == "minmax":
+        indices = minmax(x, y, n_out)
+    else:
+        indices = lttb(x, y, n_out)
+
+    return temp_df.iloc[indices]
+
+
+def downsample_wide(wide_df, n_out, method="lttb"):
+    """
+    Method responsible for returning aligned series (one column per instrument,
+    dates as index) reduced to about n_out rows: rows chosen for each column
+    (with equal share of points) are kept for all of them
+    """
+    if method == "none" or len(wide_df) <= n_out:
+        return wide_df
+
+    x = wide_df.index.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    x = x.astype(np.float64)
+    n_column = max(n_out // max(wide_df.shape[1], 1), 4)
+
+    indices = []
+
+    for column in wide_df.columns:
+        y = wide_df[column].to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(y))
+
+        if method == "minmax":
+            chosen = minmax(x[valid], y[valid], n_column)
+        else:
+            chosen = lttb(x[valid], y[valid], n_column)
+
+        indices.append(valid[chosen])
+
+    return wide_df.iloc[np.unique(np.concatenate(indices))]
+
+
+def aggregate_ohlc(temp_df, n_out):
+    """
+    Method responsible for returning data frame with OHLC rows (open_price,
+    max_price, min_price, last_price, volume) merged into about n_out candles
+    of consecutive rows (candle has date of its first row, rows should have
+    all prices)
+    """
+    if len(temp_df) <= n_out:
+        return temp_df
+
+    # Starts of groups of consecutive rows
+    starts = np.unique(
+        np.linspace(0, len(temp_df), n_out, endpoint=False).astype(np.int64)
+    )
+    ends = np.append(starts[1:], len(temp_df)) - 1
+
+    volume = temp_df["volume"].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    aggregated_df = temp_df.iloc[starts].copy()
+    aggregated_df["open_price"] = temp_df["open_price"].to_numpy()[starts]
+    aggregated_df["max_price"] = np.maximum.reduceat(
+        temp_df["max_price"].to_numpy(dtype=np.float64), starts
+    )
+    aggregated_df["min_price"] = np.minimum.reduceat(
+        temp_df["min_price"].to_numpy(dtype=np.float64), starts
+    )
+    aggregated_df["last_price"] = temp_df["last_price"].to_numpy()[ends]
+    aggregated_df["volume"] = np.add.reduceat(np.nan_to_num(volume), starts)
+
+    return aggregated_df
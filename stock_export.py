@@ -0,0 +1,219 @@
+# STOCK EXPORT
+# Libraries
+import io
+import sys
+import csv
+import sqlite3
+import argparse
+import tempfile
+from datetime import date
+from stock_db import StockDatabase
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# Formats of export available for user
+EXPORT_FORMATS = ["csv", "parquet"]
+
+# Columns of exported rows
+EXPORT_COLUMNS = [
+    "instrument_name",
+    "currency_name",
+    "date",
+    "interval",
+    "open_price",
+    "max_price",
+    "min_price",
+    "last_price",
+    "volume",
+    "change",
+]
+
+# Selecting rows of instruments, interval and date range with sql statement
+# (template with condition of instrument names), read with covering index
+# instrument by instrument, so rows are not sorted
+SQL_SELECT_EXPORT = """select instrument_name, currency_name, date, interval, open_price, max_price, min_price, last_price, volume, change
+from stock
+left join instrument on instrument.instrument_id = stock.instrument_id
+left join currency on currency.currency_id = stock.currency_id
+where stock.instrument_id in (select instrument_id from instrument{0})
+    and stock.interval = ? and stock.date >= ? and stock.date <= ?
+order by stock.instrument_id, stock.date;"""
+
+# Size of parts of parquet file sent in response
+CHUNK_SIZE = 1 << 20
+
+
+def iter_batches(
+    db_path, instrument_names, interval, start_date, end_date, batch_size=10000
+):
+    """
+    Method responsible for yielding lists of exported rows read from cursor
+    in batches (only one batch is kept in memory):
+    - instrument_names - names of instruments (empty for all)
+    - interval - interval of data
+    - start_date, end_date - range of dates in YYYY-mm-dd (empty for open range)
+    - batch_size - number of rows fetched at once
+    """
+    condition = ""
+
+    if instrument_names:
+        condition = " where instrument_name in ({0})".format(
+            ", ".join("?" * len(instrument_names))
+        )
+
+    conn = sqlite3.connect("file:{0}?mode=ro".format(db_path), uri=True)
+
+    try:
+        c = conn.execute(
+            SQL_SELECT_EXPORT.format(condition),
+            (
+                *instrument_names,
+                interval,
+                start_date or "0000-00-00",
+                end_date or "9999-99-99",
+            ),
+        )
+
+        while True:
+            rows = c.fetchmany(batch_size)
+
+            if not rows:
+                break
+
+            yield rows
+    finally:
+        conn.close()
+
+
+def iter_csv(batches):
+    """
+    Method responsible for yielding CSV (bytes) with header and rows
+    of each batch
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    writer.writerow(EXPORT_COLUMNS)
+
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+        buffer.seek(0)
+        buffer.truncate()
+
+    yield buffer.getvalue().encode()
+
+
+def parquet_schema():
+    """
+    Method responsible for returning schema of exported parquet file
+    """
+    return pa.schema(
+        [
+            ("instrument_name", pa.string()),
+            ("currency_name", pa.string()),
+            ("date", pa.date32()),
+            ("interval", pa.string()),
+            ("open_price", pa.float64()),
+            ("max_price", pa.float64()),
+            ("min_price", pa.float64()),
+            ("last_price", pa.float64()),
+            ("volume", pa.int64()),
+            ("change", pa.float64()),
+        ]
+    )
+
+
+def write_parquet(batches, file):
+    """
+    Method responsible for writing parquet file with one row group per batch
+    - file - path or binary file object
+    Raises RuntimeError when pyarrow is not installed
+    """
+    if pq is None:
+        raise RuntimeError("Parquet export needs pyarrow package")
+
+    schema = parquet_schema()
+    writer = pq.ParquetWriter(file, schema)
+
+    try:
+        for rows in batches:
+            columns = [list(column) for column in zip(*rows)]
+            columns[2] = [date.fromisoformat(value) for value in columns[2]]
+
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [
+                        pa.array(column, type=field.type)
+                        for column, field in zip(columns, schema)
+                    ],
+                    schema=schema,
+                )
+            )
+    finally:
+        writer.close()
+
+
+def iter_parquet(batches):
+    """
+    Method responsible for yielding parquet file (bytes) in parts
+    (file is written to temporary file first, as its footer comes last)
+    """
+    with tempfile.TemporaryFile() as file:
+        write_parquet(batches, file)
+        file.seek(0)
+
+        while True:
+            chunk = file.read(CHUNK_SIZE)
+
+            if not chunk:
+                break
+
+            yield chunk
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Exporting series from database to CSV or parquet file"
+    )
+    parser.add_argument("--db", default="stock_prices.db")
+    parser.add_argument("--instruments", nargs="*", default=[])
+    parser.add_argument("--interval", default="Daily")
+    parser.add_argument("--start", default="")
+    parser.add_argument("--end", default="")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--output", default="-")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    # Migrating db to current schema (e.g. ISO dates)
+    StockDatabase(args.db).migrate()
+
+    batches = iter_batches(
+        args.db,
+        args.instruments,
+        args.interval,
+        args.start,
+        args.end,
+        batch_size=args.batch_size,
+    )
+
+    if args.format == "parquet":
+        if args.output == "-":
+            parser.error("Parquet export needs --output file")
+
+        write_parquet(batches, args.output)
+    elif args.output == "-":
+        for chunk in iter_csv(batches):
+            sys.stdout.buffer.write(chunk)
+    else:
+        with open(args.output, "wb") as file:
+            for chunk in iter_csv(batches):
+                file.write(chunk)
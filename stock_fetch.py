@@ -0,0 +1,471 @@
+# STOCK FETCH
+# Libraries
+import io
+import time
+import urllib.parse
+import urllib.request
+import pandas as pd
+from datetime import datetime
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from stock_fixture_server import FIXTURE_HEADER
+from stock_metrics import metrics
+
+# Classes of elements with currency of instrument (both types of site)
+CURRENCY_CLASSES = ["instrument-metadata_currency__XER9q", "ml-1.5 font-bold"]
+
+# Attributes of tables with historical data (both types of site)
+TABLE_ATTRIBUTES = [
+    {"data-test": "historical-data-table"},
+    {"class": "w-full text-xs leading-4 overflow-x-auto freeze-column-w-1"},
+]
+
+# Seconds of stages of scraping one job
+SCRAPE_STAGE_SECONDS = metrics.histogram(
+    "stock_scrape_stage_seconds",
+    "Seconds of stages of scraping one job (page_load, interval_select, "
+    "date_pick, table_read, read_html)",
+)
+
+
+def parse_table(html, attrs=None):
+    """
+    Method responsible for parsing table with historical data from html
+    (decimal commas are changed to dots)
+    - html - html of table or whole page
+    - attrs - attributes of table to find in html
+    """
+    with SCRAPE_STAGE_SECONDS.time(stage="read_html"):
+        return pd.read_html(io.StringIO(html.replace(",", ".")), attrs=attrs)[0]
+
+
+def parse_page_table(html):
+    """
+    Method responsible for finding and parsing table with historical data
+    in html of whole page
+    """
+    for attrs in TABLE_ATTRIBUTES:
+        if all('{0}="{1}"'.format(*item) in html for item in attrs.items()):
+            return parse_table(html, attrs=attrs)
+
+    raise ValueError("Table with historical data not found")
+
+
+class CurrencyParser(HTMLParser):
+    def __init__(self) -> None:
+        """
+        Parser collecting texts from element with currency of instrument
+        """
+        super().__init__()
+        self.depth = 0
+        self.texts = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.depth:
+            self.depth += 1
+        elif dict(attrs).get("class") in CURRENCY_CLASSES:
+            self.depth = 1
+
+    def handle_endtag(self, tag):
+        if self.depth:
+            self.depth -= 1
+
+    def handle_data(self, data):
+        if self.depth and data.strip():
+            self.texts.append(data.strip())
+
+
+def extract_currency(html):
+    """
+    Method responsible for extracting currency of instrument from html
+    of currency element or whole page (last text of element, e.g. USD)
+    """
+    parser = CurrencyParser()
+    parser.feed(html)
+    parser.close()
+
+    if not parser.texts:
+        raise ValueError("Currency of instrument not found")
+
+    return parser.texts[-1]
+
+
+def build_stock_df(table_df, instrument_name, currency, interval_name):
+    """
+    Method responsible for adding instrument name, its currency and interval
+    to data frame with historical data
+    """
+    table_df.insert(0, "Instrument", instrument_name)
+    table_df.insert(1, "Currency", currency)
+    table_df.insert(2, "Interval", interval_name)
+
+    return table_df
+
+
+class FetchBackend:
+    """
+    Interface of backends getting historical data of instruments
+    """
+
+    # Seconds of waiting between jobs in fetch_many
+    delay = 0
+
+    # CircuitBreaker skipping instruments after repeated failures in fetch_many
+    # (None raises first error)
+    breaker = None
+
+    def open(self):
+        """
+        Method responsible for preparing backend before fetching
+        """
+
+    def close(self):
+        """
+        Method responsible for releasing resources of backend
+        """
+
+    def fetch(self, **job):
+        """
+        Method responsible for returning data frame with historical data
+        for job (keyword arguments of StockScrapper.get_data)
+        """
+        raise NotImplementedError
+
+    def fetch_many(self, jobs):
+        """
+        Method responsible for fetching jobs one by one and yielding
+        (job, data frame) as soon as each job is done
+        (failed and skipped jobs are recorded in breaker)
+        """
+        for job in self.allowed_jobs(jobs):
+            print(
+                "Getting data for instrument: {0} with interval: {1}".format(
+                    job["instrument_name"], job["interval_name"]
+                )
+            )
+
+            try:
+                temp_df = self.fetch(**job)
+            except Exception as e:
+                if self.breaker is None:
+                    raise
+
+                self.record_failure(job, e)
+            else:
+                if self.breaker is not None:
+                    self.breaker.record_success(job["instrument_name"])
+
+                yield job, temp_df
+
+            time.sleep(self.delay)
+
+    def allowed_jobs(self, jobs):
+        """
+        Method responsible for yielding jobs of instruments allowed by breaker
+        (jobs of skipped instruments are recorded in breaker)
+        """
+        for job in jobs:
+            if self.breaker is None or self.breaker.allow(job["instrument_name"]):
+                yield job
+            else:
+                self.breaker.record_skip(job)
+
+    def record_failure(self, job, error):
+        """
+        Method responsible for reporting failed job and recording it in breaker
+        """
+        print(
+            "Failed to get data for instrument: {0} with interval: {1} ({2!r})".format(
+                job["instrument_name"], job["interval_name"], error
+            )
+        )
+        self.breaker.record_failure(job, error)
+
+
+class SeleniumBackend(FetchBackend):
+    # Seconds of waiting between jobs in fetch_many
+    delay = 5
+
+    def __init__(self, scrapper, headless=False, breaker=None) -> None:
+        """
+        Backend clicking through site in chrome browser
+        - scrapper - StockScrapper creating driver and getting data
+        - headless - run browser without window
+        - breaker - CircuitBreaker skipping instruments after repeated failures
+        """
+        self.scrapper = scrapper
+        self.headless = headless
+        self.breaker = breaker
+        self.driver = None
+
+    def open(self):
+        self.driver = self.scrapper.create_driver(headless=self.headless)
+
+    def close(self):
+        if self.driver is not None:
+            self.driver.quit()
+            self.driver = None
+
+    def fetch(self, **job):
+        return self.scrapper.get_data(driver=self.driver, **job)
+
+
+class PeriodNotCovered(LookupError):
+    """
+    Error raised when page of instrument has no rows of whole requested period
+    (site renders only the latest daily rows, older ones are loaded
+    with JavaScript)
+    """
+
+
+def download_page(url, timeout):
+    """
+    Method responsible for downloading html of page and returning
+    (html, headers of response)
+    """
+    request = urllib.request.Request(
+        url, headers={"User-Agent": "Mozilla/5.0", "Accept-Language": "pl"}
+    )
+
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        html = response.read().decode(response.headers.get_content_charset() or "utf-8")
+
+        return html, response.headers
+
+
+def rows_of_period(table_df, start_date, end_date):
+    """
+    Method responsible for keeping only rows of table from period
+    (dates in first column)
+    """
+    dates = pd.to_datetime(table_df.iloc[:, 0], format="%d.%m.%Y", errors="coerce")
+
+    return table_df[(dates >= start_date) & (dates <= end_date)].reset_index(drop=True)
+
+
+class FixtureHttpBackend(FetchBackend):
+    def __init__(
+        self,
+        url_template="{url}?interval={interval}&start_date={start}&end_date={end}",
+        concurrency=4,
+        timeout=30,
+        retry_policy=None,
+        breaker=None,
+    ) -> None:
+        """
+        Backend requesting saved pages with historical data from fixture server
+        (stock_fixture_server.py) directly, without browser, e.g. for tests
+        and benchmarks of pipeline. Query of interval and dates is understood
+        only by fixture server, so responses of other servers are refused
+        (real site is scraped with SeleniumBackend or PageHttpBackend)
+        - url_template - template of requested url with url of instrument,
+          interval and dates (dd.mm.YYYY)
+        - concurrency - number of requests running at once (in threads)
+          in fetch_many
+        - timeout - timeout of one request in seconds
+        - retry_policy - RetryPolicy of downloading page (None tries once)
+        - breaker - CircuitBreaker skipping instruments after repeated failures
+        """
+        self.url_template = url_template
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.breaker = breaker
+
+    def get_page(self, url):
+        """
+        Method responsible for downloading html of page from fixture server
+        Raises ValueError for response of other server
+        """
+        html, headers = download_page(url, self.timeout)
+
+        if headers.get(FIXTURE_HEADER) is None:
+            raise ValueError("{0} is not served by stock_fixture_server.py".format(url))
+
+        return html
+
+    def fetch(
+        self,
+        instrument_name,
+        url,
+        interval_name,
+        start_year=datetime.today().year - 10,
+        end_year=datetime.today().year,
+        start_date=None,
+        end_date=None,
+    ):
+        """
+        Method responsible for getting data frame with historical data
+        (same arguments as StockScrapper.get_data, without driver)
+        """
+        start_date = start_date or datetime(start_year, 1, 1)
+        end_date = end_date or datetime(end_year, 12, 31)
+
+        page_url = self.url_template.format(
+            url=url,
+            interval=urllib.parse.quote(interval_name),
+            start=start_date.strftime("%d.%m.%Y"),
+            end=end_date.strftime("%d.%m.%Y"),
+        )
+
+        with SCRAPE_STAGE_SECONDS.time(stage="page_load"):
+            if self.retry_policy is None:
+                html = self.get_page(page_url)
+            else:
+                html = self.retry_policy.run(
+                    "page",
+                    [lambda: self.get_page(page_url)],
+                    self.retry_policy.start_job(),
+                )
+
+        # Keeping only rows from requested period
+        temp_stock_df = rows_of_period(parse_page_table(html), start_date, end_date)
+
+        return build_stock_df(
+            temp_stock_df, instrument_name, extract_currency(html), interval_name
+        )
+
+    def fetch_many(self, jobs):
+        """
+        Method responsible for fetching jobs concurrently in threads and yielding
+        (job, data frame) group by group (only one group of concurrent
+        jobs is kept in memory, failed and skipped jobs are recorded in breaker)
+        """
+        jobs = iter(jobs)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                # Next group is taken only when previous one is done
+                group = list(islice(jobs, self.concurrency))
+
+                if not group:
+                    break
+
+                # Breaker is checked before each group (with failures of previous ones)
+                group = list(self.allowed_jobs(group))
+                futures = []
+
+                for job in group:
+                    print(
+                        "Getting data for instrument: {0} with interval: {1}".format(
+                            job["instrument_name"], job["interval_name"]
+                        )
+                    )
+                    futures.append(executor.submit(self.fetch, **job))
+
+                for job, future in zip(group, futures):
+                    try:
+                        temp_df = future.result()
+                    except Exception as e:
+                        if self.breaker is None:
+                            raise
+
+                        self.record_failure(job, e)
+                        continue
+
+                    if self.breaker is not None:
+                        self.breaker.record_success(job["instrument_name"])
+
+                    yield job, temp_df
+
+
+class PageHttpBackend(FetchBackend):
+    # Seconds of waiting between jobs in fetch_many
+    delay = 1
+
+    def __init__(
+        self, scrapper=None, headless=False, timeout=30, retry_policy=None, breaker=None
+    ) -> None:
+        """
+        Backend downloading pages of instruments from site without browser
+        and parsing table with the latest daily rows rendered on server (e.g. for
+        incremental Daily refreshes). Jobs with period not on page (other
+        intervals or older dates) are got with browser
+        - scrapper - StockScrapper getting data of other jobs with browser
+          (None raises PeriodNotCovered for them)
+        - headless - run browser without window
+        - timeout - timeout of one request in seconds
+        - retry_policy - RetryPolicy of downloading page (None tries once)
+        - breaker - CircuitBreaker skipping instruments after repeated failures
+        """
+        self.scrapper = scrapper
+        self.headless = headless
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.breaker = breaker
+
+        # Browser opened only when first job is not covered by page
+        self.browser = None
+
+    def close(self):
+        if self.browser is not None:
+            self.browser.close()
+            self.browser = None
+
+    def fetch_page(
+        self,
+        instrument_name,
+        url,
+        interval_name,
+        start_year=datetime.today().year - 10,
+        end_year=datetime.today().year,
+        start_date=None,
+        end_date=None,
+    ):
+        """
+        Method responsible for getting data frame with historical data from
+        page of instrument (same arguments as StockScrapper.get_data,
+        without driver)
+        Raises PeriodNotCovered when page has no rows of whole period
+        """
+        if interval_name != "Daily" or start_date is None:
+            raise PeriodNotCovered(
+                "Page has only the latest daily rows, not {0} rows of {1}".format(
+                    interval_name, instrument_name
+                )
+            )
+
+        end_date = end_date or datetime(end_year, 12, 31)
+
+        with SCRAPE_STAGE_SECONDS.time(stage="page_load"):
+            if self.retry_policy is None:
+                html, _ = download_page(url, self.timeout)
+            else:
+                html, _ = self.retry_policy.run(
+                    "page",
+                    [lambda: download_page(url, self.timeout)],
+                    self.retry_policy.start_job(),
+                )
+
+        table_df = parse_page_table(html)
+        dates = pd.to_datetime(table_df.iloc[:, 0], format="%d.%m.%Y", errors="coerce")
+
+        # Rows before start of period are needed to be sure nothing is missing
+        if not (dates <= start_date).any():
+            raise PeriodNotCovered(
+                "Page of {0} starts after {1:%d.%m.%Y}".format(
+                    instrument_name, start_date
+                )
+            )
+
+        return build_stock_df(
+            rows_of_period(table_df, start_date, end_date),
+            instrument_name,
+            extract_currency(html),
+            interval_name,
+        )
+
+    def fetch(self, **job):
+        try:
+            return self.fetch_page(**job)
+        except PeriodNotCovered:
+            if self.scrapper is None:
+                raise
+
+        if self.browser is None:
+            browser = SeleniumBackend(scrapper=self.scrapper, headless=self.headless)
+            browser.open()
+            self.browser = browser
+
+        return self.browser.fetch(**job)
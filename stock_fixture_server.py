@@ -0,0 +1,85 @@
+# STOCK FIXTURE SERVER
+# Libraries
+import os
+import argparse
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Header marking responses of fixture server (backend of fixture pages
+# refuses responses of other servers)
+FIXTURE_HEADER = "X-Stock-Fixture"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    # Directory with saved html pages
+    directory = "fixtures"
+
+    def do_GET(self):
+        """
+        Method responsible for serving saved page of instrument, e.g.
+        /currencies/eur-usd-historical-data?interval=Weekly serves
+        eur-usd-historical-data-weekly.html (pages of other intervals than
+        Daily are not replaced with daily page, so their rows are not stored
+        as rows of other interval)
+        """
+        url = urllib.parse.urlsplit(self.path)
+        page_name = url.path.rstrip("/").split("/")[-1]
+        interval = urllib.parse.parse_qs(url.query).get("interval", ["Daily"])[0]
+
+        if interval in ("", "Daily"):
+            file_names = [
+                "{0}-daily.html".format(page_name),
+                "{0}.html".format(page_name),
+            ]
+        else:
+            file_names = ["{0}-{1}.html".format(page_name, interval.lower())]
+
+        for file_name in file_names:
+            path = os.path.join(self.directory, file_name)
+
+            if os.path.isfile(path):
+                with open(path, "rb") as file:
+                    page = file.read()
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header(FIXTURE_HEADER, "1")
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+                return
+
+        self.send_error(404, "Fixture not found")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(directory="fixtures", host="127.0.0.1", port=0):
+    """
+    Method responsible for starting server with saved pages in background thread
+    and returning server (server.server_address has used port)
+    """
+    handler = type("Handler", (FixtureHandler,), {"directory": directory})
+    server = ThreadingHTTPServer((host, port), handler)
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Local stand-in of site serving saved historical data pages"
+    )
+    parser.add_argument("--directory", default="fixtures")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    handler = type("Handler", (FixtureHandler,), {"directory": args.directory})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+
+    print("Serving {0} on http://{1}:{2}/".format(args.directory, args.host, args.port))
+    server.serve_forever()
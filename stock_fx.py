@@ -0,0 +1,293 @@
+# STOCK FX
+# Libraries
+import re
+from collections import deque
+import numpy as np
+import pandas as pd
+from stock_cache import LRUCache
+from stock_store import SERIES_COLUMNS, SeriesPartition
+
+# Names of instruments with exchange rates in form base-quote,
+# e.g. eur-usd (price of 1 EUR in USD)
+FX_PAIR_PATTERN = re.compile(r"^([a-z]{3})-([a-z]{3})$")
+
+# Columns with prices converted to other currency (volume stays the same)
+PRICE_COLUMNS = ["last_price", "open_price", "max_price", "min_price"]
+
+
+def fx_pairs(instrument_names):
+    """
+    Method responsible for returning instruments with exchange rates as
+    {(base currency, quote currency): instrument name}
+    """
+    pairs = {}
+
+    for instrument_name in instrument_names:
+        match = FX_PAIR_PATTERN.match(instrument_name)
+
+        if match is not None:
+            pairs[(match.group(1).upper(), match.group(2).upper())] = instrument_name
+
+    return pairs
+
+
+def conversion_path(pairs, source, target):
+    """
+    Method responsible for returning shortest list of (instrument name, exponent)
+    converting prices from source to target currency, e.g. PLN to USD with
+    [("eur-pln", -1), ("eur-usd", 1)] (prices are divided by rates with
+    exponent -1 and multiplied by rates with exponent 1)
+    Raises ValueError when currencies are not connected by exchange rates
+    """
+    # Edges of graph of currencies in both directions of each pair
+    edges = {}
+
+    for (base, quote), instrument_name in pairs.items():
+        edges.setdefault(quote, []).append((base, instrument_name, -1))
+        edges.setdefault(base, []).append((quote, instrument_name, 1))
+
+    # Breadth-first search from source currency
+    paths = {source: []}
+    currencies = deque([source])
+
+    while currencies:
+        currency = currencies.popleft()
+
+        if currency == target:
+            return paths[currency]
+
+        for next_currency, instrument_name, exponent in edges.get(currency, []):
+            if next_currency not in paths:
+                paths[next_currency] = paths[currency] + [(instrument_name, exponent)]
+                currencies.append(next_currency)
+
+    raise ValueError("No exchange rate from {0} to {1}".format(source, target))
+
+
+def asof_rates(fx_dates, fx_values, dates):
+    """
+    Method responsible for returning rates valid at dates (last rate at or
+    before each date, NaN before first rate) with binary search:
+    - fx_dates - sorted array with dates of rates
+    - fx_values - array with rates
+    - dates - array with dates of converted series
+    """
+    if len(fx_values) == 0:
+        return np.full(len(dates), np.nan)
+
+    positions = np.searchsorted(fx_dates, dates, side="right") - 1
+
+    return np.where(positions >= 0, fx_values[np.maximum(positions, 0)], np.nan)
+
+
+def convert_partition(partition, rates, currency_name):
+    """
+    Method responsible for returning partition with prices multiplied by rates
+    and change computed again from converted last prices
+    """
+    columns = dict(partition.columns)
+
+    for column in PRICE_COLUMNS:
+        columns[column] = columns[column].astype(np.float64) * rates
+
+    last_price = columns["last_price"]
+    change = np.full(len(last_price), np.nan)
+    change[1:] = np.round((last_price[1:] / last_price[:-1] - 1) * 100, 2)
+    columns["change"] = change
+
+    return SeriesPartition(currency_name, partition.dates, columns)
+
+
+def empty_series():
+    """
+    Method responsible for returning data frame of series without rows
+    """
+    return pd.DataFrame(columns=["date", "currency_name"] + SERIES_COLUMNS)
+
+
+class CurrencyConverter:
+    def __init__(self, max_size=256) -> None:
+        """
+        Converter of series to other currency with exchange rates stored as
+        instruments (e.g. eur-usd), cached per instrument, interval and currency
+        - max_size - maximal number of cached converted series
+        """
+        self.cache = LRUCache(max_size=max_size)
+
+        # Number of converted series (without cache)
+        self.conversions = 0
+
+    @staticmethod
+    def pairs(store):
+        """
+        Method responsible for returning exchange rates available in store
+        """
+        return fx_pairs(store.instrument_names())
+
+    def currencies(self, store):
+        """
+        Method responsible for returning sorted list of currencies of exchange
+        rates in store
+        """
+        return sorted({currency for pair in self.pairs(store) for currency in pair})
+
+    def rates_version(self, store):
+        """
+        Method responsible for returning versions of exchange rates in store
+        (part of cache keys, so refresh of rates converts series again)
+        """
+        return tuple(
+            (instrument_name, store.series_version(instrument_name))
+            for instrument_name in sorted(self.pairs(store).values())
+        )
+
+    def rates_series(self, store, instrument_name, interval):
+        """
+        Method responsible for returning (dates, rates) of exchange rate
+        in interval (daily rates when instrument has no such interval)
+        """
+        for rates_interval in (interval, "Daily"):
+            partition = store.get_partition(instrument_name, rates_interval)
+
+            if partition is not None:
+                values = partition.columns["last_price"].astype(np.float64)
+                found = np.isfinite(values)
+
+                if found.any():
+                    return partition.dates[found], values[found]
+
+        return np.array([], dtype="datetime64[ns]"), np.array([])
+
+    def convert(self, store, stock_name, interval, currency_name):
+        """
+        Method responsible for returning partition with whole series of
+        instrument in currency (None if series does not exist)
+        Raises ValueError when there is no exchange rate to currency
+        """
+        key = (
+            stock_name,
+            interval,
+            currency_name,
+            store.series_version(stock_name),
+            self.rates_version(store),
+        )
+        partition = self.cache.get(key)
+
+        if partition is not None:
+            return partition
+
+        partition = store.get_partition(stock_name, interval)
+
+        if partition is None:
+            return None
+
+        source = partition.currency_name
+
+        if source != currency_name:
+            # Product of rates on path between currencies, joined by dates
+            rates = np.ones(len(partition))
+
+            for instrument_name, exponent in conversion_path(
+                self.pairs(store), source, currency_name
+            ):
+                fx_dates, fx_values = self.rates_series(
+                    store, instrument_name, interval
+                )
+                rates *= asof_rates(fx_dates, fx_values, partition.dates) ** exponent
+
+            partition = convert_partition(partition, rates, currency_name)
+            self.conversions += 1
+
+        self.cache.put(key, partition)
+
+        return partition
+
+    def view(self, store, currency_name):
+        """
+        Method responsible for returning store with series of store
+        in currency
+        """
+        return ConvertedStore(store, self, currency_name)
+
+    def stats(self):
+        """
+        Method responsible for returning statistics of converter
+        """
+        stats = self.cache.stats()
+        stats["conversions"] = self.conversions
+
+        return stats
+
+
+class ConvertedStore:
+    def __init__(self, store, converter, currency_name) -> None:
+        """
+        Store with series of other store in one currency (read like other stores)
+        - store - store with series in their own currencies
+        - converter - converter with cached converted series
+        - currency_name - currency of returned series
+        """
+        self.store = store
+        self.converter = converter
+        self.currency_name = currency_name
+
+    def instrument_names(self):
+        """
+        Method responsible for returning sorted list of instruments in store
+        """
+        return self.store.instrument_names()
+
+    def series_version(self, stock_name):
+        """
+        Method responsible for returning version of instrument data in currency
+        (depends also on versions of exchange rates)
+        """
+        return "{0}|{1}|{2}".format(
+            self.store.series_version(stock_name),
+            self.currency_name,
+            ",".join(
+                "{0}:{1}".format(instrument_name, version)
+                for instrument_name, version in self.converter.rates_version(self.store)
+            ),
+        )
+
+    def get_partition(self, stock_name, interval):
+        """
+        Method responsible for returning partition of instrument and interval
+        in currency of store (None if series does not exist)
+        """
+        return self.converter.convert(
+            self.store, stock_name, interval, self.currency_name
+        )
+
+    def lookup(self, stock_name, start_date, end_date, interval):
+        """
+        Method responsible for returning data frame with selection of:
+        - Name of stock
+        - Lower date
+        - Upper date
+        - Interval (daily, weekly or monthly)
+        in currency of store
+        Raises ValueError when there is no exchange rate to currency
+        """
+        partition = self.get_partition(stock_name, interval)
+
+        if partition is None:
+            return empty_series()
+
+        lower, upper = partition.bounds(start_date, end_date)
+
+        return partition.frame(lower, upper)
+
+    def lookup_many(self, stock_names, start_date, end_date, interval):
+        """
+        Method responsible for returning one data frame with selections of
+        several stocks (with instrument_name column) in currency of store
+        """
+        frames = []
+
+        for stock_name in stock_names:
+            temp_df = self.lookup(stock_name, start_date, end_date, interval)
+            frames.append(temp_df.assign(instrument_name=stock_name))
+
+        return pd.concat(frames, ignore_index=True)
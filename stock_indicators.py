@@ -0,0 +1,278 @@
+# STOCK INDICATORS
+# Libraries
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from stock_cache import LRUCache
+
+
+def window_tail(values, state, window):
+    """
+    Method responsible for joining last values of previous computation
+    (state) with new values and returning (joined values, new state)
+    """
+    tail = np.empty(0) if state is None else state
+    joined = np.concatenate([tail, values])
+
+    return joined, joined[max(len(joined) - (window - 1), 0) :]
+
+
+def rolling_windows(joined, window, skip):
+    """
+    Method responsible for returning full windows ending at each of new values
+    (after skip values from state) and positions of values with full window
+    """
+    n = len(joined) - skip
+    positions = np.arange(n) + skip >= window - 1
+
+    if len(joined) < window:
+        return np.empty((0, window)), positions
+
+    windows = sliding_window_view(joined, window)
+
+    return windows[max(skip - window + 1, 0) :], positions
+
+
+def ewm_continued(values, start, alpha):
+    """
+    Method responsible for exponentially weighted mean continued from start
+    value (None starts from first value)
+    """
+    if start is None:
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+    joined = np.concatenate([[start], values])
+
+    return pd.Series(joined).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+
+def sma(values, state=None, window=20):
+    """
+    Method responsible for computing simple moving average
+    - state - last window - 1 values of previous computation
+    """
+    joined, new_state = window_tail(values, state, window)
+    windows, positions = rolling_windows(joined, window, len(joined) - len(values))
+
+    result = np.full(len(values), np.nan)
+    result[positions] = windows.mean(axis=1)
+
+    return {"SMA({0})".format(window): result}, new_state
+
+
+def ema(values, state=None, span=20):
+    """
+    Method responsible for computing exponential moving average
+    - state - last average of previous computation
+    """
+    result = ewm_continued(values, state, 2 / (span + 1))
+
+    return {"EMA({0})".format(span): result}, result[-1] if len(result) else state
+
+
+def bollinger(values, state=None, window=20, width=2.0):
+    """
+    Method responsible for computing Bollinger bands (moving average
+    and bands width standard deviations away from it)
+    - state - last window - 1 values of previous computation
+    """
+    joined, new_state = window_tail(values, state, window)
+    windows, positions = rolling_windows(joined, window, len(joined) - len(values))
+
+    middle = np.full(len(values), np.nan)
+    deviation = np.full(len(values), np.nan)
+    middle[positions] = windows.mean(axis=1)
+    deviation[positions] = windows.std(axis=1)
+
+    label = "BB({0}, {1:g})".format(window, width)
+
+    return {
+        "{0} upper".format(label): middle + width * deviation,
+        "{0} middle".format(label): middle,
+        "{0} lower".format(label): middle - width * deviation,
+    }, new_state
+
+
+def rsi(values, state=None, period=14):
+    """
+    Method responsible for computing relative strength index
+    with Wilder's smoothing of gains and losses
+    - state - (number of values, last value, average gain, average loss)
+      of previous computation
+    """
+    if state is None:
+        count, last, avg_gain, avg_loss = 0, np.nan, None, None
+    else:
+        count, last, avg_gain, avg_loss = state
+
+    if len(values) == 0:
+        return {"RSI({0})".format(period): np.empty(0)}, state
+
+    deltas = np.diff(np.concatenate([[last], values]))
+
+    # First value has no change (it starts series)
+    if count == 0:
+        deltas = deltas[1:]
+
+    gains = ewm_continued(np.clip(deltas, 0, None), avg_gain, 1 / period)
+    losses = ewm_continued(np.clip(-deltas, 0, None), avg_loss, 1 / period)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.where(losses == 0, 100.0, 100 - 100 / (1 + gains / losses))
+
+    if count == 0:
+        result = np.concatenate([[np.nan], result])
+
+    # Values without full period of changes are skipped
+    result[np.arange(len(values)) + count < period] = np.nan
+
+    new_state = (
+        count + len(values),
+        values[-1],
+        gains[-1] if len(gains) else avg_gain,
+        losses[-1] if len(losses) else avg_loss,
+    )
+
+    return {"RSI({0})".format(period): result}, new_state
+
+
+def drawdown(values, state=None):
+    """
+    Method responsible for computing drawdown (%) from running maximum
+    and maximal drawdown up to each value
+    - state - (running maximum, maximal drawdown) of previous computation
+    """
+    peak, max_drawdown = (-np.inf, 0.0) if state is None else state
+
+    peaks = np.maximum.accumulate(np.concatenate([[peak], values]))[1:]
+    result = (values / peaks - 1) * 100
+    max_result = np.minimum.accumulate(np.concatenate([[max_drawdown], result]))[1:]
+
+    if len(values):
+        state = (peaks[-1], max_result[-1])
+
+    return {"Drawdown": result, "Max drawdown": max_result}, state
+
+
+# Indicators available for user with default parameters
+# (in order of positional parameters, e.g. sma:50 or bollinger:20:2.5)
+INDICATORS = {
+    "sma": (sma, {"window": 20}),
+    "ema": (ema, {"span": 20}),
+    "bollinger": (bollinger, {"window": 20, "width": 2.0}),
+    "rsi": (rsi, {"period": 14}),
+    "drawdown": (drawdown, {}),
+}
+
+# Indicators drawn on own panel below prices (with title of panel)
+INDICATOR_PANELS = {
+    "rsi": "RSI",
+    "drawdown": "Drawdown (%)",
+}
+
+
+def parse_indicator(indicator):
+    """
+    Method responsible for returning (name, parameters) from selection of user
+    in form name[:parameter[:parameter]] (e.g. sma:50)
+    Raises ValueError for unknown indicator or wrong parameters
+    """
+    name, *values = indicator.split(":")
+
+    if name not in INDICATORS:
+        raise ValueError("Unknown indicator: {0}".format(name))
+
+    params = dict(INDICATORS[name][1])
+
+    if len(values) > len(params):
+        raise ValueError("Too many parameters of indicator: {0}".format(indicator))
+
+    for param, value in zip(list(params), values):
+        params[param] = type(params[param])(value)
+
+        if params[param] <= 0:
+            raise ValueError("Wrong parameter of indicator: {0}".format(indicator))
+
+    return name, params
+
+
+class IndicatorSeries:
+    def __init__(self, dates, last_value, columns, state) -> None:
+        # Dates of series used in computation
+        self.dates = dates
+
+        # Last value of series (to notice changed data)
+        self.last_value = last_value
+
+        # Arrays with values of indicator aligned with dates
+        self.columns = columns
+
+        # State of computation at the end of series (to extend it)
+        self.state = state
+
+
+class IndicatorEngine:
+    def __init__(self, max_size=256) -> None:
+        """
+        Engine computing indicators of series, cached per series and parameters
+        - max_size - maximal number of cached indicator series
+        """
+        self.cache = LRUCache(max_size=max_size)
+
+        # Number of computations over whole history and extensions of cached ones
+        self.full_computations = 0
+        self.extensions = 0
+
+    def compute(self, series_key, indicator, dates, values):
+        """
+        Method responsible for returning indicator of whole series:
+        - series_key - (instrument_name, interval, currency_name)
+        - indicator - selection of user (e.g. sma:50)
+        - dates - sorted array with dates of series
+        - values - array with values of series
+        If cached series is beginning of current one, indicator is extended
+        with new values only
+        """
+        name, params = parse_indicator(indicator)
+        function = INDICATORS[name][0]
+
+        key = (series_key, name, tuple(sorted(params.items())))
+        cached = self.cache.get(key)
+        n = 0 if cached is None else len(cached.dates)
+
+        if (
+            cached is not None
+            and 0 < n <= len(dates)
+            and dates[n - 1] == cached.dates[-1]
+            and values[n - 1] == cached.last_value
+        ):
+            if n == len(dates):
+                return cached
+
+            # Extending from state at the end of cached series
+            new_columns, state = function(values[n:], cached.state, **params)
+            columns = {
+                column: np.concatenate([cached.columns[column], new_columns[column]])
+                for column in cached.columns
+            }
+            self.extensions += 1
+        else:
+            columns, state = function(values, None, **params)
+            self.full_computations += 1
+
+        result = IndicatorSeries(
+            dates, values[-1] if len(values) else None, columns, state
+        )
+        self.cache.put(key, result)
+
+        return result
+
+    def stats(self):
+        """
+        Method responsible for returning statistics of engine
+        """
+        stats = self.cache.stats()
+        stats["full_computations"] = self.full_computations
+        stats["extensions"] = self.extensions
+
+        return stats
@@ -0,0 +1,384 @@
+# STOCK METRICS
+# Libraries
+import io
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of histogram buckets
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+
+def label_key(labels):
+    """
+    Method responsible for returning hashable key of labels (sorted by name)
+    """
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def format_labels(key, extra=()):
+    """
+    Method responsible for formatting labels in Prometheus text format,
+    e.g. {stage="render",le="0.1"}
+    """
+    labels = list(key) + list(extra)
+
+    if not labels:
+        return ""
+
+    return "{{{0}}}".format(
+        ",".join(
+            '{0}="{1}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"'))
+            for name, value in labels
+        )
+    )
+
+
+def format_value(value):
+    """
+    Method responsible for formatting number in Prometheus text format
+    """
+    if value == float("inf"):
+        return "+Inf"
+
+    return "{0:g}".format(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    # Type of metric in Prometheus text format
+    kind = None
+
+    def __init__(self, name, description, lock) -> None:
+        """
+        Metric with series of values per labels
+        - name - name of metric
+        - description - description of metric
+        - lock - lock of registry
+        """
+        self.name = name
+        self.description = description
+        self.lock = lock
+
+        # Values per key of labels
+        self.series = {}
+
+    def samples(self):
+        """
+        Method responsible for returning list of (name suffix, label key,
+        extra labels, value) of metric in Prometheus text format
+        """
+        return [("", key, (), value) for key, value in self.series.items()]
+
+    def state(self):
+        """
+        Method responsible for returning values of metric as json-compatible list
+        """
+        return [
+            {"labels": dict(key), "value": value} for key, value in self.series.items()
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, value=1, **labels):
+        """
+        Method responsible for increasing counter of labels
+        """
+        key = label_key(labels)
+
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + value
+
+    def merge(self, state):
+        for item in state:
+            self.inc(item["value"], **item["labels"])
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        """
+        Method responsible for setting current value of labels
+        """
+        with self.lock:
+            self.series[label_key(labels)] = value
+
+    def merge(self, state):
+        for item in state:
+            self.set(item["value"], **item["labels"])
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, lock, buckets=DEFAULT_BUCKETS) -> None:
+        """
+        Histogram of observed values (e.g. seconds of stage)
+        - buckets - upper bounds of buckets
+        """
+        super().__init__(name, description, lock)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """
+        Method responsible for counting value in buckets of labels
+        """
+        key = label_key(labels)
+
+        with self.lock:
+            series = self.series.get(key)
+
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self.series[key] = series
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][index] += 1
+                    break
+
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Method responsible for observing seconds of block of code
+        """
+        start_time = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def samples(self):
+        samples = []
+
+        for key, series in self.series.items():
+            # Buckets are cumulative in Prometheus text format
+            cumulative = 0
+
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                samples.append(
+                    ("_bucket", key, (("le", format_value(bound)),), cumulative)
+                )
+
+            samples.append(("_bucket", key, (("le", "+Inf"),), series["count"]))
+            samples.append(("_sum", key, (), series["sum"]))
+            samples.append(("_count", key, (), series["count"]))
+
+        return samples
+
+    def state(self):
+        return [
+            {
+                "labels": dict(key),
+                "buckets": dict(zip(map(str, self.buckets), series["counts"])),
+                "sum": series["sum"],
+                "count": series["count"],
+            }
+            for key, series in self.series.items()
+        ]
+
+    def merge(self, state):
+        for item in state:
+            key = label_key(item["labels"])
+
+            with self.lock:
+                series = self.series.setdefault(
+                    key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                )
+
+                for index, bound in enumerate(self.buckets):
+                    series["counts"][index] += item["buckets"].get(str(bound), 0)
+
+                series["sum"] += item["sum"]
+                series["count"] += item["count"]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        """
+        Registry of metrics of process (exposed as Prometheus text or json)
+        """
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric_class, name, description, **kwargs):
+        """
+        Method responsible for returning metric with name (created if missing,
+        so modules can declare the same metric)
+        """
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = metric_class(
+                    name, description, self.lock, **kwargs
+                )
+
+            return self.metrics[name]
+
+    def counter(self, name, description):
+        return self.register(Counter, name, description)
+
+    def gauge(self, name, description):
+        return self.register(Gauge, name, description)
+
+    def histogram(self, name, description, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram, name, description, buckets=buckets)
+
+    def reset(self):
+        """
+        Method responsible for removing values of all metrics
+        """
+        with self.lock:
+            for metric in self.metrics.values():
+                metric.series = {}
+
+    def to_prometheus(self):
+        """
+        Method responsible for returning all metrics in Prometheus text format
+        """
+        lines = []
+
+        with self.lock:
+            for metric in self.metrics.values():
+                lines.append("# HELP {0} {1}".format(metric.name, metric.description))
+                lines.append("# TYPE {0} {1}".format(metric.name, metric.kind))
+
+                for suffix, key, extra, value in metric.samples():
+                    lines.append(
+                        "{0}{1}{2} {3}".format(
+                            metric.name,
+                            suffix,
+                            format_labels(key, extra),
+                            format_value(value),
+                        )
+                    )
+
+        return "\n".join(lines) + "\n"
+
+    def state(self):
+        """
+        Method responsible for returning all metrics as json-compatible dict
+        """
+        with self.lock:
+            return {
+                name: {
+                    "type": metric.kind,
+                    "description": metric.description,
+                    "series": metric.state(),
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def merge(self, state):
+        """
+        Method responsible for adding metrics of other process (from state)
+        """
+        metric_classes = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+        for name, metric_state in state.items():
+            metric = self.register(
+                metric_classes[metric_state["type"]], name, metric_state["description"]
+            )
+            metric.merge(metric_state["series"])
+
+    def dump(self, path):
+        """
+        Method responsible for writing all metrics to json file
+        """
+        with open(path, "w") as file:
+            json.dump(self.state(), file, indent=1)
+
+
+# Metrics of current process
+metrics = MetricsRegistry()
+
+
+class RequestProfiler:
+    def __init__(self, threshold, directory="profiles", top=30) -> None:
+        """
+        Profiler of requests saving cProfile output of slow ones
+        - threshold - minimal number of seconds of request to save its profile
+        - directory - directory of saved profiles (.prof for pstats/snakeviz
+          and .txt with top functions)
+        - top - number of functions in .txt summary
+        """
+        self.threshold = threshold
+        self.directory = directory
+        self.top = top
+
+        # Only one request is profiled at once (others run without profiler)
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Method responsible for starting profiler of request
+        (None if other request is profiled)
+        """
+        if not self.lock.acquire(blocking=False):
+            return None
+
+        profile = cProfile.Profile()
+        profile.enable()
+
+        return profile
+
+    def stop(self, profile, name, seconds):
+        """
+        Method responsible for stopping profiler of request and saving
+        its output if request was slow
+        Returns path of saved profile (None if request was not slow)
+        """
+        if profile is None:
+            return None
+
+        try:
+            profile.disable()
+
+            if seconds < self.threshold:
+                return None
+
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(
+                self.directory,
+                "{0}-{1}-{2:.0f}ms".format(
+                    time.strftime("%Y%m%d-%H%M%S"), name, seconds * 1000
+                ),
+            )
+            profile.dump_stats(path + ".prof")
+
+            summary = io.StringIO()
+            pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(
+                self.top
+            )
+
+            with open(path + ".txt", "w") as file:
+                file.write(summary.getvalue())
+
+            return path + ".prof"
+        finally:
+            self.lock.release()
@@ -0,0 +1,78 @@
+# STOCK PIPELINE
+# Libraries
+import queue
+import threading
+
+
+def job_key(job):
+    """
+    Method responsible for returning key of scrape job saved in checkpoints
+    (instrument, interval and period)
+    """
+    start = job.get("start_date") or job["start_year"]
+    end = job.get("end_date") or job["end_year"]
+
+    return "{0}|{1}|{2}|{3}".format(
+        job["instrument_name"],
+        job["interval_name"],
+        start.strftime("%Y-%m-%d") if hasattr(start, "strftime") else start,
+        end.strftime("%Y-%m-%d") if hasattr(end, "strftime") else end,
+    )
+
+
+class ChunkWriter:
+    def __init__(self, write, max_chunks=4) -> None:
+        """
+        Thread writing chunks of data to database as they come
+        - write - method called with (data frame, checkpoints) of each chunk
+        - max_chunks - number of chunks waiting for writing (putting next one
+          waits until there is place, so memory stays bounded)
+        """
+        self.write = write
+        self.chunks = queue.Queue(maxsize=max_chunks)
+
+        # Error of writing (raised in producer on next put or close)
+        self.error = None
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """
+        Method responsible for writing chunks until end of data
+        """
+        while True:
+            chunk = self.chunks.get()
+
+            # Empty chunk means end of data
+            if chunk is None:
+                break
+
+            # After error chunks are only taken from queue, so producer is not blocked
+            if self.error is not None:
+                continue
+
+            try:
+                self.write(*chunk)
+            except Exception as e:
+                self.error = e
+
+    def put(self, stock_df, checkpoints=()):
+        """
+        Method responsible for passing chunk to writer (waits if queue is full)
+        """
+        if self.error is not None:
+            raise self.error
+
+        self.chunks.put((stock_df, checkpoints))
+
+    def close(self):
+        """
+        Method responsible for waiting until all chunks are written
+        (raises error of writing, if any)
+        """
+        self.chunks.put(None)
+        self.thread.join()
+
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,344 @@
+# STOCK PLOT
+# Libraries
+import io
+import os
+import time
+import threading
+import multiprocessing
+import numpy as np
+import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from matplotlib import dates as mdates
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from stock_metrics import metrics
+
+# Style is set when module is imported, so also in every rendering process
+sns.set_style("whitegrid")
+
+# Size (inches) and resolution of plot figure
+FIGURE_SIZE = (15, 7.5)
+FIGURE_DPI = 100
+
+# Start method of rendering processes (not forked from threads of server,
+# which could copy locks held at fork time)
+START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Types of price chart available for user
+CHART_TYPES = ["line", "candlestick", "ohlc"]
+
+# Colors of rising and falling candles (and their volume)
+UP_COLOR = "#26A69A"
+DOWN_COLOR = "#EF5350"
+
+# Seconds of stages of creating plot
+PLOT_STAGE_SECONDS = metrics.histogram(
+    "stock_plot_stage_seconds",
+    "Seconds of stages of creating plot (filter, render, encode)",
+)
+
+
+def rectangles(x, width, bottom, top):
+    """
+    Method responsible for returning vertices of rectangles (one per value
+    of x) as array of shape (n, 4, 2)
+    """
+    left = x - width / 2
+    right = x + width / 2
+
+    return np.stack(
+        [
+            np.column_stack([left, left, right, right]),
+            np.column_stack([bottom, top, top, bottom]),
+        ],
+        axis=2,
+    )
+
+
+def segments(x0, y0, x1, y1):
+    """
+    Method responsible for returning line segments from (x0, y0) to (x1, y1)
+    as array of shape (n, 2, 2)
+    """
+    return np.stack([np.column_stack([x0, y0]), np.column_stack([x1, y1])], axis=1)
+
+
+def candle_geometry(dates, ohlc):
+    """
+    Method responsible for returning (x positions, width, colors) of candles
+    """
+    x = mdates.date2num(dates)
+    width = 0.7 * np.median(np.diff(x)) if len(x) > 1 else 0.7
+    colors = np.where(ohlc["close"] >= ohlc["open"], UP_COLOR, DOWN_COLOR)
+
+    return x, width, colors
+
+
+def draw_candles(ax, x, width, colors, ohlc, chart):
+    """
+    Method responsible for drawing all candles (candlestick) or bars (ohlc)
+    as batched collections (not one artist per candle)
+    """
+    if chart == "ohlc":
+        # Range of bar with ticks of open (left) and close (right)
+        bars = np.concatenate(
+            [
+                segments(x, ohlc["low"], x, ohlc["high"]),
+                segments(x - width / 2, ohlc["open"], x, ohlc["open"]),
+                segments(x, ohlc["close"], x + width / 2, ohlc["close"]),
+            ]
+        )
+        ax.add_collection(LineCollection(bars, colors=np.tile(colors, 3), linewidths=1))
+    else:
+        # Wicks from low to high under bodies from open to close
+        ax.add_collection(
+            LineCollection(
+                segments(x, ohlc["low"], x, ohlc["high"]),
+                colors=colors,
+                linewidths=0.8,
+            )
+        )
+        ax.add_collection(
+            PolyCollection(
+                rectangles(x, width, ohlc["open"], ohlc["close"]),
+                facecolors=colors,
+                edgecolors=colors,
+                linewidths=0.5,
+            )
+        )
+
+    ax.xaxis_date()
+    ax.autoscale_view()
+
+
+def draw_volume(ax, x, width, colors, volume):
+    """
+    Method responsible for drawing volume bars as one collection
+    """
+    ax.add_collection(
+        PolyCollection(
+            rectangles(x, width, np.zeros(len(x)), volume),
+            facecolors=colors,
+            edgecolors="none",
+            alpha=0.6,
+        )
+    )
+    ax.autoscale_view()
+
+
+def draw_plot(plot_spec):
+    """
+    Method responsible for drawing plot on its own figure (without pyplot state)
+    from plot specification with:
+    - stock_name - name of stock
+    - start_date - lower date
+    - end_date - upper date
+    - interval - interval of data
+    - currency_name - currency of values
+    - dates - array with dates
+    - values - array with values (2D array with one column per instrument
+      for comparison)
+    - labels - names of instruments in legend (optional, for comparison)
+    - value_label - label of y axis (optional, value in currency by default)
+    - overlays - list of (label, values) drawn over values (optional, indicators)
+    - panels - list of (title, list of (label, values)) drawn on own axes
+      below values (optional, indicators)
+    - chart - type of chart: line (default), candlestick or ohlc
+    - ohlc - dict with open, high, low and close arrays (candlestick and ohlc)
+    - volume - array with volumes drawn on panel below candles (optional)
+    """
+    panels = plot_spec.get("panels", [])
+    ohlc = plot_spec.get("ohlc") if plot_spec.get("chart", "line") != "line" else None
+    volume = plot_spec.get("volume") if ohlc is not None else None
+    volume_panels = [] if volume is None else [volume]
+
+    # Setting size of plot figure (with volume and panels below main plot)
+    fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(
+        1 + len(volume_panels) + len(panels),
+        1,
+        sharex=True,
+        squeeze=False,
+        gridspec_kw={"height_ratios": [3] + [1] * (len(volume_panels) + len(panels))},
+    )[:, 0]
+    ax = axes[0]
+
+    if ohlc is not None:
+        # Creating candles for current selection
+        x, width, colors = candle_geometry(plot_spec["dates"], ohlc)
+        draw_candles(ax, x, width, colors, ohlc, plot_spec["chart"])
+        lines = []
+    else:
+        # Creating line plot for current selection
+        lines = ax.plot(plot_spec["dates"], plot_spec["values"])
+
+    labels = list(plot_spec.get("labels") or [])
+
+    # Indicators drawn over values
+    if plot_spec.get("overlays") and not labels and lines:
+        labels = [plot_spec["stock_name"].upper()]
+
+    for label, values in plot_spec.get("overlays", []):
+        lines += ax.plot(plot_spec["dates"], values, linewidth=1)
+        labels.append(label)
+
+    # Legend with instruments of comparison and indicators
+    if labels:
+        ax.legend(lines, labels, fontsize=12)
+
+    # Volume of candles
+    if volume is not None:
+        draw_volume(axes[1], x, width, colors, volume)
+        axes[1].set_ylabel("Volume", fontsize=12, labelpad=20, color="#A6A6A6")
+
+    # Indicators drawn on own panels
+    for panel_ax, (title, series) in zip(axes[1 + len(volume_panels) :], panels):
+        for label, values in series:
+            panel_ax.plot(plot_spec["dates"], values, linewidth=1, label=label)
+
+        panel_ax.set_ylabel(title, fontsize=12, labelpad=20, color="#A6A6A6")
+        panel_ax.legend(fontsize=10, loc="upper left")
+
+    # Title of plot
+    ax.set_title(
+        "{0}, period: {1} - {2}".format(
+            plot_spec["stock_name"].upper(),
+            plot_spec["start_date"],
+            plot_spec["end_date"],
+        ),
+        fontsize=16,
+        loc="left",
+        pad=20,
+        color="#595959",
+    )
+
+    # Y axis label
+    ax.set_ylabel(
+        plot_spec.get("value_label", "Value in {0}".format(plot_spec["currency_name"])),
+        fontsize=14,
+        labelpad=20,
+        color="#A6A6A6",
+    )
+
+    # X axis label
+    axes[-1].set_xlabel(
+        "Interval: {0}".format(plot_spec["interval"]),
+        fontsize=14,
+        labelpad=20,
+        color="#A6A6A6",
+    )
+
+    # Changing font and color of y and x axis values
+    for temp_ax in axes:
+        temp_ax.tick_params(colors="#595959", which="both", labelsize=12)
+
+    # Changing rotation of x axis values for Daily and Weekly interal
+    if plot_spec["interval"] == "Daily" or plot_spec["interval"] == "Weekly":
+        axes[-1].tick_params(axis="x", labelrotation=45)
+
+    return fig
+
+
+def render_plot_timed(plot_spec):
+    """
+    Method responsible for rendering plot from specification and returning
+    (PNG bytes, seconds of stages): render (drawing figure) and encode
+    (rasterizing and saving PNG)
+    """
+    start_time = time.perf_counter()
+
+    fig = draw_plot(plot_spec)
+    render_seconds = time.perf_counter() - start_time
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+
+    return buffer.getvalue(), {
+        "render": render_seconds,
+        "encode": time.perf_counter() - start_time - render_seconds,
+    }
+
+
+def render_plot(plot_spec):
+    """
+    Method responsible for rendering plot from specification to PNG bytes
+    """
+    return render_plot_timed(plot_spec)[0]
+
+
+class PlotRenderer:
+    def __init__(self, workers=None) -> None:
+        """
+        Renderer of plots running on process pool
+        - workers - number of rendering processes (0 renders in calling thread,
+          None uses number of cpus)
+        """
+        self.workers = os.cpu_count() if workers is None else workers
+
+        # Pool is created on first render, so each server process has its own
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def get_pool(self):
+        """
+        Method responsible for returning (and creating) process pool
+        """
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(START_METHOD),
+                )
+
+            return self.pool
+
+    def drop_pool(self, pool):
+        """
+        Method responsible for dropping broken process pool (next render
+        creates new one), unless other thread has replaced it already
+        """
+        with self.lock:
+            if self.pool is pool:
+                self.pool = None
+
+        pool.shutdown(wait=False)
+
+    def render(self, plot_spec):
+        """
+        Method responsible for rendering plot to PNG bytes
+        (seconds of stages are recorded in metrics of this process)
+        Plot is rendered once again on new pool when process of pool died
+        """
+        if self.workers == 0:
+            image, timings = render_plot_timed(plot_spec)
+        else:
+            for attempt in range(2):
+                pool = self.get_pool()
+
+                try:
+                    image, timings = pool.submit(render_plot_timed, plot_spec).result()
+                    break
+                except BrokenProcessPool:
+                    self.drop_pool(pool)
+
+                    if attempt == 1:
+                        raise
+
+        for stage, seconds in timings.items():
+            PLOT_STAGE_SECONDS.observe(seconds, stage=stage)
+
+        return image
+
+    def close(self):
+        """
+        Method responsible for closing process pool
+        """
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
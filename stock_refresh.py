@@ -0,0 +1,206 @@
+# STOCK REFRESH
+# Libraries
+import time
+import sqlite3
+import threading
+import traceback
+from stock_snapshot import read_signature, refresh_snapshot_store
+
+
+# Selecting instruments with rows added after given id or rows changed
+# after given change_id with sql statement
+SQL_SELECT_CHANGED_INSTRUMENTS = """select instrument_name
+from stock
+left join instrument on instrument.instrument_id = stock.instrument_id
+where stock.id > ?
+union
+select instrument_name
+from stock_change
+left join instrument on instrument.instrument_id = stock_change.instrument_id
+where stock_change.change_id > ?;"""
+
+# Selecting range of change_id in log of changes with sql statement
+SQL_SELECT_CHANGE_RANGE = "select min(change_id), max(change_id) from stock_change;"
+
+
+class DataRefresher:
+    def __init__(
+        self, path, get_store, set_store, interval=5.0, snapshot=False
+    ) -> None:
+        """
+        Background thread swapping store of site when database changes
+        - path - path to database file
+        - get_store - function returning current store
+        - set_store - function replacing current store with refreshed one
+        - interval - seconds between checks of database
+        - snapshot - refreshed store is written to snapshot and memory-mapped
+          from it (snapshot data mode)
+        """
+        self.path = path
+        self.get_store = get_store
+        self.set_store = set_store
+        self.interval = interval
+        self.snapshot = snapshot
+
+        # Own read-only connection (data_version changes with commits of others)
+        self.conn = sqlite3.connect(
+            "file:{0}?mode=ro".format(path),
+            uri=True,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.data_version = self.read_data_version()
+        self.conn.execute("begin;")
+
+        try:
+            self.schema_version = self.read_schema_version()
+            self.max_id = self.read_max_id()
+            self.change_id = self.read_change_range()[1]
+        finally:
+            self.conn.execute("commit;")
+
+        # Statistics of refreshes
+        self.refreshes = 0
+        self.failures = 0
+        self.last_refresh_seconds = None
+
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def read_data_version(self):
+        """
+        Method responsible for returning data version of database
+        """
+        return self.conn.execute("PRAGMA data_version;").fetchone()[0]
+
+    def read_max_id(self):
+        """
+        Method responsible for returning id of last row in stock table
+        """
+        return self.conn.execute("select max(id) from stock;").fetchone()[0] or 0
+
+    def read_schema_version(self):
+        """
+        Method responsible for returning version of database schema
+        """
+        return self.conn.execute("PRAGMA user_version;").fetchone()[0]
+
+    def read_change_range(self):
+        """
+        Method responsible for returning (first, last) change_id in log
+        of changes ((0, 0) when log is empty)
+        """
+        first, last = self.conn.execute(SQL_SELECT_CHANGE_RANGE).fetchone()
+
+        return first or 0, last or 0
+
+    def check(self):
+        """
+        Method responsible for refreshing store if database changed
+        Only instruments with new rows or rows changed after last check are
+        read again (all instruments when schema changed or log of changes
+        was shortened beyond last check)
+        Returns True if store was refreshed
+        """
+        data_version = self.read_data_version()
+
+        if data_version == self.data_version:
+            return False
+
+        start_time = time.perf_counter()
+
+        # One read transaction, so all reads see the same data
+        self.conn.execute("begin;")
+
+        try:
+            schema_version = self.read_schema_version()
+            max_id = self.read_max_id()
+            first_change_id, change_id = self.read_change_range()
+
+            if max_id == self.max_id and change_id == self.change_id:
+                # Only other tables were written (e.g. checkpoints of scrapper)
+                store = None
+            else:
+                if (
+                    schema_version != self.schema_version
+                    or max_id < self.max_id
+                    or first_change_id > self.change_id + 1
+                ):
+                    instrument_names = None
+                else:
+                    instrument_names = [
+                        row[0]
+                        for row in self.conn.execute(
+                            SQL_SELECT_CHANGED_INSTRUMENTS,
+                            (self.max_id, self.change_id),
+                        )
+                    ]
+
+                # Only rows added or changed since previous check are read
+                store = self.get_store().refresh(
+                    self.conn,
+                    instrument_names,
+                    version=read_signature(self.conn),
+                    since=(self.max_id, self.change_id),
+                )
+        finally:
+            self.conn.execute("commit;")
+
+        self.data_version = data_version
+
+        if store is None:
+            return False
+
+        if self.snapshot:
+            store = refresh_snapshot_store(self.path, store)
+
+        # Swapping store at once (requests keep reading previous one until then)
+        self.set_store(store)
+
+        self.schema_version = schema_version
+        self.max_id = max_id
+        self.change_id = change_id
+        self.refreshes += 1
+        self.last_refresh_seconds = time.perf_counter() - start_time
+
+        print(
+            "Refreshed {0} in {1:.2f}s".format(
+                (
+                    "all instruments"
+                    if instrument_names is None
+                    else ", ".join(instrument_names)
+                ),
+                self.last_refresh_seconds,
+            )
+        )
+
+        return True
+
+    def run(self):
+        """
+        Method responsible for checking database until refresher is stopped
+        """
+        while not self.stop_event.wait(self.interval):
+            # Any error is reported and next check is tried again
+            # (thread keeps running, so site does not serve stale data silently)
+            try:
+                self.check()
+            except Exception:
+                self.failures += 1
+                print("Refresh failed:\n{0}".format(traceback.format_exc()))
+
+    def start(self):
+        """
+        Method responsible for starting refresher in background thread
+        """
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Method responsible for stopping refresher
+        """
+        self.stop_event.set()
+
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,186 @@
+# STOCK RETRY
+# Libraries
+import time
+
+
+class RetryError(Exception):
+    """
+    Error raised when stage of scraping failed in all attempts
+    or deadline of job has passed
+    """
+
+
+class RetryPolicy:
+    def __init__(
+        self, attempts=5, backoff=0.5, max_backoff=8.0, deadline=120.0
+    ) -> None:
+        """
+        Policy of retrying stages of scraping (e.g. selecting interval on page)
+        - attempts - maximal number of attempts of each stage
+        - backoff - seconds of waiting after first failed attempt (doubled
+          after each next one)
+        - max_backoff - maximal number of seconds of waiting between attempts
+        - deadline - maximal number of seconds of whole job (all stages)
+        """
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+
+    def start_job(self):
+        """
+        Method responsible for returning deadline of job started now
+        (monotonic time passed to run)
+        """
+        return time.monotonic() + self.deadline
+
+    def delay(self, attempt):
+        """
+        Method responsible for returning seconds of waiting after failed attempt
+        (numbered from 0)
+        """
+        return min(self.backoff * 2**attempt, self.max_backoff)
+
+    def run(self, stage, alternatives, deadline=None):
+        """
+        Method responsible for running stage until one of its alternatives
+        succeeds and returning its result:
+        - stage - name of stage used in error
+        - alternatives - methods tried in order in each attempt
+          (e.g. one per layout of site)
+        - deadline - deadline of job from start_job (None for no deadline)
+        Raises RetryError when all attempts failed or deadline has passed
+        """
+        errors = []
+
+        for attempt in range(self.attempts):
+            for alternative in alternatives:
+                try:
+                    return alternative()
+                except Exception as e:
+                    errors.append(e)
+
+            # Waiting before next attempt, but not after deadline
+            delay = self.delay(attempt)
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0 or attempt == self.attempts - 1:
+                    break
+
+                delay = min(delay, remaining)
+            elif attempt == self.attempts - 1:
+                break
+
+            time.sleep(delay)
+
+        raise RetryError(
+            "Stage: {0} failed after {1} attempts ({2!r})".format(
+                stage, attempt + 1, errors[-1] if errors else None
+            )
+        )
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=2, reset_timeout=172800.0, database=None) -> None:
+        """
+        Breaker skipping jobs of instrument after repeated failures
+        - threshold - number of failures in a row opening circuit of instrument
+        - reset_timeout - seconds after which one job of skipped instrument
+          is tried again
+        - database - StockDatabase keeping failures of instruments, so they are
+          counted across runs and worker processes (kept in breaker when None)
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.database = database
+
+        # Number of failures in a row and time of opening circuit per instrument
+        # (without database)
+        self.failures = {}
+        self.opened = {}
+
+        # Failed and skipped jobs with errors (to run them later)
+        self.failed_jobs = []
+
+    def state(self, instrument_name):
+        """
+        Method responsible for returning (number of failures in a row,
+        time of opening circuit or None) of instrument
+        """
+        if self.database is not None:
+            return self.database.instrument_failures(instrument_name)
+
+        return (
+            self.failures.get(instrument_name, 0),
+            self.opened.get(instrument_name),
+        )
+
+    def set_opened(self, instrument_name, opened_at):
+        """
+        Method responsible for saving time of opening circuit of instrument
+        (None lets next job of instrument run)
+        """
+        if self.database is not None:
+            self.database.set_instrument_opened(instrument_name, opened_at)
+        elif opened_at is None:
+            self.opened.pop(instrument_name, None)
+        else:
+            self.opened[instrument_name] = opened_at
+
+    def allow(self, instrument_name):
+        """
+        Method responsible for checking if job of instrument can be run
+        """
+        _, opened = self.state(instrument_name)
+
+        if opened is None:
+            return True
+
+        # After timeout one job is tried (next failure opens circuit again)
+        if time.time() - opened >= self.reset_timeout:
+            self.set_opened(instrument_name, None)
+            return True
+
+        return False
+
+    def record_success(self, instrument_name):
+        """
+        Method responsible for closing circuit of instrument after success
+        """
+        if self.database is not None:
+            self.database.clear_instrument_failures(instrument_name)
+        else:
+            self.failures.pop(instrument_name, None)
+            self.opened.pop(instrument_name, None)
+
+    def record_failure(self, job, error):
+        """
+        Method responsible for recording failed job and opening circuit
+        of instrument after threshold failures in a row
+        """
+        instrument_name = job["instrument_name"]
+        self.failed_jobs.append((job, repr(error)))
+
+        if self.database is not None:
+            failures = self.database.record_instrument_failure(instrument_name)
+        else:
+            failures = self.failures.get(instrument_name, 0) + 1
+            self.failures[instrument_name] = failures
+
+        if failures >= self.threshold:
+            if self.state(instrument_name)[1] is None:
+                print(
+                    "Skipping instrument: {0} after {1} failures".format(
+                        instrument_name, failures
+                    )
+                )
+
+            self.set_opened(instrument_name, time.time())
+
+    def record_skip(self, job):
+        """
+        Method responsible for recording job skipped with open circuit
+        """
+        self.failed_jobs.append((job, "Skipped after repeated failures of instrument"))
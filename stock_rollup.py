@@ -0,0 +1,169 @@
+# STOCK ROLLUP
+# Libraries
+import sqlite3
+import pandas as pd
+from stock_db import StockDatabase, to_rows
+
+
+# Periods of intervals computed from daily data
+# (weeks start on Sunday and months on first day, as on site)
+ROLLUP_PERIODS = {
+    "Weekly": "W-SAT",
+    "Monthly": "M",
+}
+
+# Selecting daily rows of instrument with sql statement
+SQL_SELECT_DAILY = """select instrument_name, currency_name, date, last_price, open_price, max_price, min_price, volume
+from stock
+left join instrument on instrument.instrument_id = stock.instrument_id
+left join currency on currency.currency_id = stock.currency_id
+where instrument.instrument_name = ? and stock.interval = 'Daily' and stock.date >= ?
+order by stock.date;"""
+
+
+def bucket_starts(dates, interval):
+    """
+    Method responsible for returning first day of bucket (week or month)
+    for each date
+    """
+    return dates.dt.to_period(ROLLUP_PERIODS[interval]).dt.start_time
+
+
+def compute_rollup(daily_df, interval):
+    """
+    Method responsible for computing rows of interval (Weekly or Monthly)
+    from daily rows of instruments with vectorized grouping:
+    open - first, max - maximum, min - minimum, last - last, volume - sum,
+    change - percent change of last price from previous bucket
+    """
+    temp_df = daily_df.sort_values(["instrument_name", "date"], kind="stable")
+    temp_df = temp_df.assign(bucket=bucket_starts(temp_df["date"], interval))
+
+    rollup_df = temp_df.groupby(["instrument_name", "bucket"], sort=True).agg(
+        currency_name=("currency_name", "last"),
+        last_price=("last_price", "last"),
+        open_price=("open_price", "first"),
+        max_price=("max_price", "max"),
+        min_price=("min_price", "min"),
+        volume=("volume", "sum"),
+        volume_count=("volume", "count"),
+    )
+
+    # Sum of missing volumes is missing volume
+    rollup_df["volume"] = (
+        rollup_df["volume"].where(rollup_df["volume_count"] > 0).round().astype("Int64")
+    )
+    rollup_df["change"] = (
+        rollup_df.groupby(level="instrument_name")["last_price"].pct_change() * 100
+    ).round(2)
+
+    rollup_df = rollup_df.reset_index().rename(columns={"bucket": "date"})
+    rollup_df["interval"] = interval
+
+    return rollup_df[
+        [
+            "instrument_name",
+            "currency_name",
+            "date",
+            "interval",
+            "last_price",
+            "open_price",
+            "max_price",
+            "min_price",
+            "volume",
+            "change",
+        ]
+    ]
+
+
+class RollupEngine:
+    def __init__(self, database=None) -> None:
+        """
+        Engine materializing Weekly and Monthly rows computed from Daily rows
+        - database - StockDatabase with data
+        """
+        self.database = database or StockDatabase()
+
+    def read_daily(self, since):
+        """
+        Method responsible for reading daily rows of instruments, starting from
+        bucket before the first affected one (needed for change)
+        - since - dictionary instrument_name -> first new daily date (None for all)
+        """
+        conn = sqlite3.connect(self.database.path)
+
+        try:
+            frames = []
+
+            for instrument_name, date in since.items():
+                start_date = "0000-00-00"
+
+                if date is not None:
+                    # Bucket before the first affected one (month is the longest)
+                    start_date = (pd.Timestamp(date).to_period("M") - 1).start_time
+                    start_date = start_date.strftime("%Y-%m-%d")
+
+                frames.append(
+                    pd.read_sql_query(
+                        SQL_SELECT_DAILY, conn, params=(instrument_name, start_date)
+                    )
+                )
+        finally:
+            conn.close()
+
+        daily_df = pd.concat(frames, ignore_index=True)
+        daily_df["date"] = pd.to_datetime(daily_df["date"], format="%Y-%m-%d")
+
+        return daily_df
+
+    def update(self, since):
+        """
+        Method responsible for recomputing buckets affected by new daily rows
+        and upserting them into stock table
+        - since - dictionary instrument_name -> first new daily date (None for all)
+        Returns number of upserted rows
+        """
+        if not since:
+            return 0
+
+        daily_df = self.read_daily(since)
+
+        if daily_df.empty:
+            return 0
+
+        rollups = []
+
+        for interval in ROLLUP_PERIODS:
+            rollup_df = compute_rollup(daily_df, interval)
+
+            # Keeping only affected buckets (previous ones were read for change)
+            first_buckets = pd.Series(
+                {
+                    instrument_name: (
+                        pd.Timestamp(date)
+                        .to_period(ROLLUP_PERIODS[interval])
+                        .start_time
+                        if date is not None
+                        else pd.Timestamp.min
+                    )
+                    for instrument_name, date in since.items()
+                }
+            )
+            rollups.append(
+                rollup_df[
+                    rollup_df["date"] >= rollup_df["instrument_name"].map(first_buckets)
+                ]
+            )
+
+        rollup_df = pd.concat(rollups, ignore_index=True)
+        rollup_df["date"] = rollup_df["date"].dt.strftime("%Y-%m-%d")
+
+        return self.database.load(stock_rows=to_rows(rollup_df))
+
+    def rebuild(self, instrument_names):
+        """
+        Method responsible for recomputing all Weekly and Monthly rows of instruments
+        """
+        return self.update(
+            {instrument_name: None for instrument_name in instrument_names}
+        )
@@ -0,0 +1,292 @@
+# STOCK SCHEDULER
+# Libraries
+import math
+import time
+import queue
+import multiprocessing
+from stock_metrics import metrics
+from stock_pipeline import job_key
+
+# Number of days after which stored series should be refreshed, per interval
+INTERVAL_CADENCE = {"Daily": 1, "Weekly": 7, "Monthly": 30}
+
+# Seconds of waiting for results before checking if workers are alive
+RESULT_TIMEOUT = 1.0
+
+
+def series_staleness(latest_date, interval, today):
+    """
+    Method responsible for returning staleness of series: age of its latest
+    stored row in refresh cadences of interval (series with staleness
+    of at least 1 should be refreshed, series without data are infinitely stale)
+    """
+    if latest_date is None:
+        return math.inf
+
+    return (today - latest_date.date()).days / INTERVAL_CADENCE.get(interval, 1)
+
+
+class TimeBudget:
+    def __init__(self, seconds=None) -> None:
+        """
+        Time budget of scrape run started when budget is created
+        - seconds - total number of seconds of run (None for no limit)
+        """
+        self.seconds = seconds
+
+        # Wall clock time, so budget is shared by worker processes
+        self.deadline = None if seconds is None else time.time() + seconds
+
+        # Jobs not started because budget was used
+        self.left_jobs = []
+
+    def exceeded(self, expected=0.0):
+        """
+        Method responsible for checking if job expected to take given number
+        of seconds would not finish within budget
+        """
+        return self.deadline is not None and time.time() + expected > self.deadline
+
+    def jobs(self, jobs):
+        """
+        Method responsible for yielding jobs while next one is expected
+        to finish within budget (with average duration of previous jobs)
+        """
+        jobs = list(jobs)
+        start = time.time()
+
+        for number, job in enumerate(jobs):
+            average = (time.time() - start) / number if number else 0.0
+
+            if self.exceeded(average):
+                self.left_jobs = jobs[number:]
+                print(
+                    "Time budget of {0}s used, {1} jobs left for next run".format(
+                        self.seconds, len(self.left_jobs)
+                    )
+                )
+                break
+
+            yield job
+
+
+class RateLimiter:
+    def __init__(self, min_interval=2.0) -> None:
+        """
+        Rate limiter shared by all worker processes
+        - min_interval - minimal number of seconds between starts of two jobs
+        """
+        self.min_interval = min_interval
+
+        # Time when next job can start (shared between processes)
+        self.next_start = multiprocessing.Value("d", 0.0)
+
+    def wait(self):
+        """
+        Method responsible for waiting until next job can be started
+        """
+        with self.next_start.get_lock():
+            now = time.monotonic()
+            start = max(now, self.next_start.value)
+            self.next_start.value = start + self.min_interval
+
+        time.sleep(max(0.0, start - now))
+
+
+def scrape_worker(
+    number, scrapper, job_queue, result_queue, rate_limiter, headless, budget
+):
+    """
+    Method responsible for running jobs from queue with own backend
+    (e.g. selenium driver) and sending results to writer
+    (jobs left after time budget are sent back as failed)
+    Worker which can not open its backend takes no jobs
+    """
+    # Metrics copied from parent process are not sent back
+    metrics.reset()
+
+    # Error ending worker (sent with its metrics)
+    worker_error = None
+
+    backend = scrapper.create_backend(headless=headless)
+
+    # Failures of instruments are shared by workers through database
+    breaker = scrapper.breaker
+
+    try:
+        backend.open()
+
+        while True:
+            job = job_queue.get()
+
+            # Empty job means end of work
+            if job is None:
+                break
+
+            if budget.exceeded():
+                result_queue.put((job, None, "Time budget of run exceeded"))
+                continue
+
+            if not breaker.allow(job["instrument_name"]):
+                result_queue.put(
+                    (job, None, "Skipped after repeated failures of instrument")
+                )
+                continue
+
+            rate_limiter.wait()
+
+            print(
+                "Getting data for instrument: {0} with interval: {1}".format(
+                    job["instrument_name"], job["interval_name"]
+                )
+            )
+
+            try:
+                temp_df = backend.fetch(**job)
+                breaker.record_success(job["instrument_name"])
+                result_queue.put((job, temp_df, None))
+            except Exception as e:
+                breaker.record_failure(job, e)
+                result_queue.put((job, None, repr(e)))
+    except Exception as e:
+        worker_error = repr(e)
+        print("Worker {0} failed: {1}".format(number, worker_error))
+    finally:
+        try:
+            backend.close()
+        except Exception as e:
+            print("Worker {0} failed to close backend: {1!r}".format(number, e))
+
+        # Informing writer that worker has finished (with metrics of its jobs)
+        result_queue.put(
+            {"worker": number, "error": worker_error, "metrics": metrics.state()}
+        )
+
+
+class ScrapeScheduler:
+    def __init__(self, scrapper, workers=4, min_interval=2.0, headless=True) -> None:
+        """
+        Scheduler spreading scrape jobs over worker processes with own backends
+        - scrapper - StockScrapper used by workers
+        - workers - number of worker processes
+        - min_interval - minimal number of seconds between starts of two jobs
+          (global for all workers)
+        - headless - run browsers without window
+        """
+        self.scrapper = scrapper
+        self.workers = workers
+        self.rate_limiter = RateLimiter(min_interval=min_interval)
+        self.headless = headless
+
+    def run(self, jobs, writer, budget=None):
+        """
+        Method responsible for running jobs on workers and passing results
+        to single writer (called in this process):
+        - jobs - list of keyword arguments for get_data (started in order)
+        - writer - method called with each job and its downloaded data frame
+        - budget - TimeBudget of run (jobs are not started after it is used)
+        Returns list of failed jobs with errors (also jobs not finished
+        because workers failed or were killed)
+        """
+        budget = budget or TimeBudget()
+
+        # Jobs without result yet
+        pending_jobs = {job_key(job): job for job in jobs}
+
+        job_queue = multiprocessing.Queue()
+        result_queue = multiprocessing.Queue()
+
+        for job in jobs:
+            job_queue.put(job)
+
+        workers = min(self.workers, len(jobs))
+
+        for _ in range(workers):
+            job_queue.put(None)
+
+        processes = [
+            multiprocessing.Process(
+                target=scrape_worker,
+                args=(
+                    number,
+                    self.scrapper,
+                    job_queue,
+                    result_queue,
+                    self.rate_limiter,
+                    self.headless,
+                    budget,
+                ),
+            )
+            for number in range(workers)
+        ]
+
+        [process.start() for process in processes]
+
+        failed_jobs = []
+        finished_workers = set()
+        worker_errors = []
+
+        # Writing results as they come, until every worker has finished
+        # (or has died without informing about it, e.g. killed by OS)
+        while len(finished_workers) < workers:
+            try:
+                result = result_queue.get(timeout=RESULT_TIMEOUT)
+            except queue.Empty:
+                for number, process in enumerate(processes):
+                    if number not in finished_workers and not process.is_alive():
+                        print(
+                            "Worker {0} exited with code {1}".format(
+                                number, process.exitcode
+                            )
+                        )
+                        worker_errors.append(
+                            "Worker exited with code {0}".format(process.exitcode)
+                        )
+                        finished_workers.add(number)
+                continue
+
+            # Metrics of finished worker
+            if isinstance(result, dict):
+                metrics.merge(result["metrics"])
+                finished_workers.add(result["worker"])
+
+                if result["error"] is not None:
+                    worker_errors.append(result["error"])
+                continue
+
+            job, temp_df, error = result
+            pending_jobs.pop(job_key(job), None)
+
+            if error is not None:
+                print(
+                    "Failed to get data for instrument: {0} with interval: {1} ({2})".format(
+                        job["instrument_name"], job["interval_name"], error
+                    )
+                )
+                failed_jobs.append((job, error))
+                continue
+
+            writer(job, temp_df)
+
+        # Jobs not taken by any worker are removed from queue
+        while True:
+            try:
+                job_queue.get(timeout=0.1)
+            except queue.Empty:
+                break
+
+        [process.join() for process in processes]
+
+        # Jobs without result were not run or their worker died
+        for job in pending_jobs.values():
+            error = "Job not finished by worker ({0})".format(
+                "; ".join(dict.fromkeys(worker_errors)) or "unknown error"
+            )
+            print(
+                "Failed to get data for instrument: {0} with interval: {1} ({2})".format(
+                    job["instrument_name"], job["interval_name"], error
+                )
+            )
+            failed_jobs.append((job, error))
+
+        return failed_jobs
@@ -1,54 +1,119 @@
 # STOCK SCRAPPER
 # Libraries
 import time
-import sqlite3
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service as ChromeService
+from stock_db import StockDatabase, normalize_stock_df, to_rows
+from stock_fetch import (
+    SCRAPE_STAGE_SECONDS,
+    FixtureHttpBackend,
+    PageHttpBackend,
+    SeleniumBackend,
+    build_stock_df,
+    extract_currency,
+    parse_table,
+)
+from stock_metrics import metrics
+from stock_pipeline import ChunkWriter, job_key
+from stock_retry import CircuitBreaker, RetryPolicy
+from stock_rollup import RollupEngine
+from stock_scheduler import ScrapeScheduler, TimeBudget, series_staleness
+from stock_universe import instrument_urls, load_universe
+
+
+# Seconds of stages of writing scraped data and number of written rows
+DB_WRITE_SECONDS = metrics.histogram(
+    "stock_db_write_seconds",
+    "Seconds of stages of writing scraped data (load, rollup, checkpoints)",
+)
+DB_ROWS = metrics.counter("stock_db_rows_total", "Number of scraped rows written")
+
+# Throughput of last load of rows into database
+DB_LOAD_ROWS_PER_SECOND = metrics.gauge(
+    "stock_db_load_rows_per_second", "Rows per second of last load into database"
+)
 
 
 class StockScrapper:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        url="https://pl.investing.com/",
+        backend="selenium",
+        derive_rollups=True,
+        db_path="stock_prices.db",
+        retry_policy=None,
+        failure_threshold=2,
+        instruments=None,
+        instruments_path=None,
+        checkpoint_max_age=43200.0,
+    ) -> None:
+        """
+        Scrapper of historical data with declaration of:
+        - url - URL to site (e.g. local server with saved pages)
+        - backend - backend getting data: selenium (browser, default), http
+          (pages without browser for Daily jobs covered by the latest rows
+          on page, browser for others) or fixture (direct requests
+          to stock_fixture_server.py, without browser)
+        - derive_rollups - scraping only Daily data and computing Weekly and Monthly
+          from it (otherwise all intervals are scraped)
+        - db_path - path to sqlite db with data
+        - retry_policy - RetryPolicy of stages of get_data (attempts, backoff
+          and deadline of job)
+        - failure_threshold - number of failed jobs in a row (counted across
+          runs and workers in database) after which jobs of instrument are skipped
+        - instruments - instruments to get as {market: [names]} (by default
+          loaded from instruments_path or instrument table of database)
+        - instruments_path - path to json config file with instruments
+          (saved in instrument table for next runs)
+        - checkpoint_max_age - seconds after which checkpoints of completed jobs
+          are not skipped anymore (so a run left unfinished by failing
+          instruments does not block next runs)
+        """
         # URL to site
-        self.url = "https://pl.investing.com/"
-
-        # List of instruments to get
-        self.instruments = {
-            "currencies": ["eur-usd", "gbp-usd", "eur-pln", "usd-cad"],
-            "equities": ["cdproject", "11bit", "nintendo-ltd", "activision-inc"],
-            "commodities": ["gold", "silver", "platinum", "copper"],
-        }
-
-        # Creating lists of complete urls
-        self.url_list = []
-
-        for market in self.instruments:
-            for instrument in self.instruments[market]:
-                temp_url = "{0}{1}/{2}-historical-data".format(
-                    self.url, market, instrument
-                )
-                self.url_list.append([instrument, temp_url])
+        self.url = url
 
-        # Choosing time frame
-        self.time_intervals = [
-            "Daily",
-            "Weekly",
-            "Monthly",
-        ]
+        # Path to sqlite db
+        self.db_path = db_path
 
-        # Blank data frame with stock data
-        self.stock_df = pd.DataFrame()
+        # Name of backend getting data
+        self.backend = backend
 
-    def run_scrapper(self):
+        # Retrying stages of scraping and skipping broken instruments
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = CircuitBreaker(
+            threshold=failure_threshold, database=StockDatabase(db_path)
+        )
+
+        # Instruments to get ({market: [names]}, loaded on first use when None)
+        self.instruments = instruments
+        self.instruments_path = instruments_path
+
+        # Seconds for which completed jobs are skipped by rerun of run
+        self.checkpoint_max_age = checkpoint_max_age
+
+        # Choosing time frame
+        self.derive_rollups = derive_rollups
+
+        if self.derive_rollups:
+            self.time_intervals = ["Daily"]
+        else:
+            self.time_intervals = [
+                "Daily",
+                "Weekly",
+                "Monthly",
+            ]
+
+    def create_driver(self, headless=False):
         """
-        Method responsible for running scrapper and returning
-        data frame with stock data
+        Method responsible for creating selenium chrome driver
+        - headless - run browser without window
         """
         # Chrome options
         chrome_options = Options()
@@ -70,33 +135,232 @@ class StockScrapper:
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--disable-software-rasterizer")
 
+        if headless:
+            chrome_options.add_argument("--headless=new")
+
         # Loading the driver with chromedriver
         chrome_service = ChromeService()
-        driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
 
-        # Downloading data from site for each instrument
-        for instrument in self.url_list:
+        return webdriver.Chrome(service=chrome_service, options=chrome_options)
+
+    def create_backend(self, headless=False):
+        """
+        Method responsible for creating backend getting data
+        - headless - run browser without window (selenium backend)
+        """
+        if self.backend == "fixture":
+            return FixtureHttpBackend(
+                retry_policy=self.retry_policy, breaker=self.breaker
+            )
+
+        if self.backend == "http":
+            return PageHttpBackend(
+                scrapper=self,
+                headless=headless,
+                retry_policy=self.retry_policy,
+                breaker=self.breaker,
+            )
+
+        return SeleniumBackend(scrapper=self, headless=headless, breaker=self.breaker)
+
+    def get_urls(self):
+        """
+        Method responsible for returning list of [instrument name, url]
+        for each instrument to get
+        """
+        if self.instruments is None:
+            self.instruments = load_universe(self.db_path, self.instruments_path)
+
+        return instrument_urls(self.url, self.instruments)
+
+    def get_jobs(self, incremental=False):
+        """
+        Method responsible for returning list of jobs (keyword arguments
+        for get_data) for each instrument and interval
+        - incremental - get only rows newer than latest ones stored in database,
+          only for series due by refresh cadence of interval (most stale first)
+        """
+        # Latest stored dates of each instrument and interval
+        latest_dates = StockDatabase(self.db_path).latest_dates() if incremental else {}
+        today = datetime.today().date()
+
+        jobs = []
+        staleness = []
+
+        for instrument in self.get_urls():
             for interval in self.time_intervals:
-                print(
-                    "Getting data for instrument: {0} with interval: {1}".format(
-                        instrument[0], interval
+                # Latest stored row is downloaded again, as its period may not be closed
+                start_date = latest_dates.get((instrument[0], interval))
+                series_stale = series_staleness(start_date, interval, today)
+
+                if series_stale < 1:
+                    print(
+                        "Data for instrument: {0} with interval: {1} is up to date".format(
+                            instrument[0], interval
+                        )
                     )
+                    continue
+
+                staleness.append(series_stale)
+                jobs.append(
+                    {
+                        "instrument_name": instrument[0],
+                        "url": instrument[1],
+                        "interval_name": interval,
+                        "start_year": 2010,
+                        "end_year": 2024,
+                        "start_date": start_date,
+                        "end_date": (
+                            datetime.today() if start_date is not None else None
+                        ),
+                    }
                 )
-                temp_df = self.get_data(
-                    driver=driver,
-                    instrument_name=instrument[0],
-                    url=instrument[1],
-                    interval_name=interval,
-                    start_year=2010,
-                    end_year=2024,
-                )
-                time.sleep(5)
-                self.stock_df = pd.concat([self.stock_df, temp_df], ignore_index=True)
 
-        # Closing selenium driver
-        driver.close()
+        # Most stale series are fetched first (order of instruments otherwise)
+        order = sorted(range(len(jobs)), key=lambda index: -staleness[index])
+
+        return [jobs[index] for index in order]
+
+    def checkpoints_since(self):
+        """
+        Method responsible for returning ISO time of the oldest checkpoint
+        belonging to current run (older ones come from previous runs)
+        """
+        since = datetime.now() - timedelta(seconds=self.checkpoint_max_age)
+
+        return since.isoformat(timespec="seconds")
+
+    def get_pending_jobs(self, incremental=False, run_name="default"):
+        """
+        Method responsible for returning jobs not completed yet in run
+        (completed ones are recorded in checkpoint table, checkpoints older
+        than checkpoint_max_age are not taken into account)
+        """
+        completed_jobs = StockDatabase(self.db_path).completed_jobs(
+            run_name, since=self.checkpoints_since()
+        )
+
+        return [
+            job
+            for job in self.get_jobs(incremental=incremental)
+            if job_key(job) not in completed_jobs
+        ]
+
+    def run_scrapper(
+        self,
+        incremental=False,
+        run_name="default",
+        max_chunks=4,
+        budget=None,
+        metrics_path=None,
+    ):
+        """
+        Method responsible for running scrapper and writing data of each job
+        to database as soon as it is downloaded
+        - incremental - get only rows newer than latest ones stored in database
+        - run_name - name of run in checkpoint table (rerun of interrupted run
+          skips jobs completed within checkpoint_max_age, checkpoints are
+          removed when all jobs succeeded)
+        - max_chunks - number of downloaded jobs waiting for writing
+        - budget - total number of seconds of run (jobs which would not finish
+          in it are left for next run)
+        - metrics_path - path to json file with metrics of run (stage timings
+          and database throughput)
+        Returns list of failed, skipped and left jobs with errors
+        """
+        time_budget = TimeBudget(budget)
+        jobs = self.get_pending_jobs(incremental=incremental, run_name=run_name)
+        self.breaker.failed_jobs = []
+
+        writer = ChunkWriter(self.create_db, max_chunks=max_chunks)
+        backend = self.create_backend()
+        backend.open()
+
+        # Downloading data from site for each instrument
+        try:
+            for job, temp_df in backend.fetch_many(time_budget.jobs(jobs)):
+                writer.put(temp_df, [(run_name, job_key(job), len(temp_df))])
+        finally:
+            # Closing backend (e.g. selenium driver)
+            backend.close()
+
+            # Waiting for data of downloaded jobs
+            writer.close()
+
+        # Failed jobs stay pending in checkpoint table for rerun of this run
+        failed_jobs = self.breaker.failed_jobs + [
+            (job, "Time budget of run exceeded") for job in time_budget.left_jobs
+        ]
+
+        self.finish_run(jobs, run_name)
+
+        if metrics_path is not None:
+            metrics.dump(metrics_path)
+
+        return failed_jobs
+
+    def run_parallel_scrapper(
+        self,
+        workers=4,
+        min_interval=2.0,
+        incremental=False,
+        run_name="default",
+        budget=None,
+        metrics_path=None,
+    ):
+        """
+        Method responsible for running scrapper on pool of headless browsers
+        and writing data to database as it comes
+        - workers - number of browser processes
+        - min_interval - minimal number of seconds between starts of two jobs
+        - incremental - get only rows newer than latest ones stored in database
+        - run_name - name of run in checkpoint table (rerun of interrupted run
+          skips jobs completed within checkpoint_max_age, checkpoints are
+          removed when all jobs succeeded)
+        - budget - total number of seconds of run (jobs are not started after it)
+        - metrics_path - path to json file with metrics of run (with metrics
+          of all workers)
+        Returns list of failed jobs
+        """
+        scheduler = ScrapeScheduler(
+            scrapper=self, workers=workers, min_interval=min_interval
+        )
+
+        jobs = self.get_pending_jobs(incremental=incremental, run_name=run_name)
+
+        failed_jobs = scheduler.run(
+            jobs=jobs,
+            writer=lambda job, temp_df: self.create_db(
+                temp_df, [(run_name, job_key(job), len(temp_df))]
+            ),
+            budget=TimeBudget(budget),
+        )
 
-        return self.stock_df
+        self.finish_run(jobs, run_name)
+
+        if metrics_path is not None:
+            metrics.dump(metrics_path)
+
+        return failed_jobs
+
+    def finish_run(self, jobs, run_name):
+        """
+        Method responsible for removing checkpoints of run only when every
+        job has its checkpoint (data of all jobs was written), so failed,
+        skipped or lost jobs stay pending for rerun
+        Returns True if checkpoints were removed
+        """
+        database = StockDatabase(self.db_path)
+        completed_jobs = database.completed_jobs(
+            run_name, since=self.checkpoints_since()
+        )
+
+        if any(job_key(job) not in completed_jobs for job in jobs):
+            return False
+
+        database.clear_checkpoints(run_name)
+
+        return True
 
     def get_data(
         self,
@@ -106,6 +370,8 @@ class StockScrapper:
         interval_name,
         start_year=datetime.today().year - 10,
         end_year=datetime.today().year,
+        start_date=None,
+        end_date=None,
     ):
         """
         Method responsible for scrapping data for whole years from url with declaration of:
@@ -114,32 +380,50 @@ class StockScrapper:
         - interval - interval od data, e.g. daily, weekly, monthly
         - start_year - starting year for period to get
         - end_year - ending year for period to get
+        - start_date - exact starting date (overrides start_year)
+        - end_date - exact ending date (overrides end_year)
         """
-        # Loading site
-        driver.get(url)
+        # Deadline of whole job (every stage is retried until it)
+        deadline = self.retry_policy.start_job()
 
-        # Waiting for page to load
-        try:
-            element_present = EC.presence_of_element_located(
-                (By.CLASS_NAME, "css-1uccc91-singleValue")
-            )
-            WebDriverWait(driver, 5).until(element_present)
-        except:
-            pass
+        def remaining(seconds):
+            # Seconds of waiting bounded by deadline of job
+            return max(0.0, min(seconds, deadline - time.monotonic()))
 
-        try:
-            element_present = EC.presence_of_element_located(
-                (By.CLASS_NAME, "css-1uccc91-singleValue")
+        def wait_for(condition, seconds):
+            # Waiting for condition at most given seconds (next stage runs
+            # after timeout anyway)
+            try:
+                WebDriverWait(driver, remaining(seconds)).until(condition)
+            except TimeoutException:
+                pass
+
+        # Loading page with timeouts of browser set to time left of job
+        def load_page():
+            driver.set_page_load_timeout(max(1.0, deadline - time.monotonic()))
+            driver.set_script_timeout(max(1.0, deadline - time.monotonic()))
+            driver.get(url)
+
+        # Loading site
+        with SCRAPE_STAGE_SECONDS.time(stage="page_load"):
+            self.retry_policy.run("page", [load_page], deadline)
+
+            # Waiting for page to load (time frame of any layout of site)
+            wait_for(
+                EC.any_of(
+                    EC.presence_of_element_located(
+                        (By.CLASS_NAME, "css-1uccc91-singleValue")
+                    ),
+                    EC.presence_of_element_located((By.CLASS_NAME, "flex-1")),
+                ),
+                10,
             )
-            WebDriverWait(driver, 5).until(element_present)
-        except:
-            pass
 
-        # Accepting cache
-        try:
-            driver.find_element(By.ID, "onetrust-accept-btn-handler").click()
-        except Exception as e:
-            print("Cookies already accepted!")
+            # Accepting cache
+            try:
+                driver.find_element(By.ID, "onetrust-accept-btn-handler").click()
+            except Exception as e:
+                print("Cookies already accepted!")
 
         # Matching interval to get
         interval = 0
@@ -153,357 +437,240 @@ class StockScrapper:
                 interval = 2
             case _:
                 interval = 0
-        # Selecting time interval
-        while True:
-            # Selecting time frame (one type)
-            try:
-                # Clicking time frame element
-                driver.find_element(By.CLASS_NAME, "css-1uccc91-singleValue").click()
-
-                # Choosing time frame (from html)
-                #   react-select-2-option-0 = Daily
-                #   react-select-2-option-1 = Weekly
-                #   react-select-2-option-2 = Monthly
-                time_frame = [
-                    "react-select-2-option-0",
-                    "react-select-2-option-1",
-                    "react-select-2-option-2",
-                ]
-
-                driver.find_element(By.CLASS_NAME, "css-1uhu340-menu").find_element(
-                    By.ID, time_frame[interval]
-                ).click()
-                break
-            except:
-                pass
-
-            # Selecting time frame (second type)
-            try:
-                # Clicking time frame element
-                time_frame_elem = [
-                    elem
-                    for elem in driver.find_elements(By.CLASS_NAME, "flex-1")
-                    if elem.text == "Daily"
-                    or elem.text == "Weekly"
-                    or elem.text == "Monthly"
-                ][0]
-                time_frame_elem.click()
-
-                # Choosing time frame (from list)
-                #  0 = Daily
-                #  1 = Weekly
-                #  2 = Monthly
-                time_frame = driver.find_elements(
-                    By.CLASS_NAME, "historical-data-v2_menu-row-text__ZgtVH"
-                )
 
-                time_frame[interval].click()
-                break
-            except:
-                pass
-
-        time.sleep(1)
-
-        # Selecting period of data
-        while True:
-            # First type of date picking
-            try:
-                checker = 0
-                while checker < 2:
-                    # Clicking on date box
-                    driver.find_element(
-                        By.CLASS_NAME, "DatePickerWrapper_input__UVqms"
-                    ).click()
-
-                    # Getting date elements
-                    date_elements = driver.find_elements(
-                        By.CLASS_NAME, "NativeDateInput_root__lZxBl"
-                    )
-
-                    # Selecting end year
-                    date_elements[1].find_element(By.TAG_NAME, "input").clear()
-                    date_elements[1].find_element(By.TAG_NAME, "input").send_keys(
-                        "01.01.{0}".format(end_year - 1)
-                    )
-
-                    # Selecting start date
-                    date_elements[0].find_element(By.TAG_NAME, "input").clear()
-                    date_elements[0].find_element(By.TAG_NAME, "input").send_keys(
-                        "01.01.{0}".format(start_year)
-                    )
-
-                    # Applying picked dates
-                    driver.find_element(
-                        By.CLASS_NAME, "HistoryDatePicker_footer__xzpr0"
-                    ).find_element(By.TAG_NAME, "button").click()
+        # Selecting time frame (one type)
+        def select_time_frame():
+            # Clicking time frame element
+            driver.find_element(By.CLASS_NAME, "css-1uccc91-singleValue").click()
+
+            # Choosing time frame (from html)
+            #   react-select-2-option-0 = Daily
+            #   react-select-2-option-1 = Weekly
+            #   react-select-2-option-2 = Monthly
+            time_frame = [
+                "react-select-2-option-0",
+                "react-select-2-option-1",
+                "react-select-2-option-2",
+            ]
+
+            driver.find_element(By.CLASS_NAME, "css-1uhu340-menu").find_element(
+                By.ID, time_frame[interval]
+            ).click()
+
+        # Selecting time frame (second type)
+        def select_time_frame_v2():
+            # Clicking time frame element
+            time_frame_elem = [
+                elem
+                for elem in driver.find_elements(By.CLASS_NAME, "flex-1")
+                if elem.text == "Daily"
+                or elem.text == "Weekly"
+                or elem.text == "Monthly"
+            ][0]
+            time_frame_elem.click()
+
+            # Choosing time frame (from list)
+            #  0 = Daily
+            #  1 = Weekly
+            #  2 = Monthly
+            time_frame = driver.find_elements(
+                By.CLASS_NAME, "historical-data-v2_menu-row-text__ZgtVH"
+            )
 
-                    time.sleep(5)
-                    checker += 1
-                break
-            except:
-                pass
+            time_frame[interval].click()
 
-            # Second type of date picking
-            try:
-                # Clicking date frame
+        # First type of date picking
+        def pick_dates():
+            checker = 0
+            while checker < 2:
+                # Clicking on date box
                 driver.find_element(
-                    By.XPATH,
-                    '//*[@class="flex py-2 px-[14px] gap-[14px] flex-1 border border-solid border-[#CFD4DA] rounded bg-[#FFF] shadow-select items-center "]',
+                    By.CLASS_NAME, "DatePickerWrapper_input__UVqms"
                 ).click()
 
-                time.sleep(1)
-
-                # Selecting end date
-                end_date = [
-                    elem for elem in driver.find_elements(By.TAG_NAME, "input")
-                ][2]
-                end_date.clear()
-                end_date.send_keys("01.00.{0}".format(end_year))
+                # Getting date elements
+                date_elements = driver.find_elements(
+                    By.CLASS_NAME, "NativeDateInput_root__lZxBl"
+                )
 
-                time.sleep(1)
+                # Selecting end year
+                date_elements[1].find_element(By.TAG_NAME, "input").clear()
+                date_elements[1].find_element(By.TAG_NAME, "input").send_keys(
+                    end_date.strftime("%d.%m.%Y")
+                    if end_date is not None
+                    else "01.01.{0}".format(end_year - 1)
+                )
 
                 # Selecting start date
-                start_date = [
-                    elem for elem in driver.find_elements(By.TAG_NAME, "input")
-                ][1]
-                start_date.clear()
-                start_date.send_keys("31.12.{0}".format(start_year - 1))
+                date_elements[0].find_element(By.TAG_NAME, "input").clear()
+                date_elements[0].find_element(By.TAG_NAME, "input").send_keys(
+                    start_date.strftime("%d.%m.%Y")
+                    if start_date is not None
+                    else "01.01.{0}".format(start_year)
+                )
 
-                # Accepting date
+                # Applying picked dates
                 driver.find_element(
-                    By.XPATH,
-                    '//*[@class="flex py-2.5 pl-4 pr-6 items-center gap-3 rounded bg-v2-blue shadow-button hover:bg-[#116BCC] cursor-pointer"]',
-                ).click()
-                break
-            except:
-                pass
-
-        # Waiting for page to load full table
-        time.sleep(5)
-
-        # Getting table HTML
-        while True:
-            # First type of getting table
-            try:
-                # Getting table element with data
-                table_wth_data = [
-                    elem
-                    for elem in driver.find_elements(By.TAG_NAME, "table")
-                    if elem.get_attribute("data-test") == "historical-data-table"
-                ][0]
-                temp_stock_df = pd.read_html(
-                    table_wth_data.get_attribute("outerHTML").replace(",", ".")
-                )[0]
-
-                # Currency of downloaded instrument
-                intrument_currency = driver.find_element(
-                    By.CLASS_NAME, "instrument-metadata_currency__XER9q"
-                ).text.split("\n")[1]
-                break
-            except:
-                time.sleep(1)
-
-            # Second type of getting table
-            try:
-                # Getting table element with data
-                table_wth_data = driver.find_element(
-                    By.XPATH,
-                    '//*[@class="w-full text-xs leading-4 overflow-x-auto freeze-column-w-1"]',
+                    By.CLASS_NAME, "HistoryDatePicker_footer__xzpr0"
+                ).find_element(By.TAG_NAME, "button").click()
+
+                # Waiting for date picker to close
+                wait_for(
+                    EC.invisibility_of_element_located(
+                        (By.CLASS_NAME, "HistoryDatePicker_footer__xzpr0")
+                    ),
+                    5,
                 )
-                temp_stock_df = pd.read_html(
-                    table_wth_data.get_attribute("outerHTML").replace(",", ".")
-                )[0]
-
-                # Currency of downloaded instrument
-                intrument_currency = driver.find_element(
-                    By.XPATH, '//*[@class="ml-1.5 font-bold"]'
-                ).text
-                break
-            except:
-                time.sleep(1)
-
-        # Adding instrument name and its currency to data frame
-        temp_stock_df.insert(0, "Instrument", instrument_name)
-        temp_stock_df.insert(1, "Currency", intrument_currency)
-        temp_stock_df.insert(2, "Interval", interval_name)
-
-        return temp_stock_df
-
-    def create_db(self, stock_df):
-        """
-        Method responsible for creating sqlite database
-        """
-        print("CREATING STOCK DATABASE!\n")
-
-        # Creating column with currency_id
-        temp_stock_df.insert(1, "currency_id", stock_df["Currency"])
-
-        # Getting unique list od currencies
-        currency_list = stock_df["Currency"].unique()
-
-        # Mapping currency column with numbers
-        temp_stock_df["currency_id"] = temp_stock_df["currency_id"].map(
-            {currency: index + 1 for index, currency in enumerate(currency_list)}
-        )
+                checker += 1
+
+        # Second type of date picking
+        def pick_dates_v2():
+            # Clicking date frame
+            driver.find_element(
+                By.XPATH,
+                '//*[@class="flex py-2 px-[14px] gap-[14px] flex-1 border border-solid border-[#CFD4DA] rounded bg-[#FFF] shadow-select items-center "]',
+            ).click()
+
+            # Waiting for inputs of dates
+            wait_for(
+                lambda driver: len(driver.find_elements(By.TAG_NAME, "input")) > 2, 1
+            )
 
-        # Data frame for currency identification
-        currency_df = pd.DataFrame(
-            [[index + 1, currency] for index, currency in enumerate(currency_list)],
-            columns=["currency_id", "currency_name"],
-        )
+            # Selecting end date
+            end_date_elem = [
+                elem for elem in driver.find_elements(By.TAG_NAME, "input")
+            ][2]
+            end_date_elem.clear()
+            end_date_elem.send_keys(
+                end_date.strftime("%d.%m.%Y")
+                if end_date is not None
+                else "01.00.{0}".format(end_year)
+            )
 
-        # Creting column with instrument_id
-        temp_stock_df.insert(0, "instrument_id", stock_df["Instrument"])
+            # Selecting start date
+            start_date_elem = [
+                elem for elem in driver.find_elements(By.TAG_NAME, "input")
+            ][1]
+            start_date_elem.clear()
+            start_date_elem.send_keys(
+                start_date.strftime("%d.%m.%Y")
+                if start_date is not None
+                else "31.12.{0}".format(start_year - 1)
+            )
 
-        # Getting unique list od currencies
-        instrument_list = stock_df["Instrument"].unique()
+            # Accepting date
+            driver.find_element(
+                By.XPATH,
+                '//*[@class="flex py-2.5 pl-4 pr-6 items-center gap-3 rounded bg-v2-blue shadow-button hover:bg-[#116BCC] cursor-pointer"]',
+            ).click()
+
+        # First type of getting table
+        def read_table():
+            # Getting table element with data
+            table_wth_data = [
+                elem
+                for elem in driver.find_elements(By.TAG_NAME, "table")
+                if elem.get_attribute("data-test") == "historical-data-table"
+            ][0]
+            temp_stock_df = parse_table(table_wth_data.get_attribute("outerHTML"))
+
+            # Currency of downloaded instrument
+            intrument_currency = extract_currency(
+                driver.find_element(
+                    By.CLASS_NAME, "instrument-metadata_currency__XER9q"
+                ).get_attribute("outerHTML")
+            )
 
-        # Mapping instrument column with numbers
-        temp_stock_df["instrument_id"] = temp_stock_df["instrument_id"].map(
-            {instrument: index + 1 for index, instrument in enumerate(instrument_list)}
-        )
+            return temp_stock_df, intrument_currency
 
-        # Data frame for instrument identification
-        instrument_df = pd.DataFrame(
-            [
-                [index + 1, instrument]
-                for index, instrument in enumerate(instrument_list)
-            ],
-            columns=["instrument_id", "instrument_name"],
-        )
+        # Second type of getting table
+        def read_table_v2():
+            # Getting table element with data
+            table_wth_data = driver.find_element(
+                By.XPATH,
+                '//*[@class="w-full text-xs leading-4 overflow-x-auto freeze-column-w-1"]',
+            )
+            temp_stock_df = parse_table(table_wth_data.get_attribute("outerHTML"))
 
-        temp_stock_df = temp_stock_df.drop(["Instrument", "Currency"], axis=1)
+            # Currency of downloaded instrument
+            intrument_currency = extract_currency(
+                driver.find_element(
+                    By.XPATH, '//*[@class="ml-1.5 font-bold"]'
+                ).get_attribute("outerHTML")
+            )
 
-        sql_insert_currency = [
-            """create table if not EXISTS currency (
-        currency_id integer PRIMARY key,
-        currency_name text 
-        );"""
-        ]
+            return temp_stock_df, intrument_currency
 
-        for currency in currency_df.values:
-            currency_id = currency[0]
-            currency_name = currency[1]
-            temp_line = """insert into currency (currency_id, currency_name) values ({0}, '{1}');""".format(
-                currency_id, currency_name
+        # Selecting time interval
+        with SCRAPE_STAGE_SECONDS.time(stage="interval_select"):
+            self.retry_policy.run(
+                "time frame", [select_time_frame, select_time_frame_v2], deadline
             )
 
-            sql_insert_currency.append(temp_line)
+        # Table shown before picking dates (replaced when data of period is loaded)
+        old_tables = driver.find_elements(By.TAG_NAME, "table")
 
-        sql_insert_intrument = [
-            """create table if not EXISTS instrument (
-        instrument_id integer PRIMARY key,
-        instrument_name text 
-        );"""
-        ]
+        # Selecting period of data
+        with SCRAPE_STAGE_SECONDS.time(stage="date_pick"):
+            self.retry_policy.run("dates", [pick_dates, pick_dates_v2], deadline)
 
-        for instrument in instrument_df.values:
-            instrument_id = instrument[0]
-            instrument_name = instrument[1]
-            temp_line = """insert into instrument (instrument_id, instrument_name) values ({0}, '{1}');""".format(
-                instrument_id, instrument_name
-            )
+        # Waiting for page to load full table
+        if old_tables:
+            wait_for(EC.staleness_of(old_tables[0]), 5)
+        else:
+            wait_for(EC.presence_of_element_located((By.TAG_NAME, "table")), 5)
 
-            sql_insert_intrument.append(temp_line)
-
-        sql_insert_stock = [
-            """create table if not EXISTS stock (
-        id integer PRIMARY key AUTOINCREMENT,
-        instrument_id integer not NULL,
-        currency_id integer not null,
-        date text not NULL,
-        interval text,
-        last_price real,
-        open_price real,
-        max_price real,
-        min_price real,
-        volume text,
-        change text,
-        FOREIGN KEY (instrument_id)
-            REFERENCES instrument (instrument_id),
-        FOREIGN KEY (currency_id)
-            REFERENCES currency (currency_id)
-        );"""
-        ]
+        # Getting table HTML
+        with SCRAPE_STAGE_SECONDS.time(stage="table_read"):
+            temp_stock_df, intrument_currency = self.retry_policy.run(
+                "table", [read_table, read_table_v2], deadline
+            )
 
-        for stock_row in temp_stock_df.fillna("").values:
-            instrument_id = stock_row[0]
-            currency_id = stock_row[1]
-            interval = stock_row[2]
-            date = stock_row[3]
-            last_price = stock_row[4]
-            open_price = stock_row[5]
-            max_price = stock_row[6]
-            min_price = stock_row[7]
-            volume = stock_row[8]
-            change = stock_row[9]
-
-            if len(str(last_price).split(".")) == 3:
-                last_price = str(last_price)
-                last_price = float(
-                    last_price.split(".")[0]
-                    + last_price.split(".")[1]
-                    + "."
-                    + last_price.split(".")[2]
-                )
+        # Adding instrument name and its currency to data frame
+        return build_stock_df(
+            temp_stock_df, instrument_name, intrument_currency, interval_name
+        )
 
-            if len(str(open_price).split(".")) == 3:
-                open_price = str(open_price)
-                open_price = float(
-                    open_price.split(".")[0]
-                    + open_price.split(".")[1]
-                    + "."
-                    + open_price.split(".")[2]
-                )
+    def create_db(self, stock_df, checkpoints=()):
+        """
+        Method responsible for creating sqlite database
+        - stock_df - data frame from scrapper
+        - checkpoints - (run_name, job_key, rows) of jobs completed with data,
+          recorded after data is written
+        """
+        print("CREATING STOCK DATABASE!\n")
 
-            if len(str(max_price).split(".")) == 3:
-                max_price = str(max_price)
-                max_price = float(
-                    max_price.split(".")[0]
-                    + max_price.split(".")[1]
-                    + "."
-                    + max_price.split(".")[2]
-                )
+        database = StockDatabase(self.db_path)
 
-            if len(str(min_price).split(".")) == 3:
-                min_price = str(min_price)
-                min_price = float(
-                    min_price.split(".")[0]
-                    + min_price.split(".")[1]
-                    + "."
-                    + min_price.split(".")[2]
-                )
+        if not stock_df.empty:
+            # Converting columns to numbers
+            temp_stock_df = normalize_stock_df(stock_df)
 
-            temp_values = (
-                "({0}, {1}, '{2}', '{3}', {4}, {5}, {6}, {7}, '{8}', '{9}')".format(
-                    instrument_id,
-                    currency_id,
-                    date,
-                    interval,
-                    last_price,
-                    open_price,
-                    max_price,
-                    min_price,
-                    volume,
-                    change,
-                )
+            # Keeping only latest of duplicated rows (same instrument, interval and date)
+            temp_stock_df = temp_stock_df.drop_duplicates(
+                subset=["instrument_name", "interval", "date"], keep="last"
             )
-            temp_line = """insert into stock (instrument_id, currency_id, date, interval, last_price, open_price, max_price, min_price, volume, change) values {0};""".format(
-                temp_values
-            )
-
-            sql_insert_stock.append(temp_line)
 
-        conn = sqlite3.connect("stock_prices.db")
-        c = conn.cursor()
+            # Upserting all rows in one transaction
+            start_time = time.perf_counter()
+            rows = database.load(stock_rows=to_rows(temp_stock_df))
+            elapsed = time.perf_counter() - start_time
 
-        [c.execute(sql_insert) for sql_insert in sql_insert_stock]
+            DB_WRITE_SECONDS.observe(elapsed, stage="load")
+            DB_ROWS.inc(rows)
+            DB_LOAD_ROWS_PER_SECOND.set(rows / elapsed if elapsed > 0 else 0)
 
-        [c.execute(sql_insert) for sql_insert in sql_insert_intrument]
+            # Recomputing Weekly and Monthly buckets with new daily rows
+            if self.derive_rollups:
+                daily_df = temp_stock_df[temp_stock_df["interval"] == "Daily"]
+                since = daily_df.groupby("instrument_name")["date"].min().to_dict()
 
-        [c.execute(sql_insert) for sql_insert in sql_insert_currency]
+                with DB_WRITE_SECONDS.time(stage="rollup"):
+                    RollupEngine(database).update(since)
 
-        conn.commit()
-        conn.close()
+        # Jobs are recorded only when all their data is written
+        if checkpoints:
+            with DB_WRITE_SECONDS.time(stage="checkpoints"):
+                database.save_checkpoints(checkpoints)
 
         print("DATABASE CREATED")
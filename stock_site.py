@@ -1,95 +1,398 @@
 import os
-import sqlite3
-import pandas as pd
-import seaborn as sns
-import matplotlib
-
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-from datetime import datetime
-from flask import Flask, render_template, request
-
-sns.set_style("whitegrid")
-
-# Connection to sqlite db
-conn = sqlite3.connect("stock_prices.db")
-c = conn.cursor()
-
-# Selecting data with sql statement
-df = c.execute(
-    """select instrument_name, currency_name, date, interval, last_price, open_price ,max_price, min_price, volume, change
-from stock 
-left join instrument on instrument.instrument_id = stock.instrument_id
-left join currency on currency.currency_id  = stock.currency_id;"""
-).fetchall()
-
-# Creating dataframe
-df = pd.DataFrame(df, columns=[col[0] for col in c.description])
-df["date"] = df["date"].apply(lambda x: datetime.strptime(x, "%d.%m.%Y"))
-
-# Closing database connections
-conn.commit()
-conn.close()
+import time
+import numpy as np
+from flask import (
+    Flask,
+    abort,
+    g,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
+from stock_api import compress, encode_binary, encode_json, series_columns
+from stock_cache import PlotCache, make_key
+from stock_compare import COMPARE_LABELS, COMPARE_MODES, align_series, compare_series
+from stock_db import StockDatabase
+from stock_downsample import (
+    DOWNSAMPLE_METHODS,
+    aggregate_ohlc,
+    downsample,
+    downsample_wide,
+    target_candles,
+    target_points,
+)
+from stock_export import EXPORT_FORMATS, iter_batches, iter_csv, iter_parquet, pq
+from stock_fx import CurrencyConverter
+from stock_indicators import INDICATOR_PANELS, IndicatorEngine, parse_indicator
+from stock_metrics import RequestProfiler, metrics
+from stock_plot import (
+    CHART_TYPES,
+    FIGURE_DPI,
+    FIGURE_SIZE,
+    PLOT_STAGE_SECONDS,
+    PlotRenderer,
+)
+from stock_refresh import DataRefresher
+from stock_snapshot import database_signature, load_snapshot_store
+from stock_store import SqlSeriesStore, load_series_store
+
+# Path to sqlite db
+DB_PATH = os.environ.get("STOCK_DB_PATH", "stock_prices.db")
+
+# Maximal number of rendered plots kept in memory
+PLOT_CACHE_SIZE = int(os.environ.get("STOCK_PLOT_CACHE_SIZE", 128))
+
+# Maximal number of indicator series kept in memory
+INDICATOR_CACHE_SIZE = int(os.environ.get("STOCK_INDICATOR_CACHE_SIZE", 256))
+
+# Maximal number of series converted to other currency kept in memory
+CURRENCY_CACHE_SIZE = int(os.environ.get("STOCK_CURRENCY_CACHE_SIZE", 256))
+
+# Number of processes rendering plots (0 renders in request thread)
+PLOT_WORKERS = (
+    int(os.environ["STOCK_PLOT_WORKERS"])
+    if "STOCK_PLOT_WORKERS" in os.environ
+    else None
+)
+
+# Mode of data access: snapshot (memory-mapped files written from db),
+# memory (whole db loaded at start) or sql (query per selection)
+DATA_MODE = os.environ.get("STOCK_DATA_MODE", "snapshot")
+
+# Seconds between checks of new data in db (0 disables refreshing)
+REFRESH_INTERVAL = float(os.environ.get("STOCK_REFRESH_INTERVAL", 5))
+
+# Requests slower than this number of milliseconds are saved with cProfile
+# output to STOCK_PROFILE_DIR (profiling is disabled when not set)
+PROFILE_SLOW_MS = (
+    float(os.environ["STOCK_PROFILE_SLOW_MS"])
+    if "STOCK_PROFILE_SLOW_MS" in os.environ
+    else None
+)
+PROFILE_DIR = os.environ.get("STOCK_PROFILE_DIR", "profiles")
+
+# Seconds of handling requests and statistics of caches
+REQUEST_SECONDS = metrics.histogram(
+    "stock_request_seconds", "Seconds of handling requests"
+)
+CACHE_STATS = metrics.gauge("stock_cache_stats", "Statistics of caches of site")
+
+# Migrating db to current schema (e.g. ISO dates)
+StockDatabase(DB_PATH).migrate()
+
+
+def set_store(new_store):
+    """
+    Method responsible for replacing store used by requests
+    """
+    global store
+    store = new_store
+
+
+# Watching db before store is built, so no write is missed
+refresher = DataRefresher(
+    DB_PATH,
+    get_store=lambda: store,
+    set_store=set_store,
+    interval=REFRESH_INTERVAL,
+    snapshot=DATA_MODE not in ("sql", "memory"),
+)
+
+# Building store with series partitioned by instrument and interval
+# (or store querying db for each selection in sql mode)
+if DATA_MODE == "sql":
+    store = SqlSeriesStore(DB_PATH, version=database_signature(DB_PATH))
+elif DATA_MODE == "memory":
+    store = load_series_store(DB_PATH, version=database_signature(DB_PATH))
+else:
+    store = load_snapshot_store(DB_PATH)
+
+# Cache with rendered plots
+plot_cache = PlotCache(max_size=PLOT_CACHE_SIZE)
+
+# Engine with cached indicators of series
+indicator_engine = IndicatorEngine(max_size=INDICATOR_CACHE_SIZE)
+
+# Converter of series to other currency with cached converted series
+currency_converter = CurrencyConverter(max_size=CURRENCY_CACHE_SIZE)
+
+# Renderer of plots
+plot_renderer = PlotRenderer(workers=PLOT_WORKERS)
+
+# Profiler of slow requests
+profiler = (
+    RequestProfiler(threshold=PROFILE_SLOW_MS / 1000, directory=PROFILE_DIR)
+    if PROFILE_SLOW_MS is not None
+    else None
+)
+
+# Refreshing store when new data is written to db
+if REFRESH_INTERVAL > 0:
+    refresher.start()
 
 # Creating Flask App
 app = Flask(__name__)
 
 
-def create_plot(stock_name, start_date, end_date, interval, df):
+@app.before_request
+def start_request():
+    """
+    Method reponsible for starting timer (and profiler) of request
+    """
+    g.start_time = time.perf_counter()
+    g.profile = profiler.start() if profiler is not None else None
+
+
+@app.after_request
+def finish_request(response):
+    """
+    Method reponsible for recording seconds of request (and saving
+    profile of slow request)
+    """
+    seconds = time.perf_counter() - g.start_time
+
+    REQUEST_SECONDS.observe(
+        seconds,
+        endpoint=request.endpoint or "unknown",
+        method=request.method,
+        status=response.status_code,
+    )
+
+    if profiler is not None:
+        path = profiler.stop(g.profile, request.endpoint or "unknown", seconds)
+
+        if path is not None:
+            print("Slow request: {0} profiled to {1}".format(request.path, path))
+
+    return response
+
+
+def create_plot(
+    stock_name,
+    start_date,
+    end_date,
+    interval,
+    store,
+    downsample_method="lttb",
+    compare_mode="price",
+    indicators=(),
+    chart_type="line",
+    currency_name="",
+):
     """
     Method responsible for creating plot with declaration:
-    - Name of stock
+    - Name of stock (or list of names for comparison)
     - Lower date
     - Upper date
     - Interval (daily, weekly or yearly)
-    - Df <- data frame
+    - Store <- store with series
+    - Downsample method (lttb, minmax or none)
+    - Compare mode (price, rebase or returns)
+    - Indicators drawn with prices of one stock (e.g. sma:50, rsi)
+    - Chart type of one stock (line, candlestick or ohlc with volume panel),
+      comparison is drawn with lines
+    - Currency of prices (empty for own currency of each stock)
+    Returns specification of plot for renderer
+    Raises ValueError when there is no exchange rate to currency
+    and LookupError when selection has no data
     """
+    store = select_store(store, currency_name)
+    stock_names = [stock_name] if isinstance(stock_name, str) else list(stock_name)
+
+    if len(stock_names) > 1 or compare_mode != "price":
+        return create_compare_plot(
+            stock_names,
+            start_date,
+            end_date,
+            interval,
+            store,
+            downsample_method,
+            compare_mode,
+        )
+
+    stock_name = stock_names[0]
+
     # Getting data from selection
-    temp_df = df[
-        (df["instrument_name"] == stock_name)
-        & (df["date"] >= start_date)
-        & (df["date"] <= end_date)
-        & (df["interval"] == interval)
-    ]
-
-    # Setting size of plot figure
-    fig = plt.figure(figsize=(15, 7.5))
-
-    # Creating line plot for current selection
-    plt.plot(temp_df["date"], temp_df["last_price"])
-
-    # Title of plot
-    plt.title(
-        "{0}, period: {1} - {2}".format(stock_name.upper(), start_date, end_date),
-        fontsize=16,
-        loc="left",
-        pad=20,
-        color="#595959",
+    temp_df = store.lookup(
+        stock_name=stock_name,
+        start_date=start_date,
+        end_date=end_date,
+        interval=interval,
     )
 
-    # Y axis label
-    plt.ylabel(
-        "Value in {0}".format(temp_df["currency_name"].unique()[0]),
-        fontsize=14,
-        labelpad=20,
-        color="#A6A6A6",
+    if temp_df.empty:
+        raise LookupError("No data for selection")
+
+    if chart_type == "line":
+        # Keeping only points which can be seen on figure
+        temp_df = downsample(
+            temp_df,
+            n_out=target_points(FIGURE_SIZE[0], FIGURE_DPI),
+            method=downsample_method,
+        )
+    else:
+        # Candles need all prices, merged so each candle can be seen on figure
+        temp_df = temp_df.dropna(
+            subset=["open_price", "max_price", "min_price", "last_price"]
+        )
+
+        if downsample_method != "none":
+            temp_df = aggregate_ohlc(
+                temp_df, n_out=target_candles(FIGURE_SIZE[0], FIGURE_DPI)
+            )
+
+    # Specification of plot, rendered without pyplot global state
+    plot_spec = {
+        "stock_name": stock_name,
+        "start_date": start_date,
+        "end_date": end_date,
+        "interval": interval,
+        "currency_name": temp_df["currency_name"].unique()[0],
+        "dates": temp_df["date"].to_numpy(),
+        "values": temp_df["last_price"].to_numpy(),
+    }
+
+    # Prices of candles and volume (if instrument has any)
+    if chart_type != "line":
+        plot_spec["chart"] = chart_type
+        plot_spec["ohlc"] = {
+            "open": temp_df["open_price"].to_numpy(dtype=np.float64),
+            "high": temp_df["max_price"].to_numpy(dtype=np.float64),
+            "low": temp_df["min_price"].to_numpy(dtype=np.float64),
+            "close": temp_df["last_price"].to_numpy(dtype=np.float64),
+        }
+
+        volume = temp_df["volume"].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        if np.isfinite(volume).any():
+            plot_spec["volume"] = np.nan_to_num(volume)
+
+    # Indicators computed over whole series, taken at plotted dates
+    if indicators:
+        plot_spec["overlays"], plot_spec["panels"] = create_indicators(
+            stock_name,
+            interval,
+            indicators,
+            temp_df["date"].to_numpy(dtype="datetime64[ns]"),
+            store,
+            indicator_engine,
+        )
+
+    return plot_spec
+
+
+def select_store(store, currency_name):
+    """
+    Method responsible for returning store with series in currency
+    (store itself for empty currency)
+    """
+    if not currency_name:
+        return store
+
+    return currency_converter.view(store, currency_name)
+
+
+def check_currency(store, currency_name):
+    """
+    Method responsible for rejecting request with currency without exchange rates
+    """
+    if currency_name and currency_name not in currency_converter.currencies(store):
+        abort(400, "Unknown currency: {0}".format(currency_name))
+
+
+def create_indicators(stock_name, interval, indicators, dates, store, engine):
+    """
+    Method responsible for returning (overlays, panels) of plot specification
+    with indicators of stock at dates
+    """
+    # Whole series, so indicators at first dates have their history
+    series_df = store.lookup(
+        stock_name=stock_name, start_date=None, end_date=None, interval=interval
+    )
+    series_df = series_df[series_df["last_price"].notna()]
+
+    if series_df.empty:
+        return [], []
+
+    # Series in other currency has its own cached indicators
+    series_key = (stock_name, interval, series_df["currency_name"].iloc[0])
+
+    series_dates = series_df["date"].to_numpy(dtype="datetime64[ns]")
+    series_values = series_df["last_price"].to_numpy(dtype=np.float64)
+
+    # Positions of plotted dates in series (dates without price are empty)
+    positions = np.minimum(np.searchsorted(series_dates, dates), len(series_dates) - 1)
+    found = series_dates[positions] == dates
+
+    overlays = []
+    panels = []
+
+    for indicator in indicators:
+        result = engine.compute(series_key, indicator, series_dates, series_values)
+        series = [
+            (label, np.where(found, values[positions], np.nan))
+            for label, values in result.columns.items()
+        ]
+
+        name = indicator.split(":")[0]
+
+        if name in INDICATOR_PANELS:
+            panels.append((INDICATOR_PANELS[name], series))
+        else:
+            overlays.extend(series)
+
+    return overlays, panels
+
+
+def create_compare_plot(
+    stock_names, start_date, end_date, interval, store, downsample_method, compare_mode
+):
+    """
+    Method responsible for creating plot comparing several instruments
+    aligned on common date axis
+    Returns specification of plot for renderer
+    Raises LookupError when selection has no data
+    """
+    # Getting data of all instruments at once
+    long_df = store.lookup_many(
+        stock_names=stock_names,
+        start_date=start_date,
+        end_date=end_date,
+        interval=interval,
     )
 
-    # X axis label
-    plt.xlabel(
-        "Interval: {0}".format(interval), fontsize=14, labelpad=20, color="#A6A6A6"
+    if long_df["last_price"].isna().all():
+        raise LookupError("No data for selection")
+
+    # One column per instrument, rebased or as returns
+    wide_df = compare_series(align_series(long_df, stock_names), compare_mode)
+
+    # Keeping only points which can be seen on figure
+    wide_df = downsample_wide(
+        wide_df,
+        n_out=target_points(FIGURE_SIZE[0], FIGURE_DPI),
+        method=downsample_method,
     )
 
-    # Changing font and color of y and x axis values
-    plt.tick_params(colors="#595959", which="both")
-    plt.xticks(fontsize=12)
-    plt.yticks(fontsize=12)
+    currency_names = long_df["currency_name"].dropna().unique()
 
-    # Changing rotation of x axis values for Daily and Weekly interal
-    if interval == "Daily" or interval == "Weekly":
-        plt.xticks(rotation=45)
+    plot_spec = {
+        "stock_name": ", ".join(stock_names),
+        "start_date": start_date,
+        "end_date": end_date,
+        "interval": interval,
+        "currency_name": ", ".join(currency_names),
+        "value_label": COMPARE_LABELS.get(
+            compare_mode, "Value in {0}".format(", ".join(currency_names))
+        ),
+        "labels": [stock_name.upper() for stock_name in stock_names],
+        "dates": wide_df.index.to_numpy(),
+        "values": wide_df.to_numpy(),
+    }
 
-    return plt
+    return plot_spec
 
 
 @app.route("/")
@@ -100,39 +403,351 @@ def main_site():
     return render_template("main.html")
 
 
+def read_selection(values):
+    """
+    Method reponsible for returning plot selection from values of form
+    or query string (request is rejected for wrong values)
+    """
+    selection = {
+        "stock_names": values.getlist("stockname"),
+        "start_date": values["startdate"],
+        "end_date": values["enddate"],
+        "interval": values["interval"],
+        "downsample_method": values.get("downsample", "lttb"),
+        "compare_mode": values.get("compare", "price"),
+        "indicators": values.getlist("indicator"),
+        "chart_type": values.get("chart", "line"),
+        "currency_name": values.get("currency", ""),
+    }
+
+    if not selection["stock_names"]:
+        abort(400, "No instrument selected")
+
+    if selection["downsample_method"] not in DOWNSAMPLE_METHODS:
+        abort(
+            400,
+            "Unknown downsample method: {0}".format(selection["downsample_method"]),
+        )
+
+    if selection["compare_mode"] not in COMPARE_MODES:
+        abort(400, "Unknown compare mode: {0}".format(selection["compare_mode"]))
+
+    if selection["chart_type"] not in CHART_TYPES:
+        abort(400, "Unknown chart type: {0}".format(selection["chart_type"]))
+
+    for indicator in selection["indicators"]:
+        try:
+            parse_indicator(indicator)
+        except ValueError as error:
+            abort(400, str(error))
+
+    return selection
+
+
+def selection_query(selection):
+    """
+    Method reponsible for returning query string values of plot selection
+    (url of image can render plot again in any process)
+    """
+    return {
+        "stockname": selection["stock_names"],
+        "startdate": selection["start_date"],
+        "enddate": selection["end_date"],
+        "interval": selection["interval"],
+        "downsample": selection["downsample_method"],
+        "compare": selection["compare_mode"],
+        "indicator": selection["indicators"],
+        "chart": selection["chart_type"],
+        "currency": selection["currency_name"],
+    }
+
+
+def plot_key(selection, current_store):
+    """
+    Method reponsible for returning key of plot selection and current
+    versions of its instruments
+    """
+    check_currency(current_store, selection["currency_name"])
+    version_store = select_store(current_store, selection["currency_name"])
+
+    return plot_cache.make_key(
+        ",".join(selection["stock_names"]),
+        selection["start_date"],
+        selection["end_date"],
+        selection["interval"],
+        selection["downsample_method"],
+        selection["compare_mode"],
+        ",".join(selection["indicators"]),
+        selection["chart_type"],
+        selection["currency_name"],
+        ",".join(
+            str(version_store.series_version(stock_name))
+            for stock_name in selection["stock_names"]
+        ),
+    )
+
+
+def render_selection(selection, current_store, key):
+    """
+    Method reponsible for returning PNG image of plot selection
+    (from cache or rendered and cached under key)
+    """
+    image = plot_cache.get(key)
+
+    if image is not None:
+        return image
+
+    # Crearting plot
+    with PLOT_STAGE_SECONDS.time(stage="filter"):
+        try:
+            plot_spec = create_plot(
+                stock_name=selection["stock_names"],
+                start_date=selection["start_date"],
+                end_date=selection["end_date"],
+                interval=selection["interval"],
+                store=current_store,
+                downsample_method=selection["downsample_method"],
+                compare_mode=selection["compare_mode"],
+                indicators=selection["indicators"],
+                chart_type=selection["chart_type"],
+                currency_name=selection["currency_name"],
+            )
+        except ValueError as error:
+            abort(400, str(error))
+        except LookupError as error:
+            abort(404, str(error))
+
+    # Rendering plot to PNG bytes
+    image = plot_renderer.render(plot_spec)
+    plot_cache.put(key, image)
+
+    return image
+
+
 @app.route("/", methods=["POST"])
 def generate_plot():
     """
     Method reponsible for generating plot on site from user selections
     """
     if request.method == "POST":
-        stock_name = request.form["stockname"]
-        start_date = request.form["startdate"]
-        end_date = request.form["enddate"]
-        interval = request.form["interval"]
+        selection = read_selection(request.form)
+
+        # Store of whole request (refresh may swap global one meanwhile)
+        current_store = store
+
+        # Key of current selection and versions of its instruments
+        key = plot_key(selection, current_store)
+        render_selection(selection, current_store, key)
+
+        # Opening site with plot (selection in url of image lets other
+        # processes render it again)
+        return render_template(
+            "main.html",
+            plot_img=url_for("plot_image", key=key, **selection_query(selection)),
+        )
+
+
+@app.route("/plot/<key>.png")
+def plot_image(key):
+    """
+    Method reponsible for serving rendered plot from cache, or rendering
+    it again from selection in query string (e.g. in other process or after
+    plot was evicted from cache)
+    """
+    # Key contains version of data, so image under url never changes
+    if key in request.if_none_match:
+        response = app.response_class(status=304)
+        response.set_etag(key)
+        return response
+
+    image = plot_cache.peek(key)
+
+    if image is None:
+        selection = read_selection(request.args)
+        current_store = store
+        current_key = plot_key(selection, current_store)
+
+        # Data changed since url was created
+        if current_key != key:
+            return redirect(
+                url_for("plot_image", key=current_key, **selection_query(selection))
+            )
+
+        image = render_selection(selection, current_store, key)
+
+    response = app.response_class(image, mimetype="image/png")
+    response.headers["Cache-Control"] = "public, max-age=86400, immutable"
+    response.set_etag(key)
+
+    return response
+
 
-        # Crearting plot
-        plot = create_plot(
+@app.route("/api/series")
+def series_api():
+    """
+    Method reponsible for returning date and OHLC columns of selection
+    (stockname, startdate, enddate, interval) as JSON or binary float64
+    (format=binary) columns, optionally downsampled to number of points
+    (downsample=lttb or minmax, points) and converted to currency (currency)
+    """
+    stock_name = request.args.get("stockname", "")
+    start_date = request.args.get("startdate", "")
+    end_date = request.args.get("enddate", "")
+    interval = request.args.get("interval", "Daily")
+    series_format = request.args.get("format", "json")
+    downsample_method = request.args.get("downsample", "none")
+    currency_name = request.args.get("currency", "")
+    points = request.args.get(
+        "points", target_points(FIGURE_SIZE[0], FIGURE_DPI), type=int
+    )
+
+    if series_format not in ("json", "binary"):
+        abort(400, "Unknown format: {0}".format(series_format))
+
+    if downsample_method not in DOWNSAMPLE_METHODS:
+        abort(400, "Unknown downsample method: {0}".format(downsample_method))
+
+    # Store of whole request (refresh may swap global one meanwhile)
+    current_store = store
+
+    check_currency(current_store, currency_name)
+    current_store = select_store(current_store, currency_name)
+
+    # ETag depends only on selection and version of instrument data
+    etag = make_key(
+        "series",
+        stock_name,
+        start_date,
+        end_date,
+        interval,
+        series_format,
+        downsample_method,
+        points,
+        currency_name,
+        current_store.series_version(stock_name),
+    )
+
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    # Getting data from selection
+    try:
+        temp_df = current_store.lookup(
             stock_name=stock_name,
             start_date=start_date,
             end_date=end_date,
             interval=interval,
-            df=df,
         )
+    except ValueError as error:
+        abort(400, str(error))
 
-        if not os.path.exists("static/images"):
-            os.makedirs("static/images")
+    if temp_df.empty:
+        abort(404, "No data for selection")
 
-        # Saving plot to static/images
-        plot.savefig(os.path.join("static", "images", "plot.png"))
+    temp_df = downsample(temp_df, n_out=points, method=downsample_method)
 
-        # Closing the figure to avoid overwriting
-        plot.close()
+    columns = series_columns(temp_df)
 
-        # Opening site with plot
-        return render_template(
-            "main.html", plot_img=os.path.join("static", "images", "plot.png")
+    if series_format == "binary":
+        body = encode_binary(columns)
+        mimetype = "application/octet-stream"
+    else:
+        body = encode_json(
+            stock_name, interval, temp_df["currency_name"].iloc[0], columns
         )
+        mimetype = "application/json"
+
+    body, encoding = compress(body, request.headers.get("Accept-Encoding", ""))
+
+    response = app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "public, max-age=0, must-revalidate"
+    response.headers["Vary"] = "Accept-Encoding"
+
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+
+    if series_format == "binary":
+        response.headers["X-Series-Columns"] = ",".join(columns)
+        response.headers["X-Series-Length"] = str(len(columns["date"]))
+
+    return response
+
+
+@app.route("/api/export")
+def export_api():
+    """
+    Method reponsible for streaming rows of instruments (stockname, may be
+    repeated, all instruments when missing), interval and date range
+    (startdate, enddate) as CSV or parquet file (format=parquet)
+    Rows are read from db in batches, so export of whole history is not
+    kept in memory
+    """
+    stock_names = request.args.getlist("stockname")
+    start_date = request.args.get("startdate", "")
+    end_date = request.args.get("enddate", "")
+    interval = request.args.get("interval", "Daily")
+    export_format = request.args.get("format", "csv")
+
+    if export_format not in EXPORT_FORMATS:
+        abort(400, "Unknown format: {0}".format(export_format))
+
+    if export_format == "parquet" and pq is None:
+        abort(501, "Parquet export needs pyarrow package")
+
+    batches = iter_batches(DB_PATH, stock_names, interval, start_date, end_date)
+
+    if export_format == "parquet":
+        body = iter_parquet(batches)
+        mimetype = "application/vnd.apache.parquet"
+    else:
+        body = iter_csv(batches)
+        mimetype = "text/csv"
+
+    response = app.response_class(body, mimetype=mimetype)
+    response.headers[
+        "Content-Disposition"
+    ] = 'attachment; filename="stock_prices_{0}.{1}"'.format(
+        interval.lower(), export_format
+    )
+
+    return response
+
+
+@app.route("/cache/stats")
+def cache_stats():
+    """
+    Method reponsible for returning statistics of plot cache
+    """
+    return jsonify(plot_cache.stats())
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """
+    Method reponsible for returning metrics of site in Prometheus text format
+    (or as JSON with format=json)
+    """
+    # Current statistics of caches and refreshes of data
+    for cache_name, stats in (
+        ("plot", plot_cache.stats()),
+        ("indicator", indicator_engine.stats()),
+        ("currency", currency_converter.stats()),
+    ):
+        for stat, value in stats.items():
+            CACHE_STATS.set(value, cache=cache_name, stat=stat)
+
+    CACHE_STATS.set(refresher.refreshes, cache="store", stat="refreshes")
+    CACHE_STATS.set(refresher.failures, cache="store", stat="refresh_failures")
+
+    if request.args.get("format") == "json":
+        return jsonify(metrics.state())
+
+    return app.response_class(
+        metrics.to_prometheus(), mimetype="text/plain; version=0.0.4"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,301 @@
+# STOCK SNAPSHOT
+# Libraries
+import os
+import json
+import shutil
+import sqlite3
+import argparse
+import numpy as np
+from datetime import datetime
+from contextlib import contextmanager
+from stock_store import (
+    SERIES_COLUMNS,
+    SeriesPartition,
+    SeriesStore,
+    load_series_store,
+)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Name of file describing snapshot
+MANIFEST_NAME = "manifest.json"
+
+# Name of file locked while snapshot is written
+LOCK_NAME = "snapshot.lock"
+
+# Number of attempts of reading snapshot replaced by other process meanwhile
+LOAD_ATTEMPTS = 3
+
+
+def snapshot_directory(db_path):
+    """
+    Method responsible for returning directory of snapshot next to database
+    """
+    return "{0}.snapshot".format(db_path)
+
+
+def read_signature(conn):
+    """
+    Method responsible for returning signature of database content changing
+    with every write: schema version, last id of stock rows and number
+    of updated or deleted rows (the same after restart or WAL checkpoint)
+    Read inside of transaction, so all parts describe the same data
+    """
+    version = conn.execute("PRAGMA user_version;").fetchone()[0]
+    tables = {row[0] for row in conn.execute("select name from sqlite_master;")}
+    max_id = (
+        conn.execute("select max(id) from stock;").fetchone()[0]
+        if "stock" in tables
+        else None
+    )
+    changes = (
+        conn.execute("select changes from data_state where id = 0;").fetchone()
+        if "data_state" in tables
+        else None
+    )
+
+    return "{0}-{1}-{2}".format(version, max_id or 0, changes[0] if changes else 0)
+
+
+def database_signature(db_path):
+    """
+    Method responsible for returning signature of database (see read_signature)
+    """
+    if not os.path.exists(db_path):
+        return "0-0-0"
+
+    conn = sqlite3.connect("file:{0}?mode=ro".format(db_path), uri=True)
+
+    try:
+        conn.execute("begin;")
+        signature = read_signature(conn)
+        conn.execute("commit;")
+    finally:
+        conn.close()
+
+    return signature
+
+
+@contextmanager
+def snapshot_lock(directory):
+    """
+    Method responsible for holding exclusive lock of snapshot directory,
+    so one process writes snapshot and others wait for it
+    (without lock where fcntl is not available)
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, LOCK_NAME), "a") as file:
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def partition_dtype():
+    """
+    Method responsible for returning structured dtype of snapshot file
+    (one record per date)
+    """
+    return np.dtype(
+        [("date", "datetime64[ns]")] + [(column, "f8") for column in SERIES_COLUMNS]
+    )
+
+
+def write_snapshot(db_path, directory=None, store=None):
+    """
+    Method responsible for writing snapshot of database: one .npy file
+    per (instrument, interval) and manifest
+    - store - SeriesStore with current series of database and its signature
+      as version (series are read from database if None)
+    Snapshot is written under lock into subdirectory named by signature of
+    database (skipped if manifest already has this signature) and manifest
+    is replaced at the end, so processes reading previous snapshot are not affected
+    Returns manifest
+    """
+    directory = directory or snapshot_directory(db_path)
+
+    with snapshot_lock(directory):
+        signature = database_signature(db_path) if store is None else store.version
+        manifest = read_manifest(directory)
+
+        # Other process has written snapshot while this one waited for lock
+        if manifest is not None and manifest["signature"] == signature:
+            return manifest
+
+        if store is None:
+            store = load_series_store(db_path)
+
+        version_directory = signature
+        temp_directory = os.path.join(
+            directory, "{0}.tmp-{1}".format(version_directory, os.getpid())
+        )
+        os.makedirs(temp_directory, exist_ok=True)
+
+        manifest = {
+            "signature": signature,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "directory": version_directory,
+            "series": [],
+        }
+
+        for number, ((instrument_name, interval), partition) in enumerate(
+            store.partitions.items()
+        ):
+            records = np.empty(len(partition), dtype=partition_dtype())
+            records["date"] = partition.dates
+
+            for column in SERIES_COLUMNS:
+                records[column] = partition.columns[column]
+
+            file_name = "{0:05d}.npy".format(number)
+            np.save(os.path.join(temp_directory, file_name), records)
+
+            manifest["series"].append(
+                {
+                    "instrument_name": instrument_name,
+                    "interval": interval,
+                    "currency_name": partition.currency_name,
+                    "file": file_name,
+                    "rows": len(partition),
+                }
+            )
+
+        # Publishing complete directory (not used by current manifest,
+        # as its signature is different)
+        shutil.rmtree(os.path.join(directory, version_directory), ignore_errors=True)
+        os.rename(temp_directory, os.path.join(directory, version_directory))
+
+        # Replacing manifest at once (readers see old or new snapshot)
+        temp_path = os.path.join(
+            directory, "{0}.{1}".format(MANIFEST_NAME, os.getpid())
+        )
+
+        with open(temp_path, "w") as file:
+            json.dump(manifest, file, indent=1)
+
+        os.replace(temp_path, os.path.join(directory, MANIFEST_NAME))
+
+        remove_old_snapshots(directory, version_directory)
+
+    return manifest
+
+
+def remove_old_snapshots(directory, version_directory):
+    """
+    Method responsible for removing subdirectories of previous snapshots
+    except the one of current manifest (files mapped by running processes
+    stay available until they are closed)
+    Unfinished subdirectories of other writers are kept when there is no lock
+    """
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+
+        if name == version_directory or not os.path.isdir(path):
+            continue
+
+        if fcntl is None and ".tmp-" in name:
+            continue
+
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def read_manifest(directory):
+    """
+    Method responsible for returning manifest of snapshot (None if missing)
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def read_partitions(directory, manifest):
+    """
+    Method responsible for returning memory-mapped partitions of snapshot
+    """
+    partitions = {}
+
+    for series in manifest["series"]:
+        # Pages of files are shared by all processes through OS cache
+        records = np.load(
+            os.path.join(directory, manifest["directory"], series["file"]),
+            mmap_mode="r",
+        )
+
+        partitions[(series["instrument_name"], series["interval"])] = SeriesPartition(
+            currency_name=series["currency_name"],
+            dates=records["date"],
+            columns={column: records[column] for column in SERIES_COLUMNS},
+        )
+
+    return partitions
+
+
+def load_snapshot_store(db_path, directory=None):
+    """
+    Method responsible for returning SeriesStore with memory-mapped series
+    of snapshot (snapshot is written first if missing or older than database)
+    Version of store is signature of database
+    """
+    directory = directory or snapshot_directory(db_path)
+
+    for attempt in range(LOAD_ATTEMPTS):
+        manifest = read_manifest(directory)
+
+        if manifest is None or manifest["signature"] != database_signature(db_path):
+            manifest = write_snapshot(db_path, directory)
+
+        try:
+            partitions = read_partitions(directory, manifest)
+            break
+        except FileNotFoundError:
+            # Snapshot was replaced by other process after manifest was read
+            if attempt == LOAD_ATTEMPTS - 1:
+                raise
+
+    return SeriesStore.from_partitions(partitions, version=manifest["signature"])
+
+
+def refresh_snapshot_store(db_path, store, directory=None):
+    """
+    Method responsible for writing snapshot of refreshed store (unless other
+    process has written it already) and returning store memory-mapped from it,
+    so refreshed series stay shared by all processes
+    Versions of instruments in store are kept
+    """
+    directory = directory or snapshot_directory(db_path)
+    manifest = write_snapshot(db_path, directory, store=store)
+
+    snapshot_store = SeriesStore.from_partitions(
+        read_partitions(directory, manifest), version=manifest["signature"]
+    )
+    snapshot_store.versions = store.versions
+
+    return snapshot_store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Writing memory-mapped snapshot of series from database"
+    )
+    parser.add_argument("--db", default="stock_prices.db")
+    parser.add_argument("--directory", default=None)
+    args = parser.parse_args()
+
+    manifest = write_snapshot(args.db, args.directory)
+
+    print(
+        "Snapshot of {0} series written to {1}".format(
+            len(manifest["series"]), args.directory or snapshot_directory(args.db)
+        )
+    )
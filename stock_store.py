@@ -0,0 +1,557 @@
+# STOCK STORE
+# Libraries
+import copy
+import queue
+import sqlite3
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+from stock_cache import LRUCache
+
+
+# Columns kept for every series
+SERIES_COLUMNS = [
+    "last_price",
+    "open_price",
+    "max_price",
+    "min_price",
+    "volume",
+    "change",
+]
+
+
+# Selecting all series with sql statement
+SQL_SELECT_ALL = """select instrument_name, currency_name, date, interval, last_price, open_price ,max_price, min_price, volume, change
+from stock
+left join instrument on instrument.instrument_id = stock.instrument_id
+left join currency on currency.currency_id  = stock.currency_id;"""
+
+# Selecting all series of instruments with sql statement (template with
+# placeholders of instrument names)
+SQL_SELECT_INSTRUMENTS = """select instrument_name, currency_name, date, interval, last_price, open_price ,max_price, min_price, volume, change
+from stock
+left join instrument on instrument.instrument_id = stock.instrument_id
+left join currency on currency.currency_id  = stock.currency_id
+where instrument.instrument_name in ({0});"""
+
+# Selecting rows added after given id and current rows of keys changed after
+# given change_id with sql statement
+SQL_SELECT_CHANGED_ROWS = """select instrument_name, currency_name, date, interval, last_price, open_price ,max_price, min_price, volume, change
+from stock
+left join instrument on instrument.instrument_id = stock.instrument_id
+left join currency on currency.currency_id  = stock.currency_id
+where stock.id > ?
+union
+select instrument_name, currency_name, stock.date, stock.interval, last_price, open_price ,max_price, min_price, volume, change
+from stock_change
+join stock on stock.instrument_id = stock_change.instrument_id
+    and stock.interval = stock_change.interval
+    and stock.date = stock_change.date
+left join instrument on instrument.instrument_id = stock.instrument_id
+left join currency on currency.currency_id  = stock.currency_id
+where stock_change.change_id > ?;"""
+
+# Selecting keys of rows changed after given change_id with sql statement
+SQL_SELECT_CHANGED_KEYS = """select distinct instrument_name, interval, date
+from stock_change
+left join instrument on instrument.instrument_id = stock_change.instrument_id
+where stock_change.change_id > ?;"""
+
+# Selecting date range of one series with sql statement (uses covering index)
+SQL_SELECT_RANGE = """select date, currency_name, last_price, open_price, max_price, min_price, volume, change
+from stock
+left join currency on currency.currency_id = stock.currency_id
+where stock.instrument_id = ? and stock.interval = ? and stock.date >= ? and stock.date <= ?
+order by stock.date;"""
+
+# Selecting date range of several series with sql statement (template with
+# placeholders of instrument ids)
+SQL_SELECT_RANGE_MANY = """select instrument_id, date, currency_name, last_price, open_price, max_price, min_price, volume, change
+from stock
+left join currency on currency.currency_id = stock.currency_id
+where stock.instrument_id in ({0}) and stock.interval = ? and stock.date >= ? and stock.date <= ?
+order by stock.instrument_id, stock.date;"""
+
+
+def to_datetime64(value):
+    """
+    Method responsible for converting date from user selection
+    into numpy datetime64 (empty value means open range)
+    """
+    if value is None or value == "":
+        return None
+
+    return np.datetime64(pd.Timestamp(value), "ns")
+
+
+class SeriesPartition:
+    def __init__(self, currency_name, dates, columns) -> None:
+        # Currency of instrument
+        self.currency_name = currency_name
+
+        # Sorted array of dates (datetime64[ns])
+        self.dates = dates
+
+        # Arrays with values aligned with dates
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.dates)
+
+    def bounds(self, start_date=None, end_date=None):
+        """
+        Method responsible for finding positions of date range with binary search:
+        - start_date - lower date (inclusive), None for beginning of series
+        - end_date - upper date (inclusive), None for end of series
+        """
+        start = to_datetime64(start_date)
+        end = to_datetime64(end_date)
+
+        lower = 0 if start is None else int(np.searchsorted(self.dates, start, "left"))
+        upper = (
+            len(self.dates)
+            if end is None
+            else int(np.searchsorted(self.dates, end, "right"))
+        )
+
+        return lower, max(lower, upper)
+
+    def frame(self, lower, upper):
+        """
+        Method responsible for returning data frame with rows between positions
+        """
+        temp_df = pd.DataFrame(
+            {column: values[lower:upper] for column, values in self.columns.items()}
+        )
+        temp_df.insert(0, "date", self.dates[lower:upper])
+        temp_df.insert(1, "currency_name", self.currency_name)
+
+        return temp_df
+
+
+class SeriesStore:
+    def __init__(self, df, version=0) -> None:
+        """
+        Store of series partitioned by (instrument_name, interval), built once
+        from data frame with joined stock data
+        - version - version of data (part of cache keys)
+        """
+        self.version = version
+        self.partitions = {}
+
+        # Versions of instruments refreshed after store was built
+        # (other instruments have version of store)
+        self.versions = {}
+
+        for (instrument_name, interval), group in df.groupby(
+            ["instrument_name", "interval"], sort=False
+        ):
+            self.partitions[(instrument_name, interval)] = self.create_partition(group)
+
+    @classmethod
+    def from_partitions(cls, partitions, version=0):
+        """
+        Method responsible for creating store from ready partitions
+        (e.g. memory-mapped snapshot)
+        """
+        store = cls(pd.DataFrame(columns=["instrument_name", "interval"]), version)
+        store.partitions = partitions
+
+        return store
+
+    @staticmethod
+    def create_partition(group):
+        """
+        Method responsible for creating partition with sorted arrays from
+        rows of one instrument and interval
+        """
+        group = group.sort_values("date", kind="stable")
+
+        return SeriesPartition(
+            currency_name=group["currency_name"].iloc[0],
+            dates=group["date"].to_numpy(dtype="datetime64[ns]"),
+            columns={column: group[column].to_numpy() for column in SERIES_COLUMNS},
+        )
+
+    def instrument_names(self):
+        """
+        Method responsible for returning sorted list of instruments in store
+        """
+        return sorted({instrument_name for instrument_name, _ in self.partitions})
+
+    def series_version(self, stock_name):
+        """
+        Method responsible for returning version of instrument data
+        (part of cache keys, so refresh of one instrument keeps other entries)
+        """
+        return self.versions.get(stock_name, self.version)
+
+    @staticmethod
+    def merge_partition(partition, group, removed_dates):
+        """
+        Method responsible for returning partition with rows of dates removed
+        (changed rows) and rows of group added (None if no rows are left)
+        """
+        dates = group["date"].to_numpy(dtype="datetime64[ns]")
+
+        if partition is None:
+            partition = SeriesPartition(
+                currency_name=None,
+                dates=dates[:0],
+                columns={column: np.empty(0) for column in SERIES_COLUMNS},
+            )
+
+        keep = ~np.isin(partition.dates, np.concatenate([removed_dates, dates]))
+        merged_dates = np.concatenate([partition.dates[keep], dates])
+
+        if len(merged_dates) == 0:
+            return None
+
+        order = np.argsort(merged_dates, kind="stable")
+
+        return SeriesPartition(
+            currency_name=(
+                group["currency_name"].iloc[-1]
+                if len(group)
+                else partition.currency_name
+            ),
+            dates=merged_dates[order],
+            columns={
+                column: np.concatenate(
+                    [partition.columns[column][keep], group[column].to_numpy()]
+                )[order]
+                for column in SERIES_COLUMNS
+            },
+        )
+
+    def refresh(self, conn, instrument_names, version, since=None):
+        """
+        Method responsible for returning new store with changed series
+        (all series read again if instrument_names is None)
+        - since - (last id, last change_id) of previous read, so only rows
+          added or changed after them are read and merged into partitions
+          (whole series of instruments are read again if None)
+        Current store is not changed, so it can be still read during refresh
+        """
+        if instrument_names is not None and since is not None:
+            store = SeriesStore.from_partitions(dict(self.partitions), version)
+            changed_df = read_series_df(
+                conn, sql_statement=SQL_SELECT_CHANGED_ROWS, params=since
+            )
+            removed_df = read_series_df(
+                conn, sql_statement=SQL_SELECT_CHANGED_KEYS, params=since[1:]
+            )
+            groups = {
+                key: group
+                for key, group in changed_df.groupby(
+                    ["instrument_name", "interval"], sort=False
+                )
+            }
+            removed = {
+                key: group["date"].to_numpy(dtype="datetime64[ns]")
+                for key, group in removed_df.groupby(
+                    ["instrument_name", "interval"], sort=False
+                )
+            }
+
+            for key in set(groups) | set(removed):
+                partition = self.merge_partition(
+                    self.partitions.get(key),
+                    groups.get(key, changed_df.iloc[:0]),
+                    removed.get(key, np.array([], dtype="datetime64[ns]")),
+                )
+
+                if partition is None:
+                    store.partitions.pop(key, None)
+                else:
+                    store.partitions[key] = partition
+        else:
+            store = SeriesStore(read_series_df(conn, instrument_names), version=version)
+
+            if instrument_names is not None:
+                # Keeping partitions of other instruments
+                partitions = {
+                    key: partition
+                    for key, partition in self.partitions.items()
+                    if key[0] not in instrument_names
+                }
+                partitions.update(store.partitions)
+                store.partitions = partitions
+
+        if instrument_names is not None:
+            # Keeping versions of other instruments
+            store.versions = {
+                instrument_name: self.series_version(instrument_name)
+                for instrument_name, _ in self.partitions
+                if instrument_name not in instrument_names
+            }
+
+        return store
+
+    def get_partition(self, stock_name, interval):
+        """
+        Method responsible for returning partition of instrument and interval
+        (None if series does not exist)
+        """
+        return self.partitions.get((stock_name, interval))
+
+    def lookup(self, stock_name, start_date, end_date, interval):
+        """
+        Method responsible for returning data frame with selection of:
+        - Name of stock
+        - Lower date
+        - Upper date
+        - Interval (daily, weekly or monthly)
+        """
+        partition = self.get_partition(stock_name, interval)
+
+        if partition is None:
+            return pd.DataFrame(columns=["date", "currency_name"] + SERIES_COLUMNS)
+
+        lower, upper = partition.bounds(start_date, end_date)
+
+        return partition.frame(lower, upper)
+
+    def lookup_many(self, stock_names, start_date, end_date, interval):
+        """
+        Method responsible for returning one data frame with selections of
+        several stocks (with instrument_name column)
+        """
+        frames = []
+
+        for stock_name in stock_names:
+            temp_df = self.lookup(stock_name, start_date, end_date, interval)
+            frames.append(temp_df.assign(instrument_name=stock_name))
+
+        return pd.concat(frames, ignore_index=True)
+
+
+def read_series_df(conn, instrument_names=None, sql_statement=None, params=()):
+    """
+    Method responsible for reading data frame with all series
+    (or all series of instruments) from database
+    - sql_statement - other statement selecting rows of series (with params)
+    """
+    c = conn.cursor()
+
+    if sql_statement is not None:
+        c.execute(sql_statement, params)
+    elif instrument_names is None:
+        c.execute(SQL_SELECT_ALL)
+    else:
+        c.execute(
+            SQL_SELECT_INSTRUMENTS.format(", ".join("?" * len(instrument_names))),
+            list(instrument_names),
+        )
+
+    # Creating dataframe
+    df = pd.DataFrame(c.fetchall(), columns=[col[0] for col in c.description])
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
+
+    return df
+
+
+def load_series_store(path, version=0):
+    """
+    Method responsible for loading all series from database into SeriesStore
+    """
+    # Connection to sqlite db
+    conn = sqlite3.connect(path)
+
+    try:
+        df = read_series_df(conn)
+    finally:
+        conn.close()
+
+    return SeriesStore(df, version=version)
+
+
+class ConnectionPool:
+    def __init__(self, path, size=4) -> None:
+        """
+        Pool of read-only connections with sqlite db
+        - path - path to database file
+        - size - number of connections
+        """
+        self.connections = queue.Queue()
+
+        for _ in range(size):
+            self.connections.put(
+                sqlite3.connect(
+                    "file:{0}?mode=ro".format(path), uri=True, check_same_thread=False
+                )
+            )
+
+    @contextmanager
+    def connection(self):
+        """
+        Method responsible for lending connection (waiting if all are used)
+        """
+        conn = self.connections.get()
+
+        try:
+            yield conn
+        finally:
+            self.connections.put(conn)
+
+
+class SqlSeriesStore:
+    def __init__(self, path, pool_size=4, cache_size=64, version=0) -> None:
+        """
+        Store running indexed range query for each lookup (without loading
+        whole database into memory)
+        - path - path to database file
+        - pool_size - number of read-only connections
+        - cache_size - number of recently used selections kept in memory
+        - version - version of data (part of cache keys)
+        """
+        self.version = version
+        self.versions = {}
+        self.pool = ConnectionPool(path, size=pool_size)
+        self.cache = LRUCache(max_size=cache_size)
+
+        # Ids of instruments (small table, read once)
+        with self.pool.connection() as conn:
+            self.instrument_ids = self.read_instrument_ids(conn)
+
+    @staticmethod
+    def read_instrument_ids(conn):
+        """
+        Method responsible for returning mapping of instrument names to ids
+        """
+        return dict(
+            conn.execute("select instrument_name, instrument_id from instrument;")
+        )
+
+    def instrument_names(self):
+        """
+        Method responsible for returning sorted list of instruments in db
+        """
+        return sorted(self.instrument_ids)
+
+    def get_partition(self, stock_name, interval):
+        """
+        Method responsible for returning partition with whole series
+        of instrument and interval (None if series does not exist)
+        """
+        temp_df = self.lookup(stock_name, None, None, interval)
+
+        if temp_df.empty:
+            return None
+
+        return SeriesStore.create_partition(temp_df)
+
+    def series_version(self, stock_name):
+        """
+        Method responsible for returning version of instrument data
+        (part of cache keys, so refresh of one instrument keeps other entries)
+        """
+        return self.versions.get(stock_name, self.version)
+
+    def refresh(self, conn, instrument_names, version, since=None):
+        """
+        Method responsible for returning new store (sharing connections)
+        without cached selections of instruments (all if instrument_names is None)
+        - since - not used (selections are read from database again)
+        Current store is not changed, so it can be still read during refresh
+        """
+        store = copy.copy(self)
+        store.version = version
+        store.instrument_ids = self.read_instrument_ids(conn)
+        store.cache = LRUCache(max_size=self.cache.max_size)
+        store.versions = {}
+
+        if instrument_names is not None:
+            # Keeping cached selections and versions of other instruments
+            store.versions = {
+                instrument_name: self.series_version(instrument_name)
+                for instrument_name in self.instrument_ids
+                if instrument_name not in instrument_names
+            }
+
+            for key, temp_df in self.cache.entries():
+                names = key[0] if isinstance(key[0], tuple) else (key[0],)
+
+                if not set(names) & set(instrument_names):
+                    store.cache.put(key, temp_df)
+
+        return store
+
+    def lookup(self, stock_name, start_date, end_date, interval):
+        """
+        Method responsible for returning data frame with selection of:
+        - Name of stock
+        - Lower date
+        - Upper date
+        - Interval (daily, weekly or monthly)
+        """
+        start = to_datetime64(start_date)
+        end = to_datetime64(end_date)
+
+        key = (stock_name, interval, start, end)
+        temp_df = self.cache.get(key)
+
+        if temp_df is not None:
+            return temp_df
+
+        with self.pool.connection() as conn:
+            c = conn.execute(
+                SQL_SELECT_RANGE,
+                (
+                    self.instrument_ids.get(stock_name),
+                    interval,
+                    "0000-00-00" if start is None else str(start)[:10],
+                    "9999-99-99" if end is None else str(end)[:10],
+                ),
+            )
+            temp_df = pd.DataFrame(
+                c.fetchall(), columns=[col[0] for col in c.description]
+            )
+
+        temp_df["date"] = pd.to_datetime(temp_df["date"], format="%Y-%m-%d")
+        self.cache.put(key, temp_df)
+
+        return temp_df
+
+    def lookup_many(self, stock_names, start_date, end_date, interval):
+        """
+        Method responsible for returning one data frame with selections of
+        several stocks (with instrument_name column), read with one query
+        """
+        start = to_datetime64(start_date)
+        end = to_datetime64(end_date)
+
+        key = (tuple(stock_names), interval, start, end)
+        temp_df = self.cache.get(key)
+
+        if temp_df is not None:
+            return temp_df
+
+        instrument_ids = [
+            self.instrument_ids.get(stock_name) for stock_name in stock_names
+        ]
+
+        with self.pool.connection() as conn:
+            c = conn.execute(
+                SQL_SELECT_RANGE_MANY.format(", ".join("?" * len(instrument_ids))),
+                (
+                    *instrument_ids,
+                    interval,
+                    "0000-00-00" if start is None else str(start)[:10],
+                    "9999-99-99" if end is None else str(end)[:10],
+                ),
+            )
+            temp_df = pd.DataFrame(
+                c.fetchall(), columns=[col[0] for col in c.description]
+            )
+
+        # Names of instruments instead of ids
+        instrument_names = {
+            instrument_id: stock_name
+            for stock_name, instrument_id in self.instrument_ids.items()
+        }
+        temp_df["instrument_name"] = temp_df.pop("instrument_id").map(instrument_names)
+        temp_df["date"] = pd.to_datetime(temp_df["date"], format="%Y-%m-%d")
+        self.cache.put(key, temp_df)
+
+        return temp_df
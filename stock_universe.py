@@ -0,0 +1,69 @@
+# STOCK UNIVERSE
+# Libraries
+import json
+from stock_db import StockDatabase
+
+# Instruments scraped when neither config file nor instrument table has any
+DEFAULT_UNIVERSE = {
+    "currencies": ["eur-usd", "gbp-usd", "eur-pln", "usd-cad"],
+    "equities": ["cdproject", "11bit", "nintendo-ltd", "activision-inc"],
+    "commodities": ["gold", "silver", "platinum", "copper"],
+}
+
+
+def read_universe_file(path):
+    """
+    Method responsible for reading instruments to scrape from json config file
+    in form {market: [instrument names]}, e.g. {"currencies": ["eur-usd"]}
+    Raises ValueError for file in other form
+    """
+    with open(path) as file:
+        universe = json.load(file)
+
+    if not isinstance(universe, dict) or not all(
+        isinstance(names, list) and all(isinstance(name, str) for name in names)
+        for names in universe.values()
+    ):
+        raise ValueError(
+            "Config file {0} should map markets to lists of instruments".format(path)
+        )
+
+    return universe
+
+
+def load_universe(db_path, config_path=None):
+    """
+    Method responsible for returning instruments to scrape as
+    {market: [instrument names]}:
+    - db_path - path to sqlite db (instrument table is used without config file)
+    - config_path - path to json config file (its instruments are also saved
+      in instrument table, so next runs can be started without it)
+    Default instruments are used and saved when instrument table has none
+    """
+    database = StockDatabase(db_path)
+
+    if config_path is not None:
+        universe = read_universe_file(config_path)
+    else:
+        universe = database.read_universe()
+
+        if universe:
+            return universe
+
+        universe = DEFAULT_UNIVERSE
+
+    database.save_universe(universe)
+
+    return universe
+
+
+def instrument_urls(url, universe):
+    """
+    Method responsible for returning list of [instrument name, url to its
+    historical data] for each instrument of universe
+    """
+    return [
+        [instrument, "{0}{1}/{2}-historical-data".format(url, market, instrument)]
+        for market in universe
+        for instrument in universe[market]
+    ]
@@ -0,0 +1,7 @@
+# STOCK TESTS
+# Libraries
+import os
+import sys
+
+# Modules of project are imported from root directory of repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
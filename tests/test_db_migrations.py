@@ -0,0 +1,166 @@
+# STOCK DATABASE MIGRATIONS TESTS
+# Libraries
+import sqlite3
+import pytest
+from stock_db import MIGRATIONS, StockDatabase
+
+# Schema of databases created by first versions of scrapper
+# (text volume and change, dates in dd.mm.YYYY format, no user_version)
+SQL_BASELINE_SCHEMA = [
+    """create table currency (
+        currency_id integer PRIMARY key,
+        currency_name text
+        );""",
+    """create table instrument (
+        instrument_id integer PRIMARY key,
+        instrument_name text
+        );""",
+    """create table stock (
+        id integer PRIMARY key AUTOINCREMENT,
+        instrument_id integer not NULL,
+        currency_id integer not null,
+        date text not NULL,
+        interval text,
+        last_price real,
+        open_price real,
+        max_price real,
+        min_price real,
+        volume text,
+        change text,
+        FOREIGN KEY (instrument_id)
+            REFERENCES instrument (instrument_id),
+        FOREIGN KEY (currency_id)
+            REFERENCES currency (currency_id)
+        );""",
+]
+
+BASELINE_ROWS = [
+    (1, 1, "30.12.2022", "Daily", 1.07, 1.06, 1.08, 1.05, "1.2M", "-0.35%"),
+    (1, 1, "02.01.2023", "Daily", 1.06, 1.07, 1.08, 1.05, "156.06K", "+0.12%"),
+    # Duplicate of the previous row (the latest one is kept)
+    (1, 1, "02.01.2023", "Daily", 1.065, 1.07, 1.08, 1.05, "156.07K", "0.17%"),
+    (2, 2, "03.01.2023", "Daily", 250.0, 249.0, 251.0, 248.0, "2B", "1.5%"),
+    (2, 2, "04.01.2023", "Daily", 251.0, 250.0, 252.0, 249.0, "870", "-"),
+]
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    path = str(tmp_path / "stock_prices.db")
+    conn = sqlite3.connect(path)
+
+    for sql_statement in SQL_BASELINE_SCHEMA:
+        conn.execute(sql_statement)
+
+    conn.executemany(
+        "insert into currency (currency_id, currency_name) values (?, ?);",
+        [(1, "USD"), (2, "PLN")],
+    )
+    conn.executemany(
+        "insert into instrument (instrument_id, instrument_name) values (?, ?);",
+        [(1, "eur-usd"), (2, "cdproject")],
+    )
+    conn.executemany(
+        """insert into stock (instrument_id, currency_id, date, interval,
+        last_price, open_price, max_price, min_price, volume, change)
+        values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);""",
+        BASELINE_ROWS,
+    )
+    conn.commit()
+    conn.close()
+
+    return path
+
+
+def read_stock(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(
+        """select instrument_id, date, last_price, volume, typeof(volume), change
+        from stock order by instrument_id, date;"""
+    ).fetchall()
+    conn.close()
+
+    return rows
+
+
+def test_migrations_of_baseline_db(baseline_db):
+    StockDatabase(baseline_db).migrate()
+
+    assert read_stock(baseline_db) == [
+        (1, "2022-12-30", 1.07, 1200000, "integer", -0.35),
+        (1, "2023-01-02", 1.065, 156070, "integer", 0.17),
+        (2, "2023-01-03", 250.0, 2000000000, "integer", 1.5),
+        (2, "2023-01-04", 251.0, 870, "integer", None),
+    ]
+
+    conn = sqlite3.connect(baseline_db)
+
+    assert conn.execute("PRAGMA user_version;").fetchone()[0] == len(MIGRATIONS)
+
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(stock);")}
+    assert {"stock_series_key", "stock_series_idx"} <= indexes
+
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(instrument);")]
+    assert "market" in columns
+
+    # Unique key of series rejects duplicated rows
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute(
+            """insert into stock (instrument_id, currency_id, date, interval)
+            values (1, 1, '2023-01-02', 'Daily');"""
+        )
+
+    conn.close()
+
+
+def test_data_state_counts_updates_and_deletes(baseline_db):
+    StockDatabase(baseline_db).migrate()
+    conn = sqlite3.connect(baseline_db, isolation_level=None)
+
+    assert conn.execute("select changes from data_state;").fetchone()[0] == 0
+
+    conn.execute("update stock set last_price = 1.0 where instrument_id = 1;")
+    conn.execute("delete from stock where instrument_id = 2;")
+    conn.execute(
+        """insert into stock (instrument_id, currency_id, date, interval)
+        values (2, 2, '2023-01-05', 'Daily');"""
+    )
+
+    # Two updated and two deleted rows (inserts are marked by last id)
+    assert conn.execute("select changes from data_state;").fetchone()[0] == 4
+
+    conn.close()
+
+
+def test_migrations_are_applied_once(baseline_db):
+    database = StockDatabase(baseline_db)
+    database.migrate()
+    rows = read_stock(baseline_db)
+
+    database.migrate()
+
+    assert read_stock(baseline_db) == rows
+
+
+def test_missing_migrations_only(baseline_db):
+    # Database after first three migrations gets only the remaining ones
+    conn = sqlite3.connect(baseline_db, isolation_level=None)
+    conn.execute("begin;")
+
+    for migration in MIGRATIONS[:3]:
+        for sql_migration in migration:
+            conn.execute(sql_migration)
+
+    conn.execute("PRAGMA user_version=3;")
+    conn.execute("commit;")
+    conn.close()
+
+    StockDatabase(baseline_db).migrate()
+
+    conn = sqlite3.connect(baseline_db)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(instrument);")]
+
+    assert columns.count("market") == 1
+    assert conn.execute("PRAGMA user_version;").fetchone()[0] == len(MIGRATIONS)
+
+    conn.close()
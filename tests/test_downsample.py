@@ -0,0 +1,171 @@
+# STOCK DOWNSAMPLE TESTS
+# Libraries
+import numpy as np
+import pandas as pd
+from stock_downsample import (
+    aggregate_ohlc,
+    bucket_edges,
+    downsample,
+    downsample_wide,
+    lttb,
+    minmax,
+)
+
+
+def lttb_reference(x, y, n_out):
+    """
+    Method responsible for returning indices chosen with LTTB computed
+    point by point (reference for vectorized version)
+    """
+    edges = bucket_edges(len(x), n_out - 2)
+    indices = [0]
+
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+
+        if bucket + 1 < n_out - 2:
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+            next_x = x[next_start:next_end].mean()
+            next_y = y[next_start:next_end].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        selected = indices[-1]
+        best, best_area = start, -1.0
+
+        for index in range(start, end):
+            area = abs(
+                (x[selected] - next_x) * (y[index] - y[selected])
+                - (x[selected] - x[index]) * (next_y - y[selected])
+            )
+
+            if area > best_area:
+                best, best_area = index, area
+
+        indices.append(best)
+
+    return np.array(indices + [len(x) - 1])
+
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+
+    return np.arange(n, dtype=np.float64), np.cumsum(rng.normal(size=n))
+
+
+def test_lttb_matches_reference():
+    x, y = random_walk(1000)
+
+    np.testing.assert_array_equal(lttb(x, y, 50), lttb_reference(x, y, 50))
+
+
+def test_lttb_keeps_ends_and_one_point_per_bucket():
+    x, y = random_walk(1000, seed=1)
+    indices = lttb(x, y, 100)
+    edges = bucket_edges(len(x), 98)
+
+    assert len(indices) == 100
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+    np.testing.assert_array_equal(
+        np.searchsorted(edges, indices[1:-1], side="right") - 1, np.arange(98)
+    )
+
+
+def test_lttb_keeps_spike():
+    x = np.arange(500, dtype=np.float64)
+    y = np.zeros(500)
+    y[250] = 100.0
+
+    assert 250 in lttb(x, y, 20)
+
+
+def test_lttb_short_series_unchanged():
+    x, y = random_walk(10)
+
+    np.testing.assert_array_equal(lttb(x, y, 50), np.arange(10))
+    np.testing.assert_array_equal(lttb(x, y, 2), np.arange(10))
+
+
+def test_minmax_keeps_extremes_of_each_bucket():
+    x, y = random_walk(1000, seed=2)
+    indices = minmax(x, y, 102)
+    edges = bucket_edges(len(x), 50)
+
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = set(indices[(indices >= start) & (indices < end)])
+
+        assert start + np.argmin(y[start:end]) in bucket
+        assert start + np.argmax(y[start:end]) in bucket
+        assert len(bucket) <= 2
+
+
+def test_minmax_keeps_global_extremes():
+    x, y = random_walk(5000, seed=3)
+    indices = minmax(x, y, 40)
+
+    assert np.argmin(y) in indices
+    assert np.argmax(y) in indices
+
+
+def test_downsample_skips_missing_values():
+    dates = pd.date_range("2020-01-01", periods=1000)
+    values = np.cumsum(np.random.default_rng(4).normal(size=1000))
+    values[::7] = np.nan
+    temp_df = pd.DataFrame({"date": dates, "last_price": values})
+
+    for method in ("lttb", "minmax"):
+        result = downsample(temp_df, 100, method=method)
+
+        assert len(result) <= 100
+        assert result["last_price"].notna().all()
+        assert result["date"].is_monotonic_increasing
+
+    assert downsample(temp_df, 100, method="none") is temp_df
+
+
+def test_downsample_wide_keeps_rows_of_all_columns():
+    dates = pd.date_range("2020-01-01", periods=2000)
+    rng = np.random.default_rng(5)
+    wide_df = pd.DataFrame(
+        {"a": np.cumsum(rng.normal(size=2000)), "b": np.cumsum(rng.normal(size=2000))},
+        index=dates,
+    )
+    wide_df.iloc[:500, 1] = np.nan
+
+    result = downsample_wide(wide_df, 200)
+
+    assert len(result) <= 200
+    assert result.index.is_monotonic_increasing
+    assert wide_df["b"].first_valid_index() in result.index
+
+
+def test_aggregate_ohlc_merges_candles():
+    rng = np.random.default_rng(6)
+    close = 100 + np.cumsum(rng.normal(size=1000))
+    temp_df = pd.DataFrame(
+        {
+            "date": pd.date_range("2020-01-01", periods=1000),
+            "open_price": close + rng.normal(size=1000),
+            "max_price": close + 2,
+            "min_price": close - 2,
+            "last_price": close,
+            "volume": rng.integers(1, 100, size=1000).astype(np.float64),
+        }
+    )
+
+    result = aggregate_ohlc(temp_df, 100)
+
+    assert len(result) == 100
+    assert result["volume"].sum() == temp_df["volume"].sum()
+    assert result["max_price"].max() == temp_df["max_price"].max()
+    assert result["min_price"].min() == temp_df["min_price"].min()
+    assert result["open_price"].iloc[0] == temp_df["open_price"].iloc[0]
+    assert result["last_price"].iloc[-1] == temp_df["last_price"].iloc[-1]
+    np.testing.assert_allclose(
+        result["max_price"].to_numpy(),
+        temp_df["max_price"].to_numpy().reshape(100, 10).max(axis=1),
+    )
@@ -0,0 +1,118 @@
+# STOCK FETCH TESTS
+# Libraries
+import os
+import threading
+import pytest
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from stock_fetch import FixtureHttpBackend, PageHttpBackend, PeriodNotCovered
+from stock_fixture_server import serve_fixtures
+
+# Directory with saved pages of instruments
+FIXTURES_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures"
+)
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """
+    Server returning saved daily page without marker of fixture server
+    (as other sites would)
+    """
+
+    def do_GET(self):
+        with open(
+            os.path.join(FIXTURES_DIRECTORY, "eur-usd-historical-data.html"), "rb"
+        ) as file:
+            page = file.read()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.end_headers()
+        self.wfile.write(page)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def fixture_url():
+    server = serve_fixtures(FIXTURES_DIRECTORY)
+
+    yield "http://{0}:{1}/".format(*server.server_address)
+
+    server.shutdown()
+
+
+@pytest.fixture(scope="module")
+def other_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield "http://{0}:{1}/".format(*server.server_address)
+
+    server.shutdown()
+
+
+def job(url, instrument_name, interval_name="Daily", market="currencies"):
+    return {
+        "instrument_name": instrument_name,
+        "url": "{0}{1}/{2}-historical-data".format(url, market, instrument_name),
+        "interval_name": interval_name,
+        "start_date": datetime(2022, 12, 1),
+        "end_date": datetime(2022, 12, 31),
+    }
+
+
+def test_fixture_backend_rows_of_period(fixture_url):
+    temp_df = FixtureHttpBackend().fetch(**job(fixture_url, "eur-usd"))
+
+    assert len(temp_df) == 22
+    assert set(temp_df["Interval"]) == {"Daily"}
+    assert set(temp_df["Currency"]) == {"USD"}
+
+
+def test_fixture_backend_interval_pages(fixture_url):
+    backend = FixtureHttpBackend()
+
+    assert len(backend.fetch(**job(fixture_url, "eur-usd", "Weekly"))) == 4
+
+    # Daily page is not served for other intervals
+    with pytest.raises(Exception, match="404"):
+        backend.fetch(**job(fixture_url, "eur-usd", "Monthly"))
+
+
+def test_fixture_backend_refuses_other_servers(other_url):
+    with pytest.raises(ValueError, match="not served by stock_fixture_server"):
+        FixtureHttpBackend().fetch(**job(other_url, "eur-usd"))
+
+
+def test_fixture_backend_fetch_many(fixture_url):
+    jobs = [
+        job(fixture_url, "eur-usd"),
+        job(fixture_url, "cdproject", market="equities"),
+        job(fixture_url, "eur-usd", "Weekly"),
+    ]
+    results = list(FixtureHttpBackend(concurrency=2).fetch_many(jobs))
+
+    assert [len(temp_df) for _, temp_df in results] == [22, 21, 4]
+
+
+def test_page_backend_latest_daily_rows(other_url):
+    temp_df = PageHttpBackend().fetch(**job(other_url, "eur-usd"))
+
+    assert len(temp_df) == 22
+    assert temp_df.iloc[0, 3] == "30.12.2022"
+
+
+def test_page_backend_period_not_on_page(other_url):
+    backend = PageHttpBackend()
+
+    # Older rows and other intervals are not rendered on page
+    for period in (
+        {"start_date": datetime(2022, 1, 3)},
+        {"start_date": None},
+        {"interval_name": "Weekly"},
+    ):
+        with pytest.raises(PeriodNotCovered):
+            backend.fetch(**dict(job(other_url, "eur-usd"), **period))
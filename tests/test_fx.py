@@ -0,0 +1,145 @@
+# STOCK FX TESTS
+# Libraries
+import numpy as np
+import pandas as pd
+import pytest
+from stock_fx import CurrencyConverter, asof_rates, conversion_path, fx_pairs
+from stock_store import SeriesStore
+
+
+def series_rows(instrument_name, currency_name, dates, prices):
+    """
+    Method responsible for returning rows of one daily series with
+    all prices equal to given prices
+    """
+    return pd.DataFrame(
+        {
+            "instrument_name": instrument_name,
+            "interval": "Daily",
+            "date": pd.to_datetime(dates),
+            "currency_name": currency_name,
+            "last_price": prices,
+            "open_price": prices,
+            "max_price": prices,
+            "min_price": prices,
+            "volume": 1.0,
+            "change": 0.0,
+        }
+    )
+
+
+@pytest.fixture
+def store():
+    return SeriesStore(
+        pd.concat(
+            [
+                series_rows(
+                    "eur-usd", "USD", ["2020-01-02", "2020-01-06"], [1.10, 1.20]
+                ),
+                series_rows(
+                    "eur-pln", "PLN", ["2020-01-01", "2020-01-03"], [4.00, 5.00]
+                ),
+                series_rows(
+                    "cdproject",
+                    "PLN",
+                    ["2020-01-01", "2020-01-02", "2020-01-03", "2020-01-07"],
+                    [100.0, 100.0, 200.0, 200.0],
+                ),
+                series_rows("gold", "USD", ["2020-01-06"], [1200.0]),
+            ],
+            ignore_index=True,
+        )
+    )
+
+
+def test_fx_pairs():
+    assert fx_pairs(["eur-usd", "gold", "usd-cad", "11bit"]) == {
+        ("EUR", "USD"): "eur-usd",
+        ("USD", "CAD"): "usd-cad",
+    }
+
+
+def test_conversion_path_direct_inverse_and_multi_hop():
+    pairs = fx_pairs(["eur-usd", "eur-pln", "usd-cad"])
+
+    assert conversion_path(pairs, "EUR", "USD") == [("eur-usd", 1)]
+    assert conversion_path(pairs, "USD", "EUR") == [("eur-usd", -1)]
+    assert conversion_path(pairs, "PLN", "USD") == [("eur-pln", -1), ("eur-usd", 1)]
+    assert conversion_path(pairs, "PLN", "CAD") == [
+        ("eur-pln", -1),
+        ("eur-usd", 1),
+        ("usd-cad", 1),
+    ]
+    assert conversion_path(pairs, "USD", "USD") == []
+
+
+def test_conversion_path_without_rates():
+    with pytest.raises(ValueError):
+        conversion_path(fx_pairs(["eur-usd"]), "PLN", "USD")
+
+
+def test_asof_rates():
+    fx_dates = np.array(["2020-01-02", "2020-01-06"], dtype="datetime64[ns]")
+    fx_values = np.array([1.1, 1.2])
+    dates = np.array(
+        ["2020-01-01", "2020-01-02", "2020-01-05", "2020-01-06", "2020-01-09"],
+        dtype="datetime64[ns]",
+    )
+
+    np.testing.assert_array_equal(
+        asof_rates(fx_dates, fx_values, dates), [np.nan, 1.1, 1.1, 1.2, 1.2]
+    )
+    assert np.isnan(asof_rates(fx_dates[:0], fx_values[:0], dates)).all()
+
+
+def test_convert_inverse(store):
+    converter = CurrencyConverter()
+    partition = converter.convert(store, "gold", "Daily", "EUR")
+
+    assert partition.currency_name == "EUR"
+    np.testing.assert_allclose(partition.columns["last_price"], [1200.0 / 1.2])
+
+
+def test_convert_multi_hop(store):
+    temp_df = (
+        CurrencyConverter().view(store, "USD").lookup("cdproject", "", "", "Daily")
+    )
+
+    # PLN -> EUR with eur-pln valid at each date, then EUR -> USD with eur-usd
+    # (first day has no eur-usd rate yet)
+    expected = [np.nan, 100.0 / 4.0 * 1.1, 200.0 / 5.0 * 1.1, 200.0 / 5.0 * 1.2]
+
+    assert (temp_df["currency_name"] == "USD").all()
+    np.testing.assert_allclose(temp_df["last_price"], expected)
+    np.testing.assert_allclose(temp_df["max_price"], expected)
+    np.testing.assert_allclose(temp_df["volume"], 1.0)
+    np.testing.assert_allclose(
+        temp_df["change"], [np.nan, np.nan, 60.0, 9.09], equal_nan=True
+    )
+
+
+def test_convert_without_rates(store):
+    with pytest.raises(ValueError):
+        CurrencyConverter().convert(store, "gold", "Daily", "GBP")
+
+
+def test_converter_cache(store):
+    converter = CurrencyConverter()
+
+    first = converter.convert(store, "cdproject", "Daily", "USD")
+    second = converter.convert(store, "cdproject", "Daily", "USD")
+
+    assert first is second
+    assert converter.conversions == 1
+
+    # Refresh of exchange rate converts series again
+    store.versions["eur-usd"] = 1
+    converter.convert(store, "cdproject", "Daily", "USD")
+
+    assert converter.conversions == 2
+
+    # Series in own currency is not converted
+    own = converter.convert(store, "cdproject", "Daily", "PLN")
+
+    assert own is store.get_partition("cdproject", "Daily")
+    assert converter.conversions == 2
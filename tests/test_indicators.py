@@ -0,0 +1,114 @@
+# STOCK INDICATORS TESTS
+# Libraries
+import numpy as np
+import pandas as pd
+import pytest
+from stock_indicators import INDICATORS, IndicatorEngine, parse_indicator
+
+
+def random_prices(n, seed=0):
+    rng = np.random.default_rng(seed)
+
+    return 100 + np.cumsum(rng.normal(size=n))
+
+
+@pytest.mark.parametrize(
+    "indicator", ["sma:20", "ema:20", "bollinger:20:2", "rsi:14", "drawdown"]
+)
+@pytest.mark.parametrize("splits", [[300], [5, 300], [19, 20, 21, 300], [1, 2, 3]])
+def test_incremental_equals_full(indicator, splits):
+    values = random_prices(300)
+    name, params = parse_indicator(indicator)
+    function = INDICATORS[name][0]
+
+    full, _ = function(values, None, **params)
+
+    # Same values computed in parts, continued from state of previous part
+    parts, state, start = {}, None, 0
+
+    for end in splits:
+        columns, state = function(values[start:end], state, **params)
+
+        for column, result in columns.items():
+            parts.setdefault(column, []).append(result)
+
+        start = end
+
+    columns, state = function(values[start:], state, **params)
+
+    for column, result in columns.items():
+        parts[column].append(result)
+
+    assert set(parts) == set(full)
+
+    for column in full:
+        np.testing.assert_allclose(
+            np.concatenate(parts[column]), full[column], rtol=1e-9, equal_nan=True
+        )
+
+
+def test_sma_matches_pandas():
+    values = random_prices(100, seed=1)
+    columns, _ = INDICATORS["sma"][0](values, None, window=10)
+
+    expected = pd.Series(values).rolling(10).mean().to_numpy()
+    np.testing.assert_allclose(columns["SMA(10)"], expected, equal_nan=True)
+
+
+def test_rsi_skips_values_without_full_period():
+    values = random_prices(50, seed=2)
+    columns, _ = INDICATORS["rsi"][0](values, None, period=14)
+
+    assert np.isnan(columns["RSI(14)"][:14]).all()
+    assert np.isfinite(columns["RSI(14)"][14:]).all()
+
+
+def test_parse_indicator():
+    assert parse_indicator("sma:50") == ("sma", {"window": 50})
+    assert parse_indicator("bollinger:20:2.5") == (
+        "bollinger",
+        {"window": 20, "width": 2.5},
+    )
+
+    for indicator in ("macd", "sma:0", "sma:20:2", "rsi:x"):
+        with pytest.raises(ValueError):
+            parse_indicator(indicator)
+
+
+def test_engine_extends_cached_series():
+    engine = IndicatorEngine()
+    dates = pd.date_range("2000-01-01", periods=400).to_numpy()
+    values = random_prices(400, seed=3)
+
+    engine.compute(("gold", "Daily", "USD"), "sma:20", dates[:300], values[:300])
+    result = engine.compute(("gold", "Daily", "USD"), "sma:20", dates, values)
+
+    assert engine.full_computations == 1
+    assert engine.extensions == 1
+
+    full = IndicatorEngine().compute(("gold", "Daily", "USD"), "sma:20", dates, values)
+    np.testing.assert_allclose(
+        result.columns["SMA(20)"], full.columns["SMA(20)"], equal_nan=True
+    )
+
+    # Same series is returned from cache
+    engine.compute(("gold", "Daily", "USD"), "sma:20", dates, values)
+
+    assert engine.full_computations == 1
+    assert engine.extensions == 1
+
+
+def test_engine_recomputes_changed_series():
+    engine = IndicatorEngine()
+    dates = pd.date_range("2000-01-01", periods=100).to_numpy()
+    values = random_prices(100, seed=4)
+
+    engine.compute(("gold", "Daily", "USD"), "ema:20", dates[:50], values[:50])
+
+    # Last cached value was corrected, so history is computed again
+    changed = values.copy()
+    changed[49] += 1.0
+    engine.compute(("gold", "Daily", "USD"), "ema:20", dates, changed)
+
+    assert engine.full_computations == 2
+    assert engine.extensions == 0
@@ -0,0 +1,53 @@
+# STOCK PLOT TESTS
+# Libraries
+import os
+import signal
+import numpy as np
+import pytest
+from stock_plot import START_METHOD, PlotRenderer
+
+
+def plot_spec():
+    dates = np.arange("2022-01-01", "2022-03-01", dtype="datetime64[D]")
+
+    return {
+        "stock_name": "gold",
+        "start_date": "",
+        "end_date": "",
+        "interval": "Daily",
+        "currency_name": "USD",
+        "dates": dates.astype("datetime64[ns]"),
+        "values": np.linspace(1800, 1900, len(dates)),
+    }
+
+
+@pytest.fixture
+def renderer():
+    renderer = PlotRenderer(workers=1)
+
+    yield renderer
+
+    renderer.close()
+
+
+def test_render_in_calling_thread():
+    assert PlotRenderer(workers=0).render(plot_spec()).startswith(b"\x89PNG")
+
+
+def test_pool_does_not_fork_server(renderer):
+    assert START_METHOD in ("forkserver", "spawn")
+    assert renderer.render(plot_spec()).startswith(b"\x89PNG")
+    assert renderer.pool._mp_context.get_start_method() == START_METHOD
+
+
+def test_broken_pool_is_created_again(renderer):
+    renderer.render(plot_spec())
+    pool = renderer.pool
+
+    # Rendering process killed (e.g. by out of memory killer)
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+
+    assert renderer.render(plot_spec()).startswith(b"\x89PNG")
+    assert renderer.pool is not pool
@@ -0,0 +1,177 @@
+# STOCK REFRESH TESTS
+# Libraries
+import sqlite3
+import numpy as np
+import pytest
+from stock_db import StockDatabase
+from stock_refresh import DataRefresher
+from stock_snapshot import database_signature, load_snapshot_store
+from stock_store import SqlSeriesStore, load_series_store
+
+
+def stock_row(instrument_name, date, price, interval="Daily"):
+    return (
+        instrument_name,
+        "USD",
+        date,
+        interval,
+        price,
+        price,
+        price,
+        price,
+        100,
+        0.0,
+    )
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = StockDatabase(str(tmp_path / "stock_prices.db"))
+    database.load(
+        [
+            stock_row("gold", "2022-12-29", 1815.0),
+            stock_row("gold", "2022-12-30", 1826.2),
+            stock_row("silver", "2022-12-30", 23.9),
+        ]
+    )
+
+    return database
+
+
+def create_store(database, mode):
+    """
+    Method responsible for returning store of site in data mode
+    """
+    if mode == "memory":
+        return load_series_store(database.path, database_signature(database.path))
+
+    if mode == "sql":
+        return SqlSeriesStore(database.path, version=database_signature(database.path))
+
+    return load_snapshot_store(database.path)
+
+
+def create_refresher(database, store, mode="memory"):
+    """
+    Method responsible for returning refresher (not started) replacing
+    store held in dictionary
+    """
+    stores = {"store": store}
+    refresher = DataRefresher(
+        database.path,
+        get_store=lambda: stores["store"],
+        set_store=lambda new_store: stores.update(store=new_store),
+        snapshot=mode == "snapshot",
+    )
+
+    return refresher, stores
+
+
+@pytest.mark.parametrize("mode", ["memory", "sql", "snapshot"])
+def test_update_with_new_rows_of_other_instrument(database, mode):
+    store = create_store(database, mode)
+
+    store.lookup("gold", "", "", "Daily")
+    refresher, stores = create_refresher(database, store, mode)
+    gold_version = store.series_version("gold")
+
+    # One write updating gold and adding row of silver
+    database.load(
+        [
+            stock_row("gold", "2022-12-30", 1830.5),
+            stock_row("silver", "2023-01-02", 24.1),
+        ]
+    )
+
+    assert refresher.check()
+
+    store = stores["store"]
+    gold_df = store.lookup("gold", "", "", "Daily")
+
+    assert gold_df["last_price"].tolist() == [1815.0, 1830.5]
+    assert store.series_version("gold") != gold_version
+    assert len(store.lookup("silver", "", "", "Daily")) == 2
+
+
+def test_checkpoints_do_not_refresh_store(database):
+    store = load_series_store(database.path, database_signature(database.path))
+    refresher, stores = create_refresher(database, store)
+
+    database.save_checkpoints([("default", "gold|Daily|2010|2024", 2)])
+
+    assert not refresher.check()
+    assert stores["store"] is store
+    assert refresher.refreshes == 0
+
+
+def test_same_values_are_not_changes(database):
+    store = load_series_store(database.path, database_signature(database.path))
+    refresher, stores = create_refresher(database, store)
+
+    database.load([stock_row("gold", "2022-12-30", 1826.2)])
+
+    assert not refresher.check()
+    assert stores["store"] is store
+
+
+def test_refresh_merges_changed_rows(database):
+    store = load_series_store(database.path, database_signature(database.path))
+    refresher, stores = create_refresher(database, store)
+    silver = store.get_partition("silver", "Daily")
+    silver_version = store.series_version("silver")
+
+    database.load(
+        [
+            stock_row("gold", "2022-12-28", 1810.0),
+            stock_row("gold", "2022-12-30", 1830.5),
+            stock_row("gold", "2023-01-02", 1840.0),
+            stock_row("gold", "2022-12-30", 1830.5, interval="Weekly"),
+        ]
+    )
+    conn = sqlite3.connect(database.path)
+    conn.execute("delete from stock where date = '2022-12-29';")
+    conn.commit()
+    conn.close()
+
+    assert refresher.check()
+
+    store = stores["store"]
+    full_store = load_series_store(database.path)
+
+    for key, partition in full_store.partitions.items():
+        merged = store.partitions[key]
+
+        np.testing.assert_array_equal(merged.dates, partition.dates)
+
+        for column, values in partition.columns.items():
+            np.testing.assert_allclose(
+                merged.columns[column].astype(float), values.astype(float)
+            )
+
+    assert set(store.partitions) == set(full_store.partitions)
+
+    # Partitions of instruments without changes are not read again
+    assert store.get_partition("silver", "Daily") is silver
+    assert store.series_version("silver") == silver_version
+    assert store.series_version("gold") != silver_version
+
+
+def test_refresh_keeps_snapshot_memory_mapped(database):
+    store = create_store(database, "snapshot")
+    refresher, stores = create_refresher(database, store, "snapshot")
+
+    database.load([stock_row("silver", "2023-01-02", 24.1)])
+
+    assert refresher.check()
+
+    store = stores["store"]
+
+    assert store.version == database_signature(database.path)
+    assert all(
+        isinstance(partition.dates, np.memmap)
+        for partition in store.partitions.values()
+    )
+    assert len(store.lookup("silver", "", "", "Daily")) == 2
+
+    # Other processes load the same snapshot without writing it again
+    assert load_snapshot_store(database.path).version == store.version
@@ -0,0 +1,178 @@
+# STOCK ROLLUP TESTS
+# Libraries
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from stock_db import StockDatabase, to_rows
+from stock_rollup import RollupEngine, compute_rollup
+
+
+def daily_df(instrument_name, dates, prices, volumes=None):
+    """
+    Method responsible for returning daily rows of instrument with open price
+    one below last price and range of one around it
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+
+    return pd.DataFrame(
+        {
+            "instrument_name": instrument_name,
+            "currency_name": "USD",
+            "date": pd.to_datetime(dates),
+            "interval": "Daily",
+            "last_price": prices,
+            "open_price": prices - 1,
+            "max_price": prices + 1,
+            "min_price": prices - 1,
+            "volume": pd.array(
+                volumes if volumes is not None else [10] * len(prices), dtype="Int64"
+            ),
+            "change": 0.0,
+        }
+    )
+
+
+def test_weeks_start_on_sunday():
+    # Thursday to next Wednesday, buckets of weeks starting on Sundays
+    temp_df = daily_df(
+        "gold", pd.date_range("2022-12-29", "2023-01-04"), np.arange(1, 8)
+    )
+    rollup_df = compute_rollup(temp_df, "Weekly")
+
+    assert rollup_df["date"].dt.strftime("%Y-%m-%d").tolist() == [
+        "2022-12-25",
+        "2023-01-01",
+    ]
+    assert (rollup_df["date"].dt.dayofweek == 6).all()
+    assert rollup_df["open_price"].tolist() == [0.0, 3.0]
+    assert rollup_df["last_price"].tolist() == [3.0, 7.0]
+    assert rollup_df["max_price"].tolist() == [4.0, 8.0]
+    assert rollup_df["min_price"].tolist() == [0.0, 3.0]
+    assert rollup_df["volume"].tolist() == [30, 40]
+
+
+def test_months_start_on_first_day():
+    temp_df = daily_df(
+        "gold", ["2022-11-15", "2022-11-30", "2022-12-01", "2022-12-30"], [1, 2, 3, 4]
+    )
+    rollup_df = compute_rollup(temp_df, "Monthly")
+
+    assert rollup_df["date"].dt.strftime("%Y-%m-%d").tolist() == [
+        "2022-11-01",
+        "2022-12-01",
+    ]
+    assert rollup_df["last_price"].tolist() == [2.0, 4.0]
+
+
+def test_change_from_previous_bucket():
+    temp_df = pd.concat(
+        [
+            daily_df("gold", ["2022-11-30", "2022-12-30"], [200.0, 210.0]),
+            daily_df("silver", ["2022-12-30"], [20.0]),
+        ]
+    )
+    rollup_df = compute_rollup(temp_df, "Monthly").set_index(
+        ["instrument_name", "date"]
+    )
+
+    # First bucket of each instrument has no previous one
+    assert np.isnan(rollup_df.loc[("gold", pd.Timestamp("2022-11-01")), "change"])
+    assert rollup_df.loc[("gold", pd.Timestamp("2022-12-01")), "change"] == 5.0
+    assert np.isnan(rollup_df.loc[("silver", pd.Timestamp("2022-12-01")), "change"])
+
+
+def test_missing_volume_stays_missing():
+    temp_df = daily_df(
+        "gold",
+        ["2022-11-29", "2022-11-30", "2022-12-29", "2022-12-30"],
+        [1, 2, 3, 4],
+        volumes=[None, None, 5, None],
+    )
+    rollup_df = compute_rollup(temp_df, "Monthly")
+
+    assert rollup_df["volume"].isna().tolist() == [True, False]
+    assert rollup_df["volume"].iloc[1] == 5
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = StockDatabase(str(tmp_path / "stock_prices.db"))
+    dates = pd.bdate_range("2022-10-03", "2022-12-30")
+    temp_df = daily_df(
+        "gold",
+        dates,
+        np.linspace(100, 200, len(dates)),
+        volumes=[None] * 5 + [10] * (len(dates) - 5),
+    )
+    temp_df["date"] = temp_df["date"].dt.strftime("%Y-%m-%d")
+    database.load(to_rows(temp_df))
+
+    return database
+
+
+def read_rows(database, interval):
+    conn = sqlite3.connect(database.path)
+
+    try:
+        return pd.read_sql_query(
+            """select date, last_price, open_price, max_price, min_price, volume, change
+from stock
+where interval = ?
+order by date;""",
+            conn,
+            params=(interval,),
+        )
+    finally:
+        conn.close()
+
+
+def test_rebuild_stores_all_buckets(database):
+    engine = RollupEngine(database)
+    engine.rebuild(["gold"])
+
+    daily = read_rows(database, "Daily")
+    monthly = read_rows(database, "Monthly")
+    weekly = read_rows(database, "Weekly")
+
+    assert monthly["date"].tolist() == ["2022-10-01", "2022-11-01", "2022-12-01"]
+    assert len(weekly) == 13
+    assert (pd.to_datetime(weekly["date"]).dt.dayofweek == 6).all()
+
+    # Intervals agree with daily rows
+    assert monthly["last_price"].iloc[-1] == daily["last_price"].iloc[-1]
+    assert monthly["max_price"].max() == daily["max_price"].max()
+    assert weekly["volume"].sum() == daily["volume"].sum()
+
+    # First week has only missing volumes
+    assert pd.isna(weekly["volume"].iloc[0])
+
+
+def test_update_upserts_only_affected_buckets(database):
+    engine = RollupEngine(database)
+    engine.rebuild(["gold"])
+    weekly = read_rows(database, "Weekly")
+
+    # New days in the last week of December and first week of January
+    new_df = daily_df(
+        "gold", ["2022-12-31", "2023-01-02", "2023-01-03"], [150, 220, 230]
+    )
+    new_df["date"] = new_df["date"].dt.strftime("%Y-%m-%d")
+    database.load(to_rows(new_df))
+
+    rows = engine.update({"gold": "2022-12-31"})
+
+    # Weeks of 25.12 and 01.01 and months of December and January
+    assert rows == 4
+
+    updated = read_rows(database, "Weekly")
+    pd.testing.assert_frame_equal(updated.iloc[:-2], weekly.iloc[:-1])
+    assert updated["date"].tolist()[-2:] == ["2022-12-25", "2023-01-01"]
+    assert updated["last_price"].iloc[-2] == 150.0
+
+    # Change of new week is computed from previous (updated) week
+    assert updated["change"].iloc[-1] == round((230.0 / 150.0 - 1) * 100, 2)
+
+    monthly = read_rows(database, "Monthly")
+    assert monthly["date"].tolist()[-1] == "2023-01-01"
+    assert monthly["change"].iloc[-1] == round((230.0 / 150.0 - 1) * 100, 2)
@@ -0,0 +1,89 @@
+# STOCK SCRAPPER CHECKPOINTS TESTS
+# Libraries
+import os
+import sqlite3
+import pytest
+from stock_fixture_server import serve_fixtures
+from stock_retry import RetryPolicy
+from stock_scrapper import StockScrapper
+
+# Directory with saved pages of instruments (without page of gold)
+FIXTURES_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures"
+)
+
+UNIVERSE = {
+    "currencies": ["eur-usd"],
+    "equities": ["cdproject"],
+    "commodities": ["gold"],
+}
+
+
+@pytest.fixture(scope="module")
+def fixture_url():
+    server = serve_fixtures(FIXTURES_DIRECTORY)
+
+    yield "http://{0}:{1}/".format(*server.server_address)
+
+    server.shutdown()
+
+
+def create_scrapper(fixture_url, db_path, **kwargs):
+    return StockScrapper(
+        url=fixture_url,
+        backend="fixture",
+        db_path=db_path,
+        failure_threshold=100,
+        retry_policy=RetryPolicy(attempts=1, deadline=10.0),
+        **dict({"instruments": UNIVERSE}, **kwargs),
+    )
+
+
+def test_rerun_resumes_unfinished_jobs(fixture_url, tmp_path):
+    db_path = str(tmp_path / "stock_prices.db")
+    scrapper = create_scrapper(fixture_url, db_path)
+
+    failed_jobs = scrapper.run_scrapper(run_name="daily")
+
+    assert [job["instrument_name"] for job, _ in failed_jobs] == ["gold"]
+
+    # Rerun of run skips jobs completed in it
+    jobs = scrapper.get_pending_jobs(run_name="daily")
+
+    assert [job["instrument_name"] for job in jobs] == ["gold"]
+
+    failed_jobs = scrapper.run_scrapper(run_name="daily")
+
+    assert [job["instrument_name"] for job, _ in failed_jobs] == ["gold"]
+
+
+def test_old_checkpoints_do_not_block_next_runs(fixture_url, tmp_path):
+    db_path = str(tmp_path / "stock_prices.db")
+    create_scrapper(fixture_url, db_path).run_scrapper(run_name="daily")
+
+    # Next day checkpoints of unfinished run belong to previous run
+    conn = sqlite3.connect(db_path)
+    conn.execute("update scrape_checkpoint set completed_at = '2000-01-01T00:00:00';")
+    conn.commit()
+    conn.close()
+
+    scrapper = create_scrapper(fixture_url, db_path)
+    jobs = scrapper.get_pending_jobs(run_name="daily")
+
+    assert sorted(job["instrument_name"] for job in jobs) == [
+        "cdproject",
+        "eur-usd",
+        "gold",
+    ]
+
+
+def test_finished_run_clears_checkpoints(fixture_url, tmp_path):
+    db_path = str(tmp_path / "stock_prices.db")
+    scrapper = create_scrapper(
+        fixture_url,
+        db_path,
+        instruments={"currencies": ["eur-usd"], "equities": ["cdproject"]},
+    )
+
+    assert scrapper.run_scrapper(run_name="daily") == []
+    assert len(scrapper.get_pending_jobs(run_name="daily")) == 2
@@ -0,0 +1,142 @@
+# STOCK SITE TESTS
+# Libraries
+import re
+import pytest
+from stock_benchmark import load_site
+from stock_db import StockDatabase
+from stock_store import SeriesStore
+
+SELECTION = {
+    "stockname": ["gold"],
+    "startdate": "",
+    "enddate": "",
+    "interval": "Daily",
+}
+
+
+def stock_rows(instrument_name, currency_name, prices):
+    return [
+        (
+            instrument_name,
+            currency_name,
+            "2022-12-{0:02d}".format(day + 1),
+            "Daily",
+            price,
+            price,
+            price,
+            price,
+            100,
+            0.0,
+        )
+        for day, price in enumerate(prices)
+    ]
+
+
+@pytest.fixture(scope="module")
+def site(tmp_path_factory):
+    database = StockDatabase(str(tmp_path_factory.mktemp("site") / "stock_prices.db"))
+    database.load(
+        stock_rows("gold", "USD", [1800.0 + day for day in range(30)])
+        + stock_rows("silver", "USD", [23.0 + day / 10 for day in range(30)])
+        + stock_rows("eur-usd", "USD", [1.05 + day / 1000 for day in range(30)])
+    )
+
+    return load_site(database.path)
+
+
+def plot_url(site, selection=SELECTION):
+    """
+    Method responsible for posting selection and returning url of plot image
+    """
+    response = site.app.test_client().post("/", data=selection)
+
+    assert response.status_code == 200
+
+    return (
+        re.search(r'<img src="([^"]+)"', response.get_data(as_text=True))
+        .group(1)
+        .replace("&amp;", "&")
+    )
+
+
+def test_plot_image_from_cache(site):
+    url = plot_url(site)
+    response = site.app.test_client().get(url)
+
+    assert response.status_code == 200
+    assert response.mimetype == "image/png"
+    assert response.get_data().startswith(b"\x89PNG")
+
+
+def test_plot_image_rendered_again_without_cache(site):
+    url = plot_url(site, dict(SELECTION, stockname=["gold", "silver"]))
+
+    # Request handled by other process (or after plot was evicted)
+    site.plot_cache.items.clear()
+
+    response = site.app.test_client().get(url)
+
+    assert response.status_code == 200
+    assert response.get_data().startswith(b"\x89PNG")
+    assert response.headers["ETag"].strip('"') in url
+
+
+def test_plot_image_of_old_data_redirects(site):
+    url = plot_url(site)
+    site.plot_cache.items.clear()
+
+    # Data of instrument changed since url was created
+    site.store.versions["gold"] = "changed"
+
+    try:
+        response = site.app.test_client().get(url)
+    finally:
+        site.store.versions.pop("gold")
+
+    assert response.status_code == 302
+    assert "stockname=gold" in response.headers["Location"]
+
+
+def test_plot_image_not_modified(site):
+    url = plot_url(site)
+    key = re.search(r"/plot/(\w+)\.png", url).group(1)
+
+    response = site.app.test_client().get(
+        url, headers={"If-None-Match": '"{0}"'.format(key)}
+    )
+
+    assert response.status_code == 304
+
+
+class SwappingStore:
+    """
+    Store replacing store of site with empty one when it is first read
+    (as refresh finished during request)
+    """
+
+    def __init__(self, site, store) -> None:
+        self.site = site
+        self.store = store
+
+    def instrument_names(self):
+        self.site.set_store(SeriesStore.from_partitions({}))
+
+        return self.store.instrument_names()
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+def test_series_api_reads_one_store(site):
+    store = site.store
+    site.set_store(SwappingStore(site, store))
+
+    try:
+        response = site.app.test_client().get(
+            "/api/series?stockname=gold&interval=Daily&currency=USD"
+        )
+    finally:
+        site.set_store(store)
+
+    assert response.status_code == 200
+    assert response.get_json()["length"] == 30
@@ -0,0 +1,145 @@
+# STOCK SQL STORE TESTS
+# Libraries
+import sqlite3
+import pytest
+from stock_db import StockDatabase
+from stock_store import ConnectionPool, SqlSeriesStore
+
+
+def stock_rows(instrument_name, currency_name, dates, interval="Daily"):
+    return [
+        (
+            instrument_name,
+            currency_name,
+            date,
+            interval,
+            float(number),
+            float(number),
+            float(number),
+            float(number),
+            100,
+            0.0,
+        )
+        for number, date in enumerate(dates, start=1)
+    ]
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = StockDatabase(str(tmp_path / "stock_prices.db"))
+    database.load(
+        stock_rows("gold", "USD", ["2022-12-28", "2022-12-29", "2022-12-30"])
+        + stock_rows("gold", "USD", ["2022-12-25"], interval="Weekly")
+        + stock_rows("cdproject", "PLN", ["2022-12-29", "2022-12-30"])
+    )
+
+    return database
+
+
+def test_lookup_inclusive_bounds(database):
+    store = SqlSeriesStore(database.path)
+    temp_df = store.lookup("gold", "2022-12-29", "2022-12-30", "Daily")
+
+    assert temp_df["date"].dt.strftime("%Y-%m-%d").tolist() == [
+        "2022-12-29",
+        "2022-12-30",
+    ]
+    assert temp_df["last_price"].tolist() == [2.0, 3.0]
+    assert set(temp_df["currency_name"]) == {"USD"}
+
+
+def test_lookup_open_range(database):
+    store = SqlSeriesStore(database.path)
+
+    assert len(store.lookup("gold", "", "", "Daily")) == 3
+    assert len(store.lookup("gold", "2022-12-29", "", "Daily")) == 2
+    assert len(store.lookup("gold", None, "2022-12-28", "Daily")) == 1
+    assert len(store.lookup("gold", "", "", "Weekly")) == 1
+
+
+def test_lookup_unknown_instrument(database):
+    store = SqlSeriesStore(database.path)
+
+    assert store.lookup("silver", "", "", "Daily").empty
+    assert store.get_partition("silver", "Daily") is None
+    assert store.instrument_names() == ["cdproject", "gold"]
+
+
+def test_lookup_many(database):
+    store = SqlSeriesStore(database.path)
+    long_df = store.lookup_many(
+        ["gold", "cdproject", "silver"], "2022-12-30", "", "Daily"
+    )
+
+    assert sorted(long_df["instrument_name"]) == ["cdproject", "gold"]
+    assert long_df.set_index("instrument_name")["currency_name"].to_dict() == {
+        "gold": "USD",
+        "cdproject": "PLN",
+    }
+
+
+def test_lookup_cached(database):
+    store = SqlSeriesStore(database.path)
+    temp_df = store.lookup("gold", "", "", "Daily")
+
+    assert store.lookup("gold", "", "", "Daily") is temp_df
+    assert store.cache.hits == 1
+
+
+def test_refresh_invalidates_cache_of_instruments(database):
+    store = SqlSeriesStore(database.path, version="1")
+    store.lookup("gold", "", "", "Daily")
+    cdproject_df = store.lookup("cdproject", "", "", "Daily")
+    store.lookup_many(["gold", "cdproject"], "", "", "Daily")
+
+    database.load(stock_rows("gold", "USD", ["2023-01-02"]))
+
+    conn = sqlite3.connect(database.path)
+
+    try:
+        refreshed = store.refresh(conn, ["gold"], version="2")
+    finally:
+        conn.close()
+
+    # Selections of other instruments and their versions are kept
+    assert refreshed.lookup("cdproject", "", "", "Daily") is cdproject_df
+    assert refreshed.series_version("cdproject") == "1"
+    assert refreshed.series_version("gold") == "2"
+    assert len(refreshed.lookup("gold", "", "", "Daily")) == 4
+    assert len(refreshed.lookup_many(["gold", "cdproject"], "", "", "Daily")) == 6
+
+    # Store before refresh is not changed
+    assert len(store.lookup("gold", "", "", "Daily")) == 3
+    assert store.series_version("gold") == "1"
+
+
+def test_refresh_of_all_instruments(database):
+    store = SqlSeriesStore(database.path, version="1")
+    store.lookup("cdproject", "", "", "Daily")
+
+    database.load(stock_rows("silver", "USD", ["2022-12-30"]))
+
+    conn = sqlite3.connect(database.path)
+
+    try:
+        refreshed = store.refresh(conn, None, version="2")
+    finally:
+        conn.close()
+
+    assert len(refreshed.cache.entries()) == 0
+    assert refreshed.series_version("cdproject") == "2"
+    assert len(refreshed.lookup("silver", "", "", "Daily")) == 1
+
+
+def test_connection_pool(database):
+    pool = ConnectionPool(database.path, size=2)
+
+    with pool.connection() as first, pool.connection() as second:
+        assert first is not second
+        assert pool.connections.empty()
+
+        # Connections are read-only
+        with pytest.raises(sqlite3.OperationalError):
+            first.execute("delete from stock;")
+
+    assert pool.connections.qsize() == 2